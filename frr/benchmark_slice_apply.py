@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+import time
+import logging
+import numpy as np
+from container_backend import make_backend, set_default_backend
+from topology_diff import diff_matrices, count_active_links
+
+logger = logging.getLogger(__name__)
+
+# frr_network_builder.py的TSN×DG矩阵中前12列为YG，其余为XW
+YG_COLUMNS = 12
+
+
+def _drift(matrix, mask, rng, scale):
+    """可见链路的值按相对比例随机漂移（模拟卫星运动导致的距离/延迟变化）"""
+    matrix[mask] = np.maximum(matrix[mask] * (1 + rng.uniform(-scale, scale, int(mask.sum()))), 1)
+
+
+def synthetic_xw_timeline(nodes, slices, degree=4, churn=0.05, drift=0.02, seed=0):
+    """
+    生成XW星间链路的合成可见性时间线（对称矩阵，值为距离，-1表示不可见）
+
+    参数:
+    - nodes: XW节点数
+    - slices: 时间片数
+    - degree: 每个节点的平均链路数
+    - churn: 每个时间片断开并新建的链路占可见链路的比例
+    - drift: 每个时间片距离的最大相对变化
+    - seed: 随机种子，相同参数生成相同的时间线
+
+    返回:
+    - 逐个产生矩阵的生成器
+    """
+    rng = np.random.default_rng(seed)
+    upper = np.triu(np.ones((nodes, nodes), dtype=bool), k=1)
+    n_pairs = int(upper.sum())
+    n_links = min(n_pairs, nodes * degree // 2)
+
+    visible = np.zeros((nodes, nodes), dtype=bool)
+    visible.flat[rng.choice(np.flatnonzero(upper), n_links, replace=False)] = True
+    # 距离范围对应 value // 300 换算后约 3~40ms 的延迟
+    distance = np.where(visible, rng.uniform(1000, 12000, (nodes, nodes)), -1.0)
+
+    for _ in range(slices):
+        matrix = np.where(visible, distance, -1.0)
+        yield np.maximum(matrix, matrix.T)
+
+        _drift(distance, visible, rng, drift)
+        n_churn = int(round(visible.sum() * churn))
+        if n_churn:
+            on = np.flatnonzero(visible)
+            off = np.flatnonzero(upper & ~visible)
+            visible.flat[rng.choice(on, n_churn, replace=False)] = False
+            new = rng.choice(off, min(n_churn, len(off)), replace=False)
+            visible.flat[new] = True
+            distance.flat[new] = rng.uniform(1000, 12000, len(new))
+
+
+def synthetic_tsn_timeline(tsn, xw, slices, degree=3, churn=0.05, drift=0.02, seed=0):
+    """
+    生成TSN与YG/XW之间链路的合成可见性时间线（tsn × (12+xw) 矩阵，值为延迟毫秒，-1表示不可见）
+
+    参数:
+    - tsn: TSN节点数
+    - xw: XW节点数（YG固定为12列）
+    - degree: 每个TSN节点的平均链路数
+    - 其余参数同synthetic_xw_timeline
+    """
+    rng = np.random.default_rng(seed)
+    shape = (tsn, YG_COLUMNS + xw)
+    n_links = min(shape[0] * shape[1], tsn * degree)
+
+    visible = np.zeros(shape, dtype=bool)
+    visible.flat[rng.choice(visible.size, n_links, replace=False)] = True
+    delay = rng.uniform(5, 40, shape)
+
+    for _ in range(slices):
+        yield np.where(visible, np.round(delay, 1), -1.0)
+
+        _drift(delay, visible, rng, drift)
+        n_churn = int(round(visible.sum() * churn))
+        if n_churn:
+            on = np.flatnonzero(visible)
+            off = np.flatnonzero(~visible)
+            visible.flat[rng.choice(on, n_churn, replace=False)] = False
+            new = rng.choice(off, min(n_churn, len(off)), replace=False)
+            visible.flat[new] = True
+            delay.flat[new] = rng.uniform(5, 40, len(new))
+
+
+def xw_containers(nodes, prefix="clab-sat-network-XW"):
+    return [f"{prefix}{n}" for n in range(1, nodes + 1)]
+
+
+def tsn_containers(tsn, xw, prefix="clab-sat-network-"):
+    return ([f"{prefix}TSN{n}" for n in range(1, tsn + 1)]
+            + [f"{prefix}YG{n}" for n in range(1, YG_COLUMNS + 1)]
+            + [f"{prefix}XW{n}" for n in range(1, xw + 1)])
+
+
+def run_benchmark(manager, timeline, backend, symmetric):
+    """
+    依次将时间线中的矩阵应用到管理器，测量每个时间片的 apply_matrix 耗时
+
+    链路变化数在计时之外用diff_matrices单独计算，不计入时间片耗时
+
+    返回:
+    - [{'seconds': 耗时, 'links': 链路增删改数量, 'spawns': 启动的进程数}]，第一项为首次建链
+    """
+    samples = []
+    previous = None
+    for matrix in timeline:
+        if previous is None:
+            links = count_active_links(matrix, symmetric=symmetric)
+        else:
+            links = sum(len(part) for part in diff_matrices(previous, matrix, symmetric=symmetric))
+        spawns = backend.spawn_count
+        start = time.perf_counter()
+        manager.apply_matrix(matrix)
+        seconds = time.perf_counter() - start
+        samples.append({'seconds': seconds, 'links': links, 'spawns': backend.spawn_count - spawns})
+        previous = matrix
+    return samples
+
+
+def summarize(samples):
+    """
+    汇总run_benchmark的结果，首次建链单独统计，其余时间片作为稳态
+
+    返回:
+    - {'initial_s', 'initial_links', 'p50_s', 'p99_s', 'max_s', 'links_per_s', 'spawns_per_slice'}
+    """
+    initial, steady = samples[0], samples[1:] or samples[:1]
+    seconds = np.array([s['seconds'] for s in steady])
+    links = sum(s['links'] for s in steady)
+    return {
+        'initial_s': initial['seconds'],
+        'initial_links': initial['links'],
+        'p50_s': float(np.percentile(seconds, 50)),
+        'p99_s': float(np.percentile(seconds, 99)),
+        'max_s': float(seconds.max()),
+        'links_per_s': links / seconds.sum() if seconds.sum() > 0 else float('inf'),
+        'spawns_per_slice': sum(s['spawns'] for s in steady) / len(steady),
+    }
+
+
+def make_manager(target, ip_pools):
+    """创建被测的管理器，不写入子网分配文件和日志，避免污染正式运行的状态"""
+    if target == 'xw':
+        from dynamic_frr_xw import NetworkTopologyManager
+        return NetworkTopologyManager(ip_pools=ip_pools, ip_state_file=None, journal_file=None)
+    from frr_network_builder import NetworkTopologyBuilder
+    return NetworkTopologyBuilder(ip_pools=ip_pools, ip_state_file=None)
+
+
+def benchmark(target, size, args):
+    """按指定规模运行一次基准测试，返回summarize的结果"""
+    backend = make_backend(args.backend)
+    set_default_backend(backend)
+    if target == 'xw':
+        timeline = synthetic_xw_timeline(size, args.slices, args.degree, args.churn, args.drift, args.seed)
+        containers = xw_containers(size)
+    else:
+        timeline = synthetic_tsn_timeline(args.tsn, size, args.slices, args.degree, args.churn, args.drift, args.seed)
+        containers = tsn_containers(args.tsn, size)
+
+    if args.backend == 'netns':
+        backend.create_namespaces(containers)
+    try:
+        manager = make_manager(target, [args.ip_pool])
+        samples = run_benchmark(manager, timeline, backend, symmetric=(target == 'xw'))
+    finally:
+        if args.backend == 'netns' and not args.keep:
+            backend.delete_namespaces(containers)
+    return summarize(samples)
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+
+    parser = argparse.ArgumentParser(description='链路管理器时间片应用性能基准测试（合成可见性时间线）')
+    parser.add_argument('target', choices=['xw', 'builder'],
+                        help='被测对象: xw为dynamic_frr_xw.py的管理器，builder为frr_network_builder.py的构建器')
+    parser.add_argument('--nodes', default='50,100,200',
+                        help='XW节点数，逗号分隔的多个值依次测试，默认50,100,200')
+    parser.add_argument('--tsn', type=int, default=8, help='builder测试中的TSN节点数，默认8')
+    parser.add_argument('--slices', type=int, default=20, help='每个规模的时间片数，默认20')
+    parser.add_argument('--degree', type=int, default=4, help='每个节点的平均链路数，默认4')
+    parser.add_argument('--churn', type=float, default=0.05, help='每个时间片断开并新建的链路比例，默认0.05')
+    parser.add_argument('--drift', type=float, default=0.02, help='每个时间片距离/延迟的最大相对变化，默认0.02')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，默认0')
+    parser.add_argument('--backend', choices=['dry-run', 'netns'], default='dry-run',
+                        help='容器后端: dry-run只计规划开销，netns在真实命名空间中执行（需要root），默认dry-run')
+    parser.add_argument('--ip-pool', default='10.0.0.0/8',
+                        help='链路子网地址池，默认10.0.0.0/8（大规模星座会超出链路管理脚本的默认地址池；'
+                             '基准测试不运行OSPF，不受OSPF宣告网段限制）')
+    parser.add_argument('--keep', action='store_true', help='netns后端测试结束后保留命名空间')
+    parser.add_argument('--slot', type=float, default=20.0,
+                        help='时间片长度（秒），报告p99耗时不超过该值的最大规模，默认20')
+    parser.add_argument('--verbose', action='store_true', help='输出管理器的日志')
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.INFO)
+    # 基准测试的命名空间中不运行OSPF，地址池超出OSPF宣告网段的警告不适用
+    logging.getLogger('ip_allocator').addFilter(lambda record: 'OSPF' not in record.getMessage())
+
+    sizes = [int(n) for n in args.nodes.split(',')]
+    largest = None
+    logger.info(f"{'节点数':>6} {'首次建链(s)':>11} {'链路数':>6} {'p50(s)':>8} {'p99(s)':>8} {'最大(s)':>8} "
+                f"{'链路/秒':>9} {'进程/时间片':>10}")
+    for size in sizes:
+        result = benchmark(args.target, size, args)
+        logger.info(f"{size:>9} {result['initial_s']:>14.3f} {result['initial_links']:>9} {result['p50_s']:>10.4f} "
+                    f"{result['p99_s']:>10.4f} {result['max_s']:>9.4f} {result['links_per_s']:>12.1f} "
+                    f"{result['spawns_per_slice']:>15.1f}")
+        if result['p99_s'] <= args.slot and result['initial_s'] <= args.slot:
+            largest = size if largest is None else max(largest, size)
+
+    if args.backend != 'netns':
+        # dry-run不执行命令，耗时只是规划开销，不能据此判断可仿真的规模
+        if largest is None:
+            logger.info(f"所有规模的规划开销都超过了 {args.slot} 秒")
+        else:
+            logger.info(f"规划开销（不含命令执行）不超过 {args.slot} 秒的最大规模: {largest} 个XW节点；"
+                        f"可仿真的规模需用 --backend netns 测量")
+    elif largest is None:
+        logger.info(f"所有规模的时间片耗时都超过了 {args.slot} 秒")
+    else:
+        logger.info(f"时间片长度 {args.slot} 秒下可仿真的最大规模: {largest} 个XW节点（{args.backend}后端）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import os
+import re
+import shlex
+import threading
+import subprocess
+import logging
+from netns_cache import get_default_cache
+
+logger = logging.getLogger(__name__)
+
+# 可选的后端名称
+BACKENDS = ('docker', 'netns', 'dry-run')
+
+# ip netns add 创建的命名空间所在目录
+NETNS_RUN_DIR = "/run/netns"
+
+
+class DockerBackend:
+    name = 'docker'
+
+    def __init__(self, netns_cache=None, use_sudo=True):
+        """
+        docker/containerlab容器后端（默认）
+
+        容器PID由docker inspect解析并缓存，命令通过 nsenter --net=<命名空间> 在容器网络命名空间内执行
+
+        参数:
+        - netns_cache: 容器PID/命名空间缓存，默认使用进程内共享缓存
+        - use_sudo: 是否以sudo执行ip/tc/nsenter命令
+        """
+        self.netns_cache = netns_cache or get_default_cache()
+        self.use_sudo = use_sudo
+        self.spawn_count = 0    # 已启动的进程数
+        self._count_lock = threading.Lock()
+
+    def _sudo(self, argv):
+        return (['sudo'] + argv) if self.use_sudo else argv
+
+    def resolve(self, containers):
+        """解析容器的命名空间句柄，返回 {容器名: 句柄}，不存在的容器不在结果中"""
+        return self.netns_cache.get_pids(containers)
+
+    def netns_ref(self, handle):
+        """ip link add ... netns <引用> 中使用的命名空间引用"""
+        return str(handle)
+
+    def exec_argv(self, container, handle, argv):
+        """返回在容器网络命名空间内执行argv的完整命令行"""
+        netns_path = self.netns_cache.netns_path(container) or f"/proc/{handle}/ns/net"
+        return self._sudo(['nsenter', f'--net={netns_path}'] + list(argv))
+
+    def host_argv(self, argv):
+        """返回在宿主机（默认命名空间）以root执行argv的完整命令行"""
+        return self._sudo(list(argv))
+
+    def run(self, argv, input=None):
+        """执行命令，返回subprocess.CompletedProcess"""
+        with self._count_lock:
+            self.spawn_count += 1
+        return subprocess.run(argv, input=input, stdin=None if input is not None else subprocess.DEVNULL,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    def list_containers(self, prefixes):
+        """列出名称为 <前缀><编号> 的运行中容器"""
+        try:
+            result = self.run(['docker', 'ps', '--format', '{{.Names}}'])
+        except OSError as e:
+            logger.error(f"列出容器时出错: {e}")
+            return []
+        return _filter_names(result.stdout.split(), prefixes)
+
+
+class NetnsBackend(DockerBackend):
+    name = 'netns'
+
+    def __init__(self, use_sudo=True):
+        """
+        Linux命名空间后端: 每个"容器"是一个同名的 ip netns 命名空间
+
+        不需要docker、containerlab或FRR镜像，可以在单台Linux主机上用数百个节点测试链路引擎。
+        命名空间可用 create_namespaces() 或 `python container_backend.py create` 预先创建
+
+        参数:
+        - use_sudo: 是否以sudo执行命令
+        """
+        super().__init__(use_sudo=use_sudo)
+
+    def resolve(self, containers):
+        return {container: container for container in containers
+                if os.path.exists(os.path.join(NETNS_RUN_DIR, container))}
+
+    def netns_ref(self, handle):
+        return handle
+
+    def exec_argv(self, container, handle, argv):
+        # 直接nsenter到绑定挂载的命名空间文件，比 ip netns exec 少一次挂载/sys的开销
+        return self._sudo(['nsenter', f'--net={os.path.join(NETNS_RUN_DIR, handle)}'] + list(argv))
+
+    def list_containers(self, prefixes):
+        try:
+            names = sorted(os.listdir(NETNS_RUN_DIR))
+        except OSError:
+            names = []
+        return _filter_names(names, prefixes)
+
+    def create_namespaces(self, names):
+        """用一次ip批处理创建命名空间（已存在的跳过），并启用各自的lo"""
+        names = [name for name in names if name not in self.resolve([name])]
+        if not names:
+            return 0
+        script = "".join(f"netns add {name}\n" for name in names)
+        script += "".join(f"netns exec {name} ip link set lo up\n" for name in names)
+        result = self.run(self.host_argv(['ip', '-force', '-batch', '-']), input=script)
+        if result.returncode != 0:
+            logger.warning(f"创建命名空间时部分命令失败: {result.stderr.strip()}")
+        logger.info(f"已创建 {len(names)} 个网络命名空间")
+        return len(names)
+
+    def delete_namespaces(self, names):
+        """用一次ip批处理删除命名空间，其中的veth随之删除"""
+        names = list(self.resolve(names))
+        if not names:
+            return 0
+        script = "".join(f"netns delete {name}\n" for name in names)
+        self.run(self.host_argv(['ip', '-force', '-batch', '-']), input=script)
+        logger.info(f"已删除 {len(names)} 个网络命名空间")
+        return len(names)
+
+
+class DryRunBackend(DockerBackend):
+    name = 'dry-run'
+
+    def __init__(self, echo=False):
+        """
+        演练后端: 不执行任何命令，只记录将要执行的命令，用于单独测量规划开销
+
+        所有容器都视为存在，命令一律视为成功，列出接口/qdisc的命令返回空结果
+
+        参数:
+        - echo: 是否以DEBUG级别日志逐条输出记录的命令
+        """
+        super().__init__(use_sudo=False)
+        self.echo = echo
+        self.records = []   # [(argv, stdin输入)]，spawn_count为记录的进程调用数（不会真正启动）
+
+    def resolve(self, containers):
+        return {container: container for container in containers}
+
+    def netns_ref(self, handle):
+        return handle
+
+    def exec_argv(self, container, handle, argv):
+        return ['nsenter', f'--net={handle}'] + list(argv)
+
+    def run(self, argv, input=None):
+        with self._count_lock:
+            self.records.append((list(argv), input))
+            self.spawn_count += 1
+        if self.echo:
+            logger.debug(f"[dry-run] {shlex.join(argv)}" + (f" <<< {input.count(chr(10))} 行" if input else ""))
+        return subprocess.CompletedProcess(argv, 0, stdout="", stderr="")
+
+    def list_containers(self, prefixes):
+        return []
+
+    def command_count(self):
+        """返回 (进程数, 批处理中的命令行数)"""
+        with self._count_lock:
+            processes = len(self.records)
+            lines = sum(input.count("\n") for _, input in self.records if input)
+        return processes, lines
+
+    def log_summary(self):
+        processes, lines = self.command_count()
+        logger.info(f"[dry-run] 共记录 {processes} 个进程调用，批处理命令 {lines} 行")
+
+    def reset(self):
+        with self._count_lock:
+            self.records = []
+            self.spawn_count = 0
+
+
+def _filter_names(names, prefixes):
+    patterns = [re.compile(rf'^{re.escape(prefix)}\d+$') for prefix in prefixes]
+    return sorted(name for name in names if any(pattern.match(name) for pattern in patterns))
+
+
+def make_backend(name, **kwargs):
+    """按名称创建后端，名称见BACKENDS"""
+    if name == 'docker':
+        return DockerBackend(**kwargs)
+    if name == 'netns':
+        return NetnsBackend(**kwargs)
+    if name == 'dry-run':
+        return DryRunBackend(**kwargs)
+    raise ValueError(f"未知的容器后端: {name}，可选: {', '.join(BACKENDS)}")
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def get_default_backend():
+    """返回进程内共享的容器后端，未设置时为docker后端"""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = DockerBackend()
+        return _default_backend
+
+
+def set_default_backend(backend):
+    """设置进程内共享的容器后端，链路批处理、状态校正和拆除均使用该后端"""
+    global _default_backend
+    with _default_backend_lock:
+        _default_backend = backend
+    logger.info(f"容器后端: {backend.name}")
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='为netns后端批量创建/删除网络命名空间（代替containerlab容器）')
+    parser.add_argument('command', choices=['create', 'delete'], help='create创建命名空间，delete删除命名空间')
+    parser.add_argument('--tsn', type=int, default=0, help='TSN节点数量')
+    parser.add_argument('--yg', type=int, default=0, help='YG节点数量')
+    parser.add_argument('--xw', type=int, default=0, help='XW节点数量')
+    parser.add_argument('--prefix', default='clab-sat-network-',
+                        help='命名空间名称前缀，默认与containerlab容器同名（clab-sat-network-）')
+    args = parser.parse_args()
+
+    names = [f"{args.prefix}TSN{n}" for n in range(1, args.tsn + 1)]
+    names += [f"{args.prefix}YG{n}" for n in range(1, args.yg + 1)]
+    names += [f"{args.prefix}XW{n}" for n in range(1, args.xw + 1)]
+    backend = NetnsBackend()
+    if args.command == 'create':
+        backend.create_namespaces(names)
+    else:
+        backend.delete_namespaces(names)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,94 @@
 import pandas as pd
+import numpy as np
 import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from timeline_store import list_slice_files
+from tsn_domain_assignment import write_slice
+
+logger = logging.getLogger(__name__)
 
 # 文件路径
 input_file = 'csv_tsn/output_100.csv'  # 原始CSV文件路径
 output_file = 'csv_tsn_modify/output_100.csv'  # 处理后的CSV文件路径
 
-# 处理每一列的函数
-def process_column(col):
-    # 找出正数值
-    positive_vals = col[col > 0]
-    if positive_vals.empty:
-        return pd.Series([-1.0] * len(col))
-    # 找出最小的正数值
-    min_val = positive_vals.min()
-    # 仅保留最小正数值，其他改为-1.0
-    processed_col = col.apply(lambda x: x if x == min_val else -1.0)
-    return processed_col
+# 处理整个矩阵的函数
+def process_matrix(matrix):
+    """
+    每一列只保留最小的正数值（所属TSN的延迟），其他改为-1.0
+
+    所有列用NumPy掩码一次处理；最小值相同的多个TSN都会保留，与逐列处理的结果一致
+    """
+    positive = np.where(matrix > 0, matrix, np.inf)
+    min_vals = positive.min(axis=0)
+    return np.where((matrix == min_vals) & np.isfinite(min_vals), matrix, -1.0)
+
+def process_file(paths):
+    """处理单个时间片文件，返回 (文件名, 矩阵行数, 列数)，供进程池调用"""
+    src, dst = paths
+    matrix = pd.read_csv(src, header=None, sep=',', dtype=float).values
+    write_slice(dst, process_matrix(matrix))
+    return Path(src).name, matrix.shape[0], matrix.shape[1]
 
 # 主函数
-def process_csv_file():
+def process_csv_file(src=input_file, dst=output_file):
     try:
         # 1. 读取原始CSV文件
-        if not os.path.exists(input_file):
-            return f"错误：找不到文件 '{input_file}'"
-            
-        df = pd.read_csv(input_file, header=None)
-        
-        # 2. 处理数据
-        processed_df = df.apply(process_column, axis=0)
+        if not os.path.exists(src):
+            return f"错误：找不到文件 '{src}'"
         
-        # 3. 输出到新文件
-        processed_df.to_csv(output_file, index=False, header=False)
+        # 2. 处理数据并原子写入新文件
+        _, rows, cols = process_file((src, dst))
         
-        # 4. 检查新文件每行元素数是否相等
-        with open(output_file, 'r') as f:
-            lines = f.readlines()
-        
-        # 统计每行的元素数量
-        line_lengths = [len(line.strip().split(',')) for line in lines]
-        
-        # 检查是否所有行的元素数量都相等
-        if len(set(line_lengths)) == 1:
-            return f"处理成功！文件已保存到 {output_file}。所有行元素数量相等，每行 {line_lengths[0]} 个元素。"
-        else:
-            return f"警告：文件已保存，但行元素数不相等。行长度分布: {line_lengths}"
+        return f"处理成功！文件已保存到 {dst}。矩阵大小 {rows}x{cols}。"
     
     except Exception as e:
         return f"处理过程中出错: {str(e)}"
 
+def process_csv_directory(input_dir, output_dir, workers=None):
+    """
+    处理目录中的全部时间片，不同时间片分配到进程池并行处理
+
+    返回:
+    - 处理的时间片数量
+    """
+    slices = list_slice_files(input_dir)
+    if not slices:
+        raise ValueError(f"目录 {input_dir} 中没有找到带编号的CSV文件")
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    jobs = [(csv_file, Path(output_dir) / csv_file.name) for _, csv_file in slices]
+
+    shapes = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _, rows, cols in executor.map(process_file, jobs, chunksize=max(1, len(jobs) // 64)):
+            shapes.add((rows, cols))
+    if len(shapes) > 1:
+        logger.warning(f"时间片的矩阵大小不一致: {sorted(shapes)}")
+    logger.info(f"已处理 {len(jobs)} 个时间片，结果保存到 {output_dir}")
+    return len(jobs)
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='生成TSN分域表: 每个YG/XW节点只保留延迟最小的TSN')
+    parser.add_argument('--input', default=input_file, help=f'原始CSV文件，默认{input_file}')
+    parser.add_argument('--output', default=output_file, help=f'处理后的CSV文件，默认{output_file}')
+    parser.add_argument('--input-dir', help='目录模式: 处理该目录下全部output_N.csv（如csv_tsn）')
+    parser.add_argument('--output-dir', default='csv_tsn_modify', help='目录模式的输出目录，默认csv_tsn_modify')
+    parser.add_argument('--workers', type=int, help='目录模式的进程数，默认为CPU核数')
+    args = parser.parse_args()
+
+    if args.input_dir:
+        process_csv_directory(args.input_dir, args.output_dir, args.workers)
+    else:
+        print(process_csv_file(args.input, args.output))
+
 # 执行处理函数
-result = process_csv_file()
-print(result)
+if __name__ == "__main__":
+    main()
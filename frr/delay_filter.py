@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DelayChangeFilter:
+    def __init__(self, abs_threshold=0.0, rel_threshold=0.0, max_staleness=None, convert=None):
+        """
+        过滤时间片之间微小的延迟变化，减少每个时间片的tc修改量
+
+        与上一次实际下发的延迟（而不是上一个时间片的矩阵值）比较，因此连续的小幅变化累积超过阈值后一定会下发。
+        变化量超过 max(abs_threshold, rel_threshold × 已下发延迟) 时立即下发；
+        否则暂缓，暂缓超过max_staleness个时间片后无论变化多小都会下发。
+        默认阈值为0，只跳过换算到netem精度后没有变化的修改（如XW距离变化不足300）。
+
+        参数:
+        - abs_threshold: 绝对阈值（毫秒）
+        - rel_threshold: 相对阈值（如0.05表示5%）
+        - max_staleness: 暂缓的最大时间片数，为None时不限制
+        - convert: 矩阵值到netem延迟（毫秒）的换算函数，默认矩阵值即为毫秒
+        """
+        if abs_threshold < 0 or rel_threshold < 0:
+            raise ValueError(f"延迟变化阈值不能为负数: abs={abs_threshold}, rel={rel_threshold}")
+        if max_staleness is not None and max_staleness < 0:
+            raise ValueError(f"最大暂缓时间片数不能为负数: {max_staleness}")
+        self.abs_threshold = abs_threshold
+        self.rel_threshold = rel_threshold
+        self.max_staleness = max_staleness
+        self.convert = convert or (lambda value: value)
+        self.applied = {}   # (node1, node2) -> 已下发的延迟（毫秒）
+        self.pending = {}   # (node1, node2) -> 开始暂缓时的时间片序号
+        self.slice_index = 0
+
+    def reset(self, matrix, links):
+        """以矩阵中的值作为links的已下发延迟（首次建链或状态校正之后调用）"""
+        self.applied = {(i, j): self.convert(matrix[i, j]) for i, j in links}
+        self.pending = {}
+
+    def _decide(self, key, wanted):
+        """返回下发原因: 'unknown'、'threshold'、'stale'，不需要下发时返回None"""
+        applied = self.applied.get(key)
+        if applied is None:
+            # 下发状态未知（如上次修改失败），直接下发
+            return 'unknown'
+        change = abs(wanted - applied)
+        if change == 0:
+            return None
+        if change > max(self.abs_threshold, self.rel_threshold * abs(applied)):
+            return 'threshold'
+        since = self.pending.get(key, self.slice_index)
+        if self.max_staleness is not None and self.slice_index - since >= self.max_staleness:
+            return 'stale'
+        return None
+
+    def select(self, to_add, to_remove, to_modify, new_matrix):
+        """
+        从本时间片的差异中选出需要下发的延迟修改，并记录新建/删除链路
+
+        参数:
+        - to_add/to_remove/to_modify: find_differences的结果
+        - new_matrix: 本时间片的矩阵
+
+        返回:
+        - 需要下发的修改链路列表（包括之前暂缓、本时间片需要刷新的链路）
+        """
+        self.slice_index += 1
+        for node1, node2 in to_remove:
+            self.applied.pop((node1, node2), None)
+            self.pending.pop((node1, node2), None)
+        for node1, node2 in to_add:
+            self.applied[(node1, node2)] = self.convert(new_matrix[node1, node2])
+            self.pending.pop((node1, node2), None)
+
+        # 暂缓中的链路即使本时间片矩阵值没有变化，也要检查累积的漂移是否需要下发
+        candidates = [tuple(link) for link in to_modify]
+        seen = set(candidates)
+        candidates += [key for key in self.pending if key not in seen]
+
+        selected = []
+        flushed = 0
+        for key in candidates:
+            wanted = self.convert(new_matrix[key])
+            reason = self._decide(key, wanted)
+            if reason is not None:
+                flushed += reason == 'stale'
+                self.applied[key] = wanted
+                self.pending.pop(key, None)
+                selected.append(key)
+            elif wanted == self.applied.get(key):
+                # 漂移回到了已下发的值，无需再跟踪
+                self.pending.pop(key, None)
+            else:
+                self.pending.setdefault(key, self.slice_index)
+
+        if candidates:
+            logger.info(f"延迟变化过滤: 候选 {len(candidates)} 条，下发 {len(selected)} 条"
+                        f"（其中超时刷新 {flushed} 条），暂缓 {len(self.pending)} 条")
+        return selected
+
+    def record_interpolated(self, applied):
+        """
+        记录在时间片之间插值下发的延迟（见delay_interpolator），applied为 {(node1, node2): 毫秒}
+
+        插值下发的值不等于任何时间片的矩阵值，登记为暂缓，下一个时间片边界处无论矩阵值是否变化都重新检查
+        """
+        for key, delay in applied.items():
+            self.applied[key] = delay
+            self.pending.setdefault(key, self.slice_index)
+
+    def mark_failed(self, links):
+        """修改失败的链路下发状态未知，下一个时间片重新下发"""
+        for node1, node2 in links:
+            self.applied.pop((node1, node2), None)
+            self.pending.setdefault((node1, node2), self.slice_index)
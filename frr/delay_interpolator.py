@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+import time
+import threading
+import logging
+import numpy as np
+from topology_diff import diff_matrices
+
+logger = logging.getLogger(__name__)
+
+# 插值方式: linear为线性插值，spline为用前后相邻时间片确定切线的Catmull-Rom三次样条
+INTERPOLATION_MODES = ('linear', 'spline')
+
+
+def link_values(matrix, links):
+    """links在矩阵中的值，矩阵为None或链路不可见（<0）时为NaN"""
+    if matrix is None:
+        return np.full(len(links), np.nan)
+    if isinstance(matrix, np.ndarray):
+        index = np.array(links, dtype=int).reshape(-1, 2)
+        values = matrix[index[:, 0], index[:, 1]].astype(float)
+    else:
+        values = np.array([matrix[i, j] for i, j in links], dtype=float)
+    return np.where(values >= 0, values, np.nan)
+
+
+def interpolate(start, end, fraction, before=None, after=None, mode='linear'):
+    """
+    在相邻两个时间片的链路值之间插值
+
+    参数:
+    - start/end: 当前时间片和下一时间片的链路值数组
+    - fraction: 在时间片内的位置，0为当前时间片，1为下一时间片
+    - before/after: 上一时间片和下下时间片的链路值（spline使用），为None或NaN时该端的切线按线性处理
+    - mode: linear 或 spline
+
+    返回:
+    - 插值后的链路值数组
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    slope = end - start
+    if mode == 'linear':
+        return start + slope * fraction
+
+    # Catmull-Rom: 端点切线取相邻时间片的中心差分，两端都退化为slope时即为线性插值
+    m0 = slope if before is None else np.where(np.isnan(before), slope, (end - before) / 2)
+    m1 = slope if after is None else np.where(np.isnan(after), slope, (after - start) / 2)
+    t = fraction
+    value = (2 * t**3 - 3 * t**2 + 1) * start + (t**3 - 2 * t**2 + t) * m0 \
+        + (-2 * t**3 + 3 * t**2) * end + (t**3 - t**2) * m1
+    return np.maximum(value, 0.0)    # 三次样条可能越过0
+
+
+class DelayInterpolator:
+    def __init__(self, apply_func, delay_filter, mode='linear', step=1.0, tc_rate=200.0, symmetric=False):
+        """
+        在相邻两个时间片之间按子时间片的节奏原地修改链路延迟，使延迟随时间平滑变化而不是在时间片边界处阶跃
+
+        只插值在两个时间片中都存在且值有变化的链路，新建和删除的链路仍在时间片边界处理。
+        每一步按当前时刻在时间片内的位置计算目标延迟，与已下发延迟（delay_filter.applied）相差超过
+        过滤阈值的链路按偏差从大到小下发；每条链路修改延迟只需一条 qdisc change，
+        所有链路合计每秒的tc调用数不超过tc_rate，超出预算的链路留到下一步。
+        下发的延迟登记到delay_filter，时间片边界处与下一时间片的矩阵值重新比较。
+
+        参数:
+        - apply_func: apply_func({(node1, node2): 矩阵值}) 原地修改链路延迟，返回失败的链路列表
+        - delay_filter: 链路管理器的DelayChangeFilter，提供已下发延迟、阈值和矩阵值到毫秒的换算
+        - mode: 插值方式，linear 或 spline
+        - step: 子时间片步长（秒）
+        - tc_rate: 所有链路合计每秒最多的tc调用数
+        - symmetric: 矩阵是否对称（只插值上三角的链路）
+        """
+        if mode not in INTERPOLATION_MODES:
+            raise ValueError(f"未知的插值方式: {mode}")
+        if step <= 0 or tc_rate <= 0:
+            raise ValueError(f"插值步长和tc调用预算必须为正数: step={step}, tc_rate={tc_rate}")
+        self.apply_func = apply_func
+        self.delay_filter = delay_filter
+        self.mode = mode
+        self.step = step
+        self.tc_rate = tc_rate
+        self.symmetric = symmetric
+        self._thread = None
+        self._stop = threading.Event()
+        self._last = None           # 上一次插值的 (当前矩阵, 下一时间片矩阵)
+        self.steps = 0              # 下发过延迟修改的步数
+        self.updates = 0            # 下发的链路延迟修改数
+        self.limited = 0            # 受tc调用预算限制、有链路留到下一步的步数
+
+    def start(self, current, upcoming, start_time, duration, after_loader=None):
+        """
+        当前时间片应用完成后开始向下一时间片插值，之前的插值先停止
+
+        参数:
+        - current: 当前时间片的矩阵（链路管理器的current_matrix）
+        - upcoming: 下一时间片的矩阵
+        - start_time: 当前时间片开始应用的时刻（time.monotonic）
+        - duration: 时间片长度（秒），start_time + duration 时到达下一时间片
+        - after_loader: 可选，无参数的可调用对象，返回下下时间片的矩阵（spline在后台线程中调用）
+        """
+        self.stop()
+        # 上一次插值的目标正是当前矩阵时（没有跳转），它的起点即为上一时间片
+        before = self._last[0] if self._last is not None and self._last[1] is current else None
+        self._last = (current, upcoming)
+        if current is None or upcoming is None or current.shape != upcoming.shape:
+            return
+        links = [tuple(link) for link in diff_matrices(current, upcoming, self.symmetric)[2]]
+        if not links:
+            return
+        self._thread = threading.Thread(target=self._run, name='delay-interpolate', daemon=True,
+                                        args=(links, current, upcoming, before, after_loader, start_time, duration))
+        self._thread.start()
+
+    def stop(self):
+        """停止正在进行的插值（时间片边界处应用下一时间片之前调用）"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._stop.clear()
+
+    def _run(self, links, current, upcoming, before, after_loader, start_time, duration):
+        try:
+            self._interpolate(links, current, upcoming, before, after_loader, start_time, duration)
+        except Exception as e:
+            logger.error(f"链路延迟插值出错: {e}")
+
+    def _interpolate(self, links, current, upcoming, before, after_loader, start_time, duration):
+        start, end = link_values(current, links), link_values(upcoming, links)
+        before_values = after_values = None
+        if self.mode == 'spline':
+            if before is not None and before.shape == current.shape:
+                before_values = link_values(before, links)
+            after = after_loader() if after_loader is not None else None
+            if after is not None and after.shape == current.shape:
+                after_values = link_values(after, links)
+
+        flt = self.delay_filter
+        budget = max(1, int(self.tc_rate * self.step))
+        steps = updates = 0
+        while not self._stop.is_set():
+            tick = time.monotonic()
+            fraction = (tick - start_time) / duration
+            if fraction >= 1:
+                break
+            target = interpolate(start, end, max(fraction, 0.0), before_values, after_values, self.mode)
+            wanted = flt.convert(target)
+            applied = np.array([flt.applied.get(key, np.nan) for key in links], dtype=float)
+            # 下发状态未知的链路优先，其余按与已下发延迟的偏差从大到小
+            error = np.where(np.isnan(applied), np.inf, np.abs(wanted - applied))
+            threshold = np.maximum(flt.abs_threshold, flt.rel_threshold * np.abs(np.nan_to_num(applied)))
+            candidates = np.flatnonzero(error > threshold)
+            if candidates.size:
+                chosen = candidates[np.argsort(-error[candidates], kind='stable')[:budget]]
+                self.limited += candidates.size > chosen.size
+                delays = {links[k]: target[k] for k in chosen}
+                failed = {tuple(link) for link in self.apply_func(delays)}
+                flt.record_interpolated({links[k]: wanted[k] for k in chosen if links[k] not in failed})
+                flt.mark_failed([key for key in delays if key in failed])
+                steps += 1
+                updates += len(delays)
+            self._stop.wait(max(0.0, tick + self.step - time.monotonic()))
+        self.steps += steps
+        self.updates += updates
+        logger.info(f"时间片内延迟插值: {len(links)} 条链路，{steps} 步共下发 {updates} 条延迟修改")
+
+    def close(self):
+        """停止插值并输出统计"""
+        self.stop()
+        if self.steps:
+            logger.info(f"链路延迟插值（{self.mode}）: {self.steps} 步共下发 {self.updates} 条延迟修改，"
+                        f"其中 {self.limited} 步受tc调用预算（{self.tc_rate:g}次/秒）限制")
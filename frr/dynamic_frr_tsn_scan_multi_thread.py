@@ -8,6 +8,15 @@ from pathlib import Path
 import logging
 import threading
 from concurrent.futures import ThreadPoolExecutor
+from link_apply_engine import ParallelLinkApplier
+from topology_diff import diff_matrices, active_links, count_active_links, connected_columns
+from scan_pipeline import ScanPipeline
+from container_backend import make_backend, set_default_backend
+from link_manager_base import (LinkManagerBase, add_link_manager_arguments, check_link_manager_arguments,
+                               link_manager_options, run_link_manager)
+from link_shaping import install_commands, change_commands, shell_script
+from link_teardown import TSN_VETH_PATTERN, TsnLinkEndpoints
+from ip_allocator import TSN_LINK_POOLS
 
 # 配置日志
 logging.basicConfig(
@@ -16,66 +25,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class NetworkTopologyManager:
+class NetworkTopologyManager(TsnLinkEndpoints, LinkManagerBase):
+    # TSN×DG矩阵为全矩阵；本管理器负责的接口为TSN与YG/XW之间的veth，不包括TSN环形链路
+    symmetric_matrix = False
+    managed_veth_pattern = TSN_VETH_PATTERN
+    default_ip_pools = TSN_LINK_POOLS
+    event_source = 'tsn'
+
     def __init__(self, base_tsn_container_name="clab-sat-network-TSN",
                  base_yg_container_name="clab-sat-network-YG",
                  base_xw_container_name="clab-sat-network-XW",
-                 csv_dir='csv_tsn'
+                 csv_dir='csv_tsn',
+                 ip_state_file='ip_allocation_tsn.json',
+                 journal_file='topology_journal_tsn.jsonl',
+                 scan=True,
+                 pipeline_scan=False,
+                 prefetch=True,
+                 **options
                  ):
         """
         初始化网络拓扑管理器
         
         参数:
-        - base_container_name: 容器名称的前缀
+        - base_tsn/yg/xw_container_name: TSN、YG、XW容器名称的前缀
+        - scan: 是否在每个时间片应用后通过虚拟机控制台执行TSN域扫描
+        - pipeline_scan: 是否以流水线方式扫描（见scan_pipeline），每个TSN的链路提交完成即开始扫描，
+                         扫描在后台执行并与下一时间片的应用重叠；为False时在时间片应用完成后同步扫描全部TSN
+        - 其余参数见 LinkManagerBase.__init__，ip_pools默认为 TSN_LINK_POOLS，拓扑变化事件含分域成员变化
         """
         self.base_tsn_container_name = base_tsn_container_name
         self.base_yg_container_name = base_yg_container_name
         self.base_xw_container_name = base_xw_container_name
-        self.csv_dir = csv_dir
-        self.current_matrix = None
-        self.current_links = set()  # 存储当前已建立的链路 (node1, node2, ip_info)
-        self.ip_mapping = {}  # 存储节点对到IP地址的映射
+        self.scan_enabled = scan
+        self.scan_pipeline = ScanPipeline(self._scan_single_tsn_node) if scan and pipeline_scan else None
+        super().__init__(csv_dir, ip_state_file=ip_state_file, journal_file=journal_file, prefetch=prefetch,
+                         **options)
         logger.info("网络拓扑管理器初始化完成")
         
-    def read_matrix_from_csv(self, csv_file):
-        """从CSV文件读取链路可见性矩阵"""
-        try:
-            # 使用pandas读取CSV文件，不设置列名或索引列
-            df = pd.read_csv(csv_file, header=None, sep=',', dtype=float)
-            matrix = df.values
-            
-            # 验证矩阵格式
-            rows, cols = matrix.shape
-            
-            logger.info(f"成功读取矩阵，大小: {rows}x{cols}")
-            return matrix
-        except Exception as e:
-            logger.error(f"读取CSV文件错误: {e}")
-            logger.exception("详细错误信息:")
-            return None
-    
-
     def generate_ip_addresses(self, node1, node2):
         """根据节点编号生成唯一的IP地址对"""
         """同一链路的两端必须处于同一子网中，不同链路之间的端口ip必须处于不同子网中"""
-        """划分范围10.0.0.0/30 -- 10.0.15.0/30"""
-        original_node1, original_node2 = node1+1, node2+1
-        key = (original_node1, original_node2)
+        """子网由PairSubnetAllocator按节点对编号从地址池中确定性分配"""
+        key = (node1, node2)
         if key in self.ip_mapping:
             return self.ip_mapping[key]
         
-        # 计算第三个网段
-        third_byte = ( original_node1*original_node2 // 64 )
-        
-        # 计算第四个网段
-        fourth_byte = ( original_node1*original_node2 % 64 ) * 4 + 1
-        
-        # 生成第一个IP
-        ip1 = f"10.0.{third_byte}.{fourth_byte}/30"
-        
-        # 生成第二个IP (第四个字节+1)
-        ip2 = f"10.0.{third_byte}.{fourth_byte + 1}/30"
-
+        ip1, ip2 = self.ip_allocator.addresses(node1, node2)
         self.ip_mapping[key] = (ip1, ip2)
         
         return ip1, ip2
@@ -85,41 +80,28 @@ class NetworkTopologyManager:
         """创建两个节点之间的链路"""
 
         ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"创建链路: {label} (IP: {ip1} <-> {ip2})")
+        
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        pids = self.netns_cache.get_pids([tsn_container_name, dg_container_name])
+        n1_pid, n2_pid = pids.get(tsn_container_name, ""), pids.get(dg_container_name, "")
+        if n1_pid == "" or n2_pid == "":
+            logger.error(f"无法获取容器PID，跳过创建链路: {label}")
+            return False
 
-        original_node1 = node1+1
-        
-        if node2 < 12:
-            original_node2 = node2+1
-            logger.info(f"创建链路: TSN{original_node1} <-> YG{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"创建链路: TSN{original_node1} <-> XW{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
-            
-        
-        # 生成IP地址对
-        
-        
-        
         script = f"""
         # 创建veth pair
         sudo ip link add {veth_tsn} type veth peer name {veth_dg}
         
         # 配置第一个容器
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {tsn_container_name})
+        n1_pid={n1_pid}
         sudo ip link set {veth_tsn} netns $n1_pid
         sudo nsenter -t $n1_pid -n ip link set {veth_tsn} up
         sudo nsenter -t $n1_pid -n ip addr add {ip1} dev {veth_tsn}
         
         # 配置第二个容器
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {dg_container_name})
+        n2_pid={n2_pid}
         sudo ip link set {veth_dg} netns $n2_pid
         sudo nsenter -t $n2_pid -n ip link set {veth_dg} up
         sudo nsenter -t $n2_pid -n ip addr add {ip2} dev {veth_dg}
@@ -128,37 +110,26 @@ class NetworkTopologyManager:
         success = self.execute_script(script)
         if success:
             # 使用IP地址而不是子网ID来存储链路信息
-            self.current_links.add((node1, node2, f"{ip1}-{ip2}"))
+            with self._links_lock:
+                self.current_links.add((node1, node2, f"{ip1}-{ip2}"))
             return True
         return False
     
     def delete_link(self, node1, node2):
         """删除两个节点之间的链路"""
-        # 记录原始顺序的节点编号
-        original_node1 = node1+1
-        
         # 获取链路的IP地址，仅用于日志记录
         ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"删除链路: {label} (IP: {ip1} <-> {ip2})")
         
-        if node2 < 12:
-            original_node2 = node2+1
-            logger.info(f"删除链路: TSN{original_node1} <-> YG{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"删除链路: TSN{original_node1} <-> XW{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
-        
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        pids = self.netns_cache.get_pids([tsn_container_name, dg_container_name])
+        n1_pid, n2_pid = pids.get(tsn_container_name, ""), pids.get(dg_container_name, "")
+
         script = f"""
         # 尝试获取容器PID
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {tsn_container_name} 2>/dev/null)
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {dg_container_name} 2>/dev/null)
+        n1_pid={n1_pid}
+        n2_pid={n2_pid}
         
         # 检查容器是否存在
         if [ -z "$n1_pid" ] || [ "$n1_pid" = "<no value>" ]; then
@@ -178,62 +149,129 @@ class NetworkTopologyManager:
         
         success = self.execute_script(script)
         if success:
-            # 从当前链路集合中移除
+            self._forget_link(node1, node2)
+            return True
+        return False
+    
+    def _forget_link(self, node1, node2):
+        """从当前链路集合中移除指定节点对的链路"""
+        with self._links_lock:
             for link in list(self.current_links):
                 if (link[0] == node1 and link[1] == node2):
                     self.current_links.remove(link)
                     logger.debug(f"从当前链路集合中移除: {link}")
-            return True
-        return False
     
     def modify_link(self, node1, node2, delay):
-        """修改两个节点之间的链路延迟等属性参数"""
-        # 记录原始顺序的节点编号
-        original_node1 = node1+1
-        
-
-        real_delay = delay
-        
-        if node2 < 12:
-            original_node2 = node2+1
-            logger.info(f"设置链路延迟: TSN{original_node1} <-> YG{original_node2} (DELAY: {real_delay} ms)")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"设置链路延迟: TSN{original_node1} <-> XW{original_node2} (DELAY: {real_delay} ms)")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
+        """修改两个节点之间的链路延迟等属性参数（原地修改netem，整形层次不存在时再安装）"""
+        shape = self.link_shape.with_delay(delay)
         
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"设置链路延迟: {label} (DELAY: {shape.delay} ms)")
         
+        n1_pid = self.netns_cache.get_pid(tsn_container_name)
+        if n1_pid is None:
+            logger.error(f"无法获取容器PID，跳过设置延迟: {tsn_container_name}")
+            return False
         
+        # 对该链路单端（TSN端）设置延迟
         script = f"""
-        # 在添加规则前，清空可能存在的旧规则
-        docker exec "{tsn_container_name}" bash -c "tc qdisc del dev {veth_tsn} root"
-        docker exec "{dg_container_name}" bash -c "tc qdisc del dev {veth_dg} root"  
-        
-        # 对该链路单端添加延迟控制
-        # TODO 这里也可以设置带宽
-        docker exec "{tsn_container_name}" bash -c "
-        tc qdisc add dev {veth_tsn} root netem delay {real_delay}ms" || {{
-            echo "添加规则失败，请检查接口或参数。"
-            exit 1
-        }}
+        n1_pid={n1_pid}
+        {shell_script("sudo nsenter -t $n1_pid -n", veth_tsn, shape, self.link_shape)}
+        """
+        
+        return self.execute_script(script)
+    
+    def plan_create_link(self, executor, node1, node2, delay=None, admin_up=True):
+        """
+        将创建链路（及可选的延迟设置）登记到批处理执行器
 
-        # docker exec "{dg_container_name}" bash -c "
-        # tc qdisc add dev {veth_dg} root netem delay {real_delay}ms" || {{
-        #     echo "添加规则失败，请检查接口或参数。"
-        #     exit 1
-        # }}
+        参数:
+        - admin_up: 为False时接口保持down状态（预创建下一时间片的链路）
         """
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"{'创建' if admin_up else '预创建'}链路: {label} (IP: {ip1} <-> {ip2})")
+        
+        key = (node1, node2)
+        executor.add_veth(key, tsn_container_name, veth_tsn, dg_container_name, veth_dg)
+        if admin_up:
+            executor.ip(key, tsn_container_name, f"link set {veth_tsn} up")
+        executor.ip(key, tsn_container_name, f"addr add {ip1} dev {veth_tsn}")
+        if admin_up:
+            executor.ip(key, dg_container_name, f"link set {veth_dg} up")
+        executor.ip(key, dg_container_name, f"addr add {ip2} dev {veth_dg}")
+        if delay is not None:
+            self.plan_modify_link(executor, node1, node2, delay, install=True)
+    
+    def plan_set_link_state(self, executor, node1, node2, state):
+        """将启用(up)或停用(down)链路两端接口的操作登记到批处理执行器"""
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"{'启用' if state == 'up' else '停用'}链路: {label}")
+        
+        key = (node1, node2)
+        executor.ip(key, tsn_container_name, f"link set {veth_tsn} {state}")
+        executor.ip(key, dg_container_name, f"link set {veth_dg} {state}")
+    
+    def plan_delete_link(self, executor, node1, node2):
+        """将删除链路的操作登记到批处理执行器"""
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"删除链路: {label} (IP: {ip1} <-> {ip2})")
         
-        success = self.execute_script(script)
+        # 删除任一端即会同时删除veth pair，另一端的删除失败可忽略
+        key = (node1, node2)
+        executor.ip(key, tsn_container_name, f"link delete {veth_tsn}", tolerant=True)
+        executor.ip(key, dg_container_name, f"link delete {veth_dg}", tolerant=True)
+    
+    def plan_modify_link(self, executor, node1, node2, delay, install=False):
+        """
+        将修改链路延迟的操作登记到批处理执行器（仅在TSN一端设置延迟）
 
-        return success
+        参数:
+        - install: 为True时安装整形层次（新建链路或校正状态），否则用一条 qdisc change 原地修改
+        """
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        shape = self.link_shape.with_delay(delay)
+        logger.info(f"设置链路延迟: {label} (DELAY: {shape.delay} ms)")
+        
+        key = (node1, node2)
+        commands = install_commands(veth_tsn, shape) if install else change_commands(veth_tsn, shape, self.link_shape)
+        for command in commands:
+            executor.tc(key, tsn_container_name, command)
+    
+    def apply_differences(self, to_add, to_remove, to_modify, new_matrix, scan_slice=None):
+        """
+        执行一个时间片内的全部链路差异
+
+        参数:
+        - scan_slice: 流水线扫描的时间片（ScanSlice），批处理模式下每个TSN的链路所在命名空间提交完成后即释放其扫描
+
+        返回:
+        - 执行失败的链路列表
+        """
+        if scan_slice is None or not self.batch_mode:
+            return super().apply_differences(to_add, to_remove, to_modify, new_matrix)
+        # TSN的扫描等待其全部链路两端的命名空间提交完成，没有链路变化的TSN立即开始扫描
+        for node1, node2 in list(to_remove) + list(to_add) + list(to_modify):
+            _, tsn_container_name, _, dg_container_name, _ = self.link_endpoints(node1, node2)
+            scan_slice.hold(node1, (tsn_container_name, dg_container_name))
+        scan_slice.release_unheld()
+        return super().apply_differences(to_add, to_remove, to_modify, new_matrix,
+                                         on_namespace_done=scan_slice.namespace_done)
+
+    def managed_containers(self, matrix):
+        """返回矩阵涉及的全部容器名（前12列为YG，其余为XW）"""
+        rows, cols = matrix.shape
+        containers = [f"{self.base_tsn_container_name}{n+1}" for n in range(rows)]
+        containers += [f"{self.base_yg_container_name}{n+1}" for n in range(min(cols, self.YG_COLUMNS))]
+        containers += [f"{self.base_xw_container_name}{n+1}" for n in range(max(cols - self.YG_COLUMNS, 0))]
+        return containers
+    
+    def link_interfaces(self, node1, node2):
+        """返回链路两端接口 [(容器名, veth名, 地址)]，第一项为设置延迟的TSN端"""
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        _, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        return [(tsn_container_name, veth_tsn, ip1), (dg_container_name, veth_dg, ip2)]
     
     def execute_script(self, script):
         """执行bash脚本"""
@@ -247,128 +285,116 @@ class NetworkTopologyManager:
             return False
     
     def find_differences(self, old_matrix, new_matrix):
-        """对比两个矩阵，找出需要添加和删除的链路"""
-        to_add = []
-        to_remove = []
-        to_modify = []
-        # 默认矩阵尺寸不随时间片变化
-        rows, cols = new_matrix.shape
-        
-        for i in range(rows):
-            for j in range(cols):  # 处理TSN-DG全矩阵
-                # 原本没有链路（值<0），现在有了（值>=0）-> 添加
-                if old_matrix[i, j] < 0 and new_matrix[i, j] >= 0:
-                    to_add.append((i, j))
-                    logger.debug(f"需要添加链路: {i} <-> {j} (值: {new_matrix[i, j]})")
-                
-                # 原本有链路（值>=0），现在没了（值<0）-> 删除  
-                elif old_matrix[i, j] >= 0 and new_matrix[i, j] < 0:
-                    to_remove.append((i, j))
-                    logger.debug(f"需要删除链路: {i} <-> {j}")
-                
-                # 原本有链路（值>=0），现在有了（值>=0）但值不同-> 修改
-                elif old_matrix[i, j] >= 0 and new_matrix[i, j] >= 0 and old_matrix[i, j] != new_matrix[i, j]:
-                    to_modify.append((i, j))
-                    logger.debug(f"需要修改链路: {i} <-> {j} (原值: {old_matrix[i, j]}, 新值: {new_matrix[i, j]})")
+        """对比两个矩阵，找出需要添加和删除的链路（处理TSN-DG全矩阵）"""
+        to_add, to_remove, to_modify = diff_matrices(old_matrix, new_matrix)
         
         logger.info(f"找到 {len(to_add)} 条需要添加的链路，{len(to_remove)} 条需要删除的链路，{len(to_modify)} 条需要修改的链路")
         return to_add, to_remove, to_modify
     
-    def validate_csv_file(self, csv_file):
-        """验证CSV文件的格式是否符合要求"""
-        try:
-            # 检查文件是否存在
-            if not os.path.exists(csv_file):
-                logger.error(f"CSV文件不存在: {csv_file}")
-                return False
-                
-            # 检查文件是否为空
-            if os.path.getsize(csv_file) == 0:
-                logger.error(f"CSV文件为空: {csv_file}")
-                return False
-                
-            # 尝试读取文件内容
-            with open(csv_file, 'r') as f:
-                first_line = f.readline().strip()
-                # 检查第一行是否包含逗号（CSV格式）
-                if ',' not in first_line:
-                    logger.warning(f"CSV文件可能格式不正确，第一行未发现逗号: {first_line}")
-                    
-            return True
-        except Exception as e:
-            logger.error(f"验证CSV文件出错: {e}")
-            return False
-    
     def process_links_in_batches(self, links, operation, batch_size=20, new_matrix=None):
-        """分批处理链路操作，支持创建或删除"""
+        """
+        并行处理链路操作，支持创建、删除或修改
+        
+        使用有界线程池并发执行，同一容器的操作通过容器锁串行，
+        不同容器之间的操作并行，并发度根据宿主机负载自适应调整（batch_size为初始并发度）
+
+        返回:
+        - 失败的链路列表
+        """
         total = len(links)
-        success_count = 0
+        logger.info(f"开始{operation}，共 {total} 个链路，初始并发度 {batch_size}")
         
-        for i in range(0, total, batch_size):
-            batch = links[i:i+batch_size]
-            logger.info(f"处理批次 {i//batch_size + 1}/{(total+batch_size-1)//batch_size}，{operation}链路...")
+        def make_task(node1, node2):
+            _, tsn_container_name, _, dg_container_name, _ = self.link_endpoints(node1, node2)
             
-            for node1, node2 in batch:
-                if operation == "create_link": # "创建"
-                    success = self.create_link(node1, node2)
-                    if success and new_matrix is not None:
+            def task():
+                success = False
+                with self.metrics.timer(operation, tsn_container_name) as timing:
+                    if operation == "create_link": # "创建"
+                        success = self.create_link(node1, node2)
+                        if success and new_matrix is not None:
+                            delay = new_matrix[node1, node2]
+                            success = self.modify_link(node1, node2, delay)
+                    elif operation == "delete_link":  # "删除"
+                        success = self.delete_link(node1, node2)
+                    elif operation == "modify_link":  # "修改"
                         delay = new_matrix[node1, node2]
                         success = self.modify_link(node1, node2, delay)
-                elif operation == "delete_link":  # "删除"
-                    success = self.delete_link(node1, node2)
-                elif operation == "modify_link":  # "修改"
-                    delay = new_matrix[node1, node2]
-                    success = self.modify_link(node1, node2, delay)
-
-                if success:
-                    success_count += 1
-                    
-            # 批处理之间短暂等待，避免系统过载
-            if i + batch_size < total:
-                time.sleep(0.5)
+                    timing.failures = 0 if success else 1
+                return success
+            return (tsn_container_name, dg_container_name), task
+        
+        applier = ParallelLinkApplier(initial_workers=batch_size)
+        results = applier.run([make_task(node1, node2) for node1, node2 in links], description=operation)
+        success_count = sum(1 for result in results if result)
         
         logger.info(f"{operation}链路完成: {success_count}/{total} 成功")
-        return success_count
+        return [tuple(link) for link, result in zip(links, results) if not result]
     
-    def update_topology(self, csv_file):
+    def update_topology(self, csv_file, slice_name=None):
         """根据CSV文件更新网络拓扑"""
         new_matrix = self.read_matrix_from_csv(csv_file)
         if new_matrix is None:
             logger.error("无法更新拓扑：读取矩阵失败")
             return False
-        
+        return self.apply_matrix(new_matrix, slice_name)
+
+    def apply_matrix(self, new_matrix, slice_name=None, differences=None):
+        """
+        将已读取的可见性矩阵（稠密数组或SparseTopology）应用到网络拓扑
+
+        参数:
+        - slice_name: 时间片名称，流水线扫描时用于标识本时间片的扫描
+        - differences: 预先计算的 find_differences(current_matrix, new_matrix) 结果，为None时在此计算
+        """
+        scan_slice = None
+        if self.scan_pipeline is not None:
+            scan_slice = self.scan_pipeline.begin_slice(slice_name, new_matrix)
         if self.current_matrix is not None:
             # 找出需要添加和删除的链路
-            to_add, to_remove, to_modify = self.find_differences(self.current_matrix, new_matrix)
-            
-            # 使用批处理删除旧链路
-            if to_remove:
-                self.process_links_in_batches(to_remove, "delete_link", new_matrix=new_matrix)
-            
-            # 使用批处理添加新链路
-            if to_add:
-                self.process_links_in_batches(to_add, "create_link", new_matrix=new_matrix)
-
-            # 使用批处理修改链路
-            if to_modify:
-                self.process_links_in_batches(to_modify, "modify_link", new_matrix=new_matrix)
+            with self.metrics.timer('diff'):
+                if differences is None:
+                    differences = self.find_differences(self.current_matrix, new_matrix)
+                to_add, to_remove, to_modify = differences
+                to_modify = self.delay_filter.select(to_add, to_remove, to_modify, new_matrix)
+            with self.metrics.timer('apply', ops=len(to_add) + len(to_remove) + len(to_modify)) as timing:
+                failed = self.apply_differences(to_add, to_remove, to_modify, new_matrix, scan_slice)
+                timing.failures = len(failed)
+            self.last_slice_stats = {'add': len(to_add), 'remove': len(to_remove), 'modify': len(to_modify)}
+            failed_set = set(failed)
+            self.delay_filter.mark_failed([link for link in to_modify if tuple(link) in failed_set])
+            if failed and self.auto_reconcile:
+                # 部分链路操作失败，内存状态可能与容器内实际状态不一致
+                logger.warning(f"{len(failed)} 条链路操作失败，根据容器内实际状态校正拓扑")
+                failed = self.reconcile(new_matrix)
+            self.last_failed_links = failed
                     
+        elif self.auto_reconcile or self._resume_reconcile:
+            # 启动时不假设容器处于初始状态（如上次运行中途退出），直接校正到目标时间片
+            logger.info("根据容器内实际状态校正到首个时间片")
+            self._resume_reconcile = False
+            self.last_failed_links = self.reconcile(new_matrix)
+            self.last_slice_stats = {'reconcile': count_active_links(new_matrix, symmetric=self.symmetric_matrix)}
         else:
             # 第一次运行，初始化所有链路
             rows,cols = new_matrix.shape
             logger.info(f"首次初始化，矩阵大小: {rows}x{cols}")
             
-            links_to_create = []
-            for i in range(rows):
-                for j in range(cols):  # 处理TSN-DG全矩阵
-                    if new_matrix[i, j] >= 0:  # 如果有链路
-                        links_to_create.append((i, j))
+            links_to_create = active_links(new_matrix)  # 处理TSN-DG全矩阵
             
-            if links_to_create:
-                self.process_links_in_batches(links_to_create, "create_link", new_matrix=new_matrix)
+            with self.metrics.timer('apply', ops=len(links_to_create)) as timing:
+                self.last_failed_links = self.apply_differences(links_to_create, [], [], new_matrix, scan_slice) if links_to_create else []
+                timing.failures = len(self.last_failed_links)
+            self.last_slice_stats = {'add': len(links_to_create), 'remove': 0, 'modify': 0}
+            self.delay_filter.reset(new_matrix, links_to_create)
         
         # 更新当前矩阵
         self.current_matrix = new_matrix
+        # 持久化本时间片新分配的链路子网
+        self.ip_allocator.save()
+        if scan_slice is not None:
+            # 逐链路模式、状态校正以及链路操作失败的TSN在时间片应用结束后开始扫描
+            scan_slice.release_all()
         # 显示当前拓扑状态
         self.print_topology_status()
         return True
@@ -380,67 +406,27 @@ class NetworkTopologyManager:
             return
         
         rows,cols = self.current_matrix.shape
-        active_links = 0
-        
-        for i in range(rows):
-            for j in range(cols):
-                if self.current_matrix[i, j] >= 0:
-                    active_links += 1
+        active_link_count = count_active_links(self.current_matrix)
         
         logger.info(f"当前网络拓扑状态:")
         logger.info(f"  容器数量: {rows}TSN-{cols}DG")
-        logger.info(f"  活跃链路: {active_links}")
+        logger.info(f"  活跃链路: {active_link_count}")
         logger.info(f"  总链路容量: {rows * cols}")
     
-    def process_csv_directory(self, directory, interval=20):    
-        """处理目录中的所有CSV文件，按时间间隔更新网络拓扑"""
-        directory = Path(directory)
-        
-        # 尝试以数字顺序排序CSV文件（例如output_1.csv, output_2.csv...）
-        def get_csv_number(filename):
-            # 从文件名中提取数字
-            match = re.search(r'(\d+)', filename.stem)
-            if match:
-                return int(match.group(1))
-            return float('inf')  # 没有数字的放到最后
-        
-        # 获取目录中的所有CSV文件并排序
-        csv_files = sorted([f for f in directory.glob("*.csv")], key=get_csv_number)
-        
-        if not csv_files:
-            logger.error(f"目录 {directory} 中没有找到CSV文件")
-            return
-         
-        logger.info(f"找到 {len(csv_files)} 个CSV文件待处理，排序后的顺序:")
-        for i, f in enumerate(csv_files):
-            logger.info(f"  {i+1}. {f.name}")
-        
-        # 处理每个CSV文件
-        for i, csv_file in enumerate(csv_files):
-            logger.info(f"\n{'='*50}")
-            logger.info(f"处理文件 [{i+1}/{len(csv_files)}]: {csv_file}")
-            
-            # 验证并更新网络拓扑
-            if self.validate_csv_file(csv_file):
-                start_time = time.time()
-                success = self.update_topology(csv_file)
-                elapsed = time.time() - start_time
-                
-                if success:
-                    logger.info(f"成功应用拓扑: {csv_file.name} (耗时: {elapsed:.2f}秒)")
-                    # 添加扫描步骤：在建链完成后执行扫描
-                    logger.info("开始执行本轮TSN域扫描...")
-                    scan_start_time = time.time()
-                    self.scan_connected_nodes()  # 执行扫描
-                    scan_elapsed = time.time() - scan_start_time
-                    logger.info(f"扫描完成 (耗时: {scan_elapsed:.2f}秒)")
-                else:
-                    logger.error(f"应用拓扑失败: {csv_file.name}")
-            
-            # 等待指定的时间间隔
-            if i < len(csv_files) - 1:
-                logger.info(f"等待 {interval} 秒后处理下一个文件...")
-                time.sleep(interval)
+    def after_slice(self, name):
+        """在建链完成后执行扫描（流水线扫描已在应用过程中按TSN开始）"""
+        if self.scan_enabled and self.scan_pipeline is None:
+            logger.info("开始执行本轮TSN域扫描...")
+            scan_start_time = time.time()
+            self.scan_connected_nodes()  # 执行扫描
+            scan_elapsed = time.time() - scan_start_time
+            logger.info(f"扫描完成 (耗时: {scan_elapsed:.2f}秒)")
+
+    def finish_slices(self):
+        """时间片序列结束后，除基类的清理外等待流水线扫描完成"""
+        super().finish_slices()
+        if self.scan_pipeline is not None:
+            self.scan_pipeline.close()
 
     def vm_sat_ip_map(self,type,idx):
         """给定指定tsn编号，返回tsn对应vm名称和ip"""
@@ -487,8 +473,8 @@ class NetworkTopologyManager:
         
         logger.info("所有TSN节点扫描完成")
 
-    def _scan_single_tsn_node(self, tsn_idx):
-        """扫描单个TSN节点连接的所有低轨卫星节点"""
+    def _scan_single_tsn_node(self, tsn_idx, matrix=None):
+        """扫描单个TSN节点连接的所有低轨卫星节点，matrix为分域表快照，默认使用当前矩阵"""
 
         original_tsn_idx = tsn_idx + 1  # 转换为原始节点编号
         tsn_container_name = f"{self.base_tsn_container_name}{original_tsn_idx}"
@@ -501,22 +487,23 @@ class NetworkTopologyManager:
         # 获取当前TSN的VM信息
         tsn_vm_name, tsn_vm_ip = self.vm_sat_ip_map("TSN",original_tsn_idx)
         
-        for dg_idx in range(self.current_matrix.shape[1]):
-            if self.current_matrix[tsn_idx, dg_idx] >= 0:
-                if dg_idx < 12:  # YG节点
-                    original_dg_idx = dg_idx + 1
-                    # dg_container_name = f"{self.base_yg_container_name}{original_dg_idx}"
-                    # connected_nodes.append((dg_container_name, "YG", original_dg_idx))
-                    dg_type = "YG"
-                else:  # XW节点
-                    original_dg_idx = dg_idx - 12 + 1
-                    # dg_container_name = f"{self.base_xw_container_name}{original_dg_idx}"
-                    # connected_nodes.append((dg_container_name, "XW", original_dg_idx))
-                    dg_type = "XW"
-
-                dg_vm_name, dg_vm_ip = self.vm_sat_ip_map(dg_type,original_dg_idx)
-                dg_ips.append(dg_vm_ip)
-                dg_info.append(f"{dg_type}{original_dg_idx}({dg_vm_ip})")
+        if matrix is None:
+            matrix = self.current_matrix
+        for dg_idx in connected_columns(matrix, tsn_idx):
+            if dg_idx < 12:  # YG节点
+                original_dg_idx = dg_idx + 1
+                # dg_container_name = f"{self.base_yg_container_name}{original_dg_idx}"
+                # connected_nodes.append((dg_container_name, "YG", original_dg_idx))
+                dg_type = "YG"
+            else:  # XW节点
+                original_dg_idx = dg_idx - 12 + 1
+                # dg_container_name = f"{self.base_xw_container_name}{original_dg_idx}"
+                # connected_nodes.append((dg_container_name, "XW", original_dg_idx))
+                dg_type = "XW"
+
+            dg_vm_name, dg_vm_ip = self.vm_sat_ip_map(dg_type,original_dg_idx)
+            dg_ips.append(dg_vm_ip)
+            dg_info.append(f"{dg_type}{original_dg_idx}({dg_vm_ip})")
 
         if not dg_ips:
             logger.info(f"TSN{original_tsn_idx} 没有连接的低轨卫星节点")  
@@ -658,15 +645,28 @@ def main():
                         help='YG容器名称前缀，默认为clab-sat-network-YG')
     parser.add_argument('--container-xw-prefix', default='clab-sat-network-XW',
                         help='XW容器名称前缀，默认为clab-sat-network-XW')
+    add_link_manager_arguments(parser, 'tsn')
+    parser.add_argument('--no-scan', action='store_true',
+                        help='不执行每个时间片之后的TSN域扫描（非docker后端时自动关闭）')
+    parser.add_argument('--pipeline-scan', action='store_true',
+                        help='流水线扫描: 每个TSN的链路提交完成即开始扫描，扫描在后台执行并与下一时间片的应用重叠')
     args = parser.parse_args()
+
+    check_link_manager_arguments(parser, args)
+    backend = make_backend(args.backend)
+    set_default_backend(backend)
     
     logger.info(f"启动网络拓扑管理，处理目录: {args.csv_dir}，更新间隔: {args.interval}秒")
 
     manager = NetworkTopologyManager(base_tsn_container_name=args.container_tsn_prefix,
                                     base_yg_container_name=args.container_yg_prefix,
                                     base_xw_container_name=args.container_xw_prefix,
-                                    )
-    manager.process_csv_directory(args.csv_dir, args.interval)
+                                    csv_dir=args.csv_dir,
+                                    # TSN域扫描通过虚拟机控制台进行，离线后端下没有虚拟机
+                                    scan=not args.no_scan and args.backend == 'docker',
+                                    pipeline_scan=args.pipeline_scan,
+                                    **link_manager_options(args))
+    run_link_manager(manager, args, backend)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,11 @@
 import pandas as pd
-import subprocess
 import logging
+from topology_diff import active_links
+from link_batch_executor import LinkBatchExecutor
+from link_teardown import LinkTeardown, TsnLinkEndpoints, list_containers
+from container_backend import BACKENDS, make_backend, set_default_backend
+from topology_journal import TopologyJournal, load_matrix
 import os
-import time
 
 # 配置日志
 logging.basicConfig(
@@ -11,7 +14,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class NetworkTopologyManager:
+class NetworkTopologyManager(TsnLinkEndpoints):
     def __init__(self, base_tsn_container_name="clab-sat-network-TSN",
                  base_yg_container_name="clab-sat-network-YG",
                  base_xw_container_name="clab-sat-network-XW"):
@@ -21,7 +24,6 @@ class NetworkTopologyManager:
         self.base_tsn_container_name = base_tsn_container_name
         self.base_yg_container_name = base_yg_container_name
         self.base_xw_container_name = base_xw_container_name
-        self.ip_mapping = {}  # 节点对到IP地址映射（用于日志）
         logger.info("网络拓扑管理器初始化完成")
 
     def read_matrix_from_csv(self, csv_file):
@@ -36,129 +38,121 @@ class NetworkTopologyManager:
             logger.error(f"读取CSV文件错误: {e}")
             return None
 
-    def generate_ip_addresses(self, node1, node2):
-        """根据节点编号生成唯一的IP地址对，用于日志显示"""
-        original_node1, original_node2 = node1 + 1, node2 + 1
-        key = (original_node1, original_node2)
-        if key in self.ip_mapping:
-            return self.ip_mapping[key]
-        third_byte = (original_node1 * original_node2) // 64
-        fourth_byte = (original_node1 * original_node2) % 64 * 4 + 1
-        ip1 = f"10.0.{third_byte}.{fourth_byte}/30"
-        ip2 = f"10.0.{third_byte}.{fourth_byte + 1}/30"
-        self.ip_mapping[key] = (ip1, ip2)
-        return ip1, ip2
-
-    def delete_link(self, node1, node2):
-        """删除两个节点之间的链路"""
-        original_node1 = node1 + 1
-        ip1, ip2 = self.generate_ip_addresses(node1, node2)
-
-        if node2 < 12:
-            original_node2 = node2 + 1
-            logger.info(f"删除链路: TSN{original_node1} <-> YG{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"删除链路: TSN{original_node1} <-> XW{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
-
-        script = f"""
-        # 删除宿主机上的veth接口，忽略错误
-        sudo ip link del {veth_tsn} 2>/dev/null || true
-        sudo ip link del {veth_dg} 2>/dev/null || true
-
-        # 获取容器PID
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {tsn_container_name} 2>/dev/null)
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {dg_container_name} 2>/dev/null)
-
-        # 删除容器内接口，容器不存在或接口不存在不报错
-        if [ -n "$n1_pid" ] && [ "$n1_pid" != "<no value>" ]; then
-            sudo nsenter -t $n1_pid -n ip link del {veth_tsn} 2>/dev/null || true
-        else
-            echo "容器 {tsn_container_name} 不存在或无法获取PID"
-        fi
-
-        if [ -n "$n2_pid" ] && [ "$n2_pid" != "<no value>" ]; then
-            sudo nsenter -t $n2_pid -n ip link del {veth_dg} 2>/dev/null || true
-        else
-            echo "容器 {dg_container_name} 不存在或无法获取PID"
-        fi
-        """
-        return self.execute_script(script)
-
-    def execute_script(self, script):
-        """执行bash脚本"""
-        try:
-            result = subprocess.run(script, shell=True, check=True,
-                                    stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-            logger.debug(f"脚本执行成功，输出: {result.stdout.decode().strip()}")
-            return True
-        except subprocess.CalledProcessError as e:
-            logger.error(f"执行脚本错误: {e}")
-            logger.error(f"错误输出: {e.stderr.decode().strip() if e.stderr else 'N/A'}")
-            return False
-
     def delete_links_from_csv(self, csv_file):
-        """根据CSV文件删除所有非负标记的链路"""
+        """根据CSV文件删除所有非负标记的链路，每个命名空间一次ip批处理，不同命名空间并行"""
         matrix = self.read_matrix_from_csv(csv_file)
         if matrix is None:
             logger.error("读取矩阵失败，无法删除链路")
             return False
 
+        links_to_delete = active_links(matrix)
+        logger.info(f"准备删除 {len(links_to_delete)} 条链路")
+
+        executor = LinkBatchExecutor()
+        for node1, node2 in links_to_delete:
+            _, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+            # 删除任一端即会同时删除veth pair，接口已不存在时不报错
+            executor.ip((node1, node2), tsn_container_name, f"link delete {veth_tsn}", tolerant=True)
+            executor.ip((node1, node2), dg_container_name, f"link delete {veth_dg}", tolerant=True)
+        results = executor.commit() if len(executor) else {}
+        success_count = sum(1 for success in results.values() if success)
+        logger.info(f"链路删除完成: 成功 {success_count}/{len(results)}")
+
+        # 逐链路脚本在移入容器前中断时会在宿主机上留下veth，同样清理
+        host_deleted, host_failed = LinkTeardown('tsn').teardown_host()
+        if host_deleted or host_failed:
+            logger.info(f"宿主机残留veth清理: 删除 {host_deleted} 个，失败 {host_failed} 个")
+        return success_count == len(results) and host_failed == 0
+
+    def container_prefixes(self, kind):
+        """返回指定链路类型涉及的容器名前缀"""
+        if kind == 'xw':
+            return [self.base_xw_container_name]
+        return [self.base_tsn_container_name, self.base_yg_container_name, self.base_xw_container_name]
+
+    def teardown_all(self, kind='tsn'):
+        """
+        不依赖CSV，删除所有运行中容器内按命名规则匹配的动态链路
+
+        参数:
+        - kind: tsn（TSN与YG/XW之间的链路）、xw（XW星间链路）或 all
+        """
+        containers = list_containers(self.container_prefixes(kind))
+        if not containers:
+            logger.error("没有找到运行中的容器")
+            return False
+        logger.info(f"在 {len(containers)} 个容器中拆除 {kind} 链路")
+        _, failed, unreachable = LinkTeardown(kind).teardown(containers)
+        return failed == 0 and not unreachable
+
+    def teardown_from_journal(self, journal_file, kind='tsn'):
+        """
+        根据链路管理脚本日志中的矩阵快照确定涉及的容器，删除其中按命名规则匹配的动态链路
+
+        快照可能落后于中途退出时的实际状态，因此按命名规则而不是快照中的链路删除
+        """
+        journal = TopologyJournal(journal_file)
+        try:
+            name, matrix = load_matrix(journal.matrix_file)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"读取日志 {journal_file} 的矩阵快照失败: {e}")
+            return False
         rows, cols = matrix.shape
-        links_to_delete = []
-        for i in range(rows):
-            for j in range(cols):
-                if matrix[i, j] >= 0:
-                    links_to_delete.append((i, j))
-
-        total = len(links_to_delete)
-        logger.info(f"准备删除 {total} 条链路")
-        success_count = 0
-        batch_size = 20
-        for i in range(0, total, batch_size):
-            batch = links_to_delete[i:i+batch_size]
-            logger.info(f"删除链路批次 {i//batch_size + 1}/{(total + batch_size - 1)//batch_size}")
-            for node1, node2 in batch:
-                if self.delete_link(node1, node2):
-                    success_count += 1
-            time.sleep(0.5)  # 防止系统过载
-
-        logger.info(f"链路删除完成: 成功 {success_count}/{total}")
-        return success_count == total
+        if kind == 'xw':
+            containers = [f"{self.base_xw_container_name}{n+1}" for n in range(rows)]
+        else:
+            containers = [f"{self.base_tsn_container_name}{n+1}" for n in range(rows)]
+            containers += [f"{self.base_yg_container_name}{n+1}" for n in range(min(cols, self.YG_COLUMNS))]
+            containers += [f"{self.base_xw_container_name}{n+1}" for n in range(max(cols - self.YG_COLUMNS, 0))]
+        logger.info(f"日志最后的矩阵快照: {name}，涉及 {len(containers)} 个容器")
+        _, failed, unreachable = LinkTeardown(kind).teardown(containers)
+        return failed == 0 and not unreachable
 
 def main():
     import argparse
 
-    parser = argparse.ArgumentParser(description='基于CSV文件删除原有网络链路')
-    parser.add_argument('--csv_file', required=True, help='待处理的CSV文件路径')
+    parser = argparse.ArgumentParser(description='删除链路管理脚本创建的网络链路')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv_file', help='根据CSV文件中的链路删除')
+    source.add_argument('--all', action='store_true',
+                        help='快速拆除: 删除所有运行中容器内按命名规则匹配的动态链路，不依赖CSV')
+    source.add_argument('--journal', help='快速拆除: 根据链路管理脚本日志的矩阵快照确定容器，删除其中的动态链路')
+    parser.add_argument('--kind', choices=['tsn', 'xw', 'all'], default='tsn',
+                        help='快速拆除的链路类型: tsn为TSN与YG/XW之间的链路，xw为XW星间链路，默认tsn')
     parser.add_argument('--container-tsn-prefix', default='clab-sat-network-TSN',
                         help='TSN容器名称前缀，默认clab-sat-network-TSN')
     parser.add_argument('--container-yg-prefix', default='clab-sat-network-YG',
                         help='YG容器名称前缀，默认clab-sat-network-YG')
     parser.add_argument('--container-xw-prefix', default='clab-sat-network-XW',
                         help='XW容器名称前缀，默认clab-sat-network-XW')
+    parser.add_argument('--backend', choices=BACKENDS, default='docker',
+                        help='容器后端: docker为containerlab容器，netns为同名的ip netns命名空间，dry-run只记录命令，默认docker')
     args = parser.parse_args()
 
-    if not os.path.isfile(args.csv_file):
+    if args.csv_file and not os.path.isfile(args.csv_file):
         logger.error(f"指定的CSV文件不存在: {args.csv_file}")
         return
+    if args.journal and args.kind == 'all':
+        logger.error("--journal 只能配合 --kind tsn 或 --kind xw 使用")
+        return
 
+    backend = make_backend(args.backend)
+    set_default_backend(backend)
     manager = NetworkTopologyManager(
         base_tsn_container_name=args.container_tsn_prefix,
         base_yg_container_name=args.container_yg_prefix,
         base_xw_container_name=args.container_xw_prefix
     )
 
-    logger.info(f"开始处理CSV文件: {args.csv_file}")
-    success = manager.delete_links_from_csv(args.csv_file)
+    if args.all:
+        success = manager.teardown_all(args.kind)
+    elif args.journal:
+        success = manager.teardown_from_journal(args.journal, args.kind)
+    else:
+        logger.info(f"开始处理CSV文件: {args.csv_file}")
+        success = manager.delete_links_from_csv(args.csv_file)
+    if args.backend == 'dry-run':
+        backend.log_summary()
     if success:
         logger.info("所有链路删除操作完成")
     else:
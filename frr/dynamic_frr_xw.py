@@ -6,6 +6,14 @@ import time
 import re
 from pathlib import Path
 import logging
+from link_apply_engine import ParallelLinkApplier
+from topology_diff import diff_matrices, active_links, count_active_links
+from container_backend import make_backend, set_default_backend
+from link_manager_base import (LinkManagerBase, add_link_manager_arguments, check_link_manager_arguments,
+                               link_manager_options, run_link_manager)
+from link_shaping import install_commands, change_commands, shell_script
+from link_teardown import XW_VETH_PATTERN
+from ip_allocator import XW_LINK_POOLS
 
 # 配置日志
 logging.basicConfig(
@@ -14,64 +22,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class NetworkTopologyManager:
-    def __init__(self, base_container_name="clab-sat-network-XW",csv_dir='csv_xw'):
+class NetworkTopologyManager(LinkManagerBase):
+    # XW星间矩阵为对称矩阵；本管理器负责的接口命名为 "{节点1}-{节点2}"
+    symmetric_matrix = True
+    managed_veth_pattern = XW_VETH_PATTERN
+    default_ip_pools = XW_LINK_POOLS
+    event_source = 'xw'
+
+    def __init__(self, base_container_name="clab-sat-network-XW", csv_dir='csv_xw',
+                 ip_state_file='ip_allocation_xw.json', journal_file='topology_journal_xw.jsonl',
+                 prefetch=True, **options):
         """
         初始化网络拓扑管理器
         
         参数:
         - base_container_name: 容器名称的前缀
+        - 其余参数见 LinkManagerBase.__init__，ip_pools默认为 XW_LINK_POOLS
         """
         self.base_container_name = base_container_name
-        self.csv_dir = csv_dir
-        self.current_matrix = None
-        self.current_links = set()  # 存储当前已建立的链路 (node1, node2, ip_info)
         self.sat_num = 0
-        self.ip_mapping = {}  # 存储节点对到IP地址的映射
+        super().__init__(csv_dir, ip_state_file=ip_state_file, journal_file=journal_file, prefetch=prefetch,
+                         **options)
         logger.info("网络拓扑管理器初始化完成")
         
-    def read_matrix_from_csv(self, csv_file):
-        """从CSV文件读取链路可见性矩阵"""
-        try:
-            # 使用pandas读取CSV文件，不设置列名或索引列
-            df = pd.read_csv(csv_file, header=None, sep=',', dtype=float)
-            matrix = df.values
-            
-            # 验证矩阵格式
-            rows, cols = matrix.shape
-            if rows != cols:
-                logger.warning(f"矩阵不是方阵！行数: {rows}, 列数: {cols}")
-            
-            logger.info(f"成功读取矩阵，大小: {matrix.shape}")
-            sat_num = rows
-            return matrix
-        except Exception as e:
-            logger.error(f"读取CSV文件错误: {e}")
-            logger.exception("详细错误信息:")
-            return None
-    
-
     def generate_ip_addresses(self, node1, node2):
         """根据节点编号生成唯一的IP地址对"""
         """同一链路的两端必须处于同一子网中，不同链路之间的端口ip必须处于不同子网中"""
-        """划分范围10.0.16.0/30 -- 10.0.64.0/30"""
-        original_node1, original_node2 = node1+1, node2+1
-        key = (min(original_node1, original_node2), max(original_node1, original_node2))
+        """子网由PairSubnetAllocator按节点对编号从地址池中确定性分配"""
+        key = (min(node1, node2), max(node1, node2))
         if key in self.ip_mapping:
             return self.ip_mapping[key]
         
-        # 计算第三个网段
-        third_byte = ( original_node1*original_node2 // 64 ) + 16
-        
-        # 计算第四个网段
-        fourth_byte = ( original_node1*original_node2 % 64 ) * 4 + 1
-        
-        # 生成第一个IP
-        ip1 = f"10.0.{third_byte}.{fourth_byte}/30"
-        
-        # 生成第二个IP (第四个字节+1)
-        ip2 = f"10.0.{third_byte}.{fourth_byte + 1}/30"
-
+        ip1, ip2 = self.ip_allocator.addresses(node1, node2)
         self.ip_mapping[key] = (ip1, ip2)
         
         return ip1, ip2
@@ -87,18 +69,27 @@ class NetworkTopologyManager:
         ip1, ip2 = self.generate_ip_addresses(node1, node2)
         logger.info(f"创建链路: {original_node1} <-> {original_node2} (IP: {ip1} <-> {ip2})")
         
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        container1 = f"{self.base_container_name}{original_node1}"
+        container2 = f"{self.base_container_name}{original_node2}"
+        pids = self.netns_cache.get_pids([container1, container2])
+        n1_pid, n2_pid = pids.get(container1, ""), pids.get(container2, "")
+        if n1_pid == "" or n2_pid == "":
+            logger.error(f"无法获取容器PID，跳过创建链路: {original_node1} <-> {original_node2}")
+            return False
+
         script = f"""
         # 创建veth pair
         sudo ip link add {original_node1}-{original_node2} type veth peer name {original_node2}-{original_node1}
         
         # 配置第一个容器
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {self.base_container_name}{original_node1})
+        n1_pid={n1_pid}
         sudo ip link set {original_node1}-{original_node2} netns $n1_pid
         sudo nsenter -t $n1_pid -n ip link set {original_node1}-{original_node2} up
         sudo nsenter -t $n1_pid -n ip addr add {ip1} dev {original_node1}-{original_node2}
         
         # 配置第二个容器
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {self.base_container_name}{original_node2})
+        n2_pid={n2_pid}
         sudo ip link set {original_node2}-{original_node1} netns $n2_pid
         sudo nsenter -t $n2_pid -n ip link set {original_node2}-{original_node1} up
         sudo nsenter -t $n2_pid -n ip addr add {ip2} dev {original_node2}-{original_node1}
@@ -107,7 +98,8 @@ class NetworkTopologyManager:
         success = self.execute_script(script)
         if success:
             # 使用IP地址而不是子网ID来存储链路信息
-            self.current_links.add((min(node1, node2), max(node1, node2), f"{ip1}-{ip2}"))
+            with self._links_lock:
+                self.current_links.add((min(node1, node2), max(node1, node2), f"{ip1}-{ip2}"))
             return True
         return False
     
@@ -120,10 +112,16 @@ class NetworkTopologyManager:
         ip1, ip2 = self.generate_ip_addresses(node1, node2)
         logger.info(f"删除链路: {original_node1} <-> {original_node2} (IP: {ip1} <-> {ip2})")
         
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        container1 = f"{self.base_container_name}{original_node1}"
+        container2 = f"{self.base_container_name}{original_node2}"
+        pids = self.netns_cache.get_pids([container1, container2])
+        n1_pid, n2_pid = pids.get(container1, ""), pids.get(container2, "")
+
         script = f"""
         # 尝试获取容器PID
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {self.base_container_name}{original_node1} 2>/dev/null)
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {self.base_container_name}{original_node2} 2>/dev/null)
+        n1_pid={n1_pid}
+        n2_pid={n2_pid}
         
         # 检查容器是否存在
         if [ -z "$n1_pid" ] || [ "$n1_pid" = "<no value>" ]; then
@@ -143,47 +141,120 @@ class NetworkTopologyManager:
         
         success = self.execute_script(script)
         if success:
-            # 从当前链路集合中移除
+            self._forget_link(node1, node2)
+            return True
+        return False
+    
+    def _forget_link(self, node1, node2):
+        """从当前链路集合中移除指定节点对的链路"""
+        with self._links_lock:
             for link in list(self.current_links):
                 if (link[0] == min(node1, node2) and link[1] == max(node1, node2)):
                     self.current_links.remove(link)
                     logger.debug(f"从当前链路集合中移除: {link}")
-            return True
-        return False
     
     def modify_link(self, node1, node2, delay):
-        """修改两个节点之间的链路延迟等属性参数"""
+        """修改两个节点之间的链路延迟等属性参数（原地修改netem，整形层次不存在时再安装）"""
         # 记录原始顺序的节点编号
         original_node1, original_node2 = node1+1, node2+1
+        shape = self.link_shape.with_delay(delay // 300)
+        logger.info(f"设置链路延迟: {original_node1} <-> {original_node2} (DELAY: {shape.delay} ms)")
         
-
-        real_delay = delay // 300
-        
-        
-        logger.info(f"设置链路延迟: {original_node1} <-> {original_node2} (DELAY: {real_delay} ms)")
+        container1 = f"{self.base_container_name}{original_node1}"
+        n1_pid = self.netns_cache.get_pid(container1)
+        if n1_pid is None:
+            logger.error(f"无法获取容器PID，跳过设置延迟: {container1}")
+            return False
         
+        # 仅在node1一端设置延迟
         script = f"""
-        # 在添加规则前，清空可能存在的旧规则
-        docker exec "{self.base_container_name}{original_node1}" bash -c "tc qdisc del dev {original_node1}-{original_node2} root"
-        docker exec "{self.base_container_name}{original_node2}" bash -c "tc qdisc del dev {original_node2}-{original_node1} root"  
+        n1_pid={n1_pid}
+        {shell_script("sudo nsenter -t $n1_pid -n", f"{original_node1}-{original_node2}", shape, self.link_shape)}
+        """
         
-        # 对该链路双端均添加延迟控制
-        docker exec "{self.base_container_name}{original_node1}" bash -c "
-        tc qdisc add dev {original_node1}-{original_node2} root netem delay {real_delay}ms" || {{
-            echo "添加规则失败，请检查接口或参数。"
-            exit 1
-        }}
+        return self.execute_script(script)
+    
+    def plan_create_link(self, executor, node1, node2, delay=None, admin_up=True):
+        """
+        将创建链路（及可选的延迟设置）登记到批处理执行器
 
-        # docker exec "{self.base_container_name}{original_node2}" bash -c "
-        # tc qdisc add dev {original_node2}-{original_node1} root netem delay {real_delay}ms" || {{
-        #     echo "添加规则失败，请检查接口或参数。"
-        #     exit 1
-        # }}
+        参数:
+        - admin_up: 为False时接口保持down状态（预创建下一时间片的链路）
         """
+        original_node1, original_node2 = node1+1, node2+1
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        logger.info(f"{'创建' if admin_up else '预创建'}链路: {original_node1} <-> {original_node2} (IP: {ip1} <-> {ip2})")
+        
+        container1 = f"{self.base_container_name}{original_node1}"
+        container2 = f"{self.base_container_name}{original_node2}"
+        veth1 = f"{original_node1}-{original_node2}"
+        veth2 = f"{original_node2}-{original_node1}"
+        key = (min(node1, node2), max(node1, node2))
+        executor.add_veth(key, container1, veth1, container2, veth2)
+        if admin_up:
+            executor.ip(key, container1, f"link set {veth1} up")
+        executor.ip(key, container1, f"addr add {ip1} dev {veth1}")
+        if admin_up:
+            executor.ip(key, container2, f"link set {veth2} up")
+        executor.ip(key, container2, f"addr add {ip2} dev {veth2}")
+        if delay is not None:
+            self.plan_modify_link(executor, node1, node2, delay, install=True)
+    
+    def plan_set_link_state(self, executor, node1, node2, state):
+        """将启用(up)或停用(down)链路两端接口的操作登记到批处理执行器"""
+        original_node1, original_node2 = node1+1, node2+1
+        logger.info(f"{'启用' if state == 'up' else '停用'}链路: {original_node1} <-> {original_node2}")
         
-        success = self.execute_script(script)
+        key = (min(node1, node2), max(node1, node2))
+        executor.ip(key, f"{self.base_container_name}{original_node1}",
+                    f"link set {original_node1}-{original_node2} {state}")
+        executor.ip(key, f"{self.base_container_name}{original_node2}",
+                    f"link set {original_node2}-{original_node1} {state}")
+    
+    def plan_delete_link(self, executor, node1, node2):
+        """将删除链路的操作登记到批处理执行器"""
+        original_node1, original_node2 = node1+1, node2+1
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        logger.info(f"删除链路: {original_node1} <-> {original_node2} (IP: {ip1} <-> {ip2})")
+        
+        # 删除任一端即会同时删除veth pair，另一端的删除失败可忽略
+        key = (min(node1, node2), max(node1, node2))
+        executor.ip(key, f"{self.base_container_name}{original_node1}",
+                    f"link delete {original_node1}-{original_node2}", tolerant=True)
+        executor.ip(key, f"{self.base_container_name}{original_node2}",
+                    f"link delete {original_node2}-{original_node1}", tolerant=True)
+    
+    def plan_modify_link(self, executor, node1, node2, delay, install=False):
+        """
+        将修改链路延迟的操作登记到批处理执行器（仅在node1一端设置延迟）
 
-        return success
+        参数:
+        - install: 为True时安装整形层次（新建链路或校正状态），否则用一条 qdisc change 原地修改
+        """
+        original_node1, original_node2 = node1+1, node2+1
+        shape = self.link_shape.with_delay(delay // 300)
+        logger.info(f"设置链路延迟: {original_node1} <-> {original_node2} (DELAY: {shape.delay} ms)")
+        
+        key = (min(node1, node2), max(node1, node2))
+        dev = f"{original_node1}-{original_node2}"
+        commands = install_commands(dev, shape) if install else change_commands(dev, shape, self.link_shape)
+        for command in commands:
+            executor.tc(key, f"{self.base_container_name}{original_node1}", command)
+    
+    def managed_containers(self, matrix):
+        """返回矩阵涉及的全部容器名"""
+        return [f"{self.base_container_name}{n+1}" for n in range(matrix.shape[0])]
+    
+    def link_interfaces(self, node1, node2):
+        """返回链路两端接口 [(容器名, veth名, 地址)]，第一项为设置延迟的一端"""
+        original_node1, original_node2 = node1+1, node2+1
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        return [(f"{self.base_container_name}{original_node1}", f"{original_node1}-{original_node2}", ip1),
+                (f"{self.base_container_name}{original_node2}", f"{original_node2}-{original_node1}", ip2)]
+    
+    def netem_delay_ms(self, value):
+        """将矩阵中的距离换算为netem延迟（毫秒）"""
+        return value // 300
     
     def execute_script(self, script):
         """执行bash脚本"""
@@ -197,88 +268,52 @@ class NetworkTopologyManager:
             return False
     
     def find_differences(self, old_matrix, new_matrix):
-        """对比两个矩阵，找出需要添加和删除的链路"""
-        to_add = []
-        to_remove = []
-        to_modify = []
-        # 获取两个矩阵的最小尺寸
-        n = min(old_matrix.shape[0], new_matrix.shape[0])
-        
-        for i in range(n):
-            for j in range(i+1, n):  # 只处理上三角矩阵，避免重复
-                # 原本没有链路（值<0），现在有了（值>=0）-> 添加
-                if old_matrix[i, j] < 0 and new_matrix[i, j] >= 0:
-                    to_add.append((i, j))
-                    logger.debug(f"需要添加链路: {i} <-> {j} (值: {new_matrix[i, j]})")
-                
-                # 原本有链路（值>=0），现在没了（值<0）-> 删除  
-                elif old_matrix[i, j] >= 0 and new_matrix[i, j] < 0:
-                    to_remove.append((i, j))
-                    logger.debug(f"需要删除链路: {i} <-> {j}")
-                
-                # 原本有链路（值>=0），现在有了（值>=0）但值不同-> 修改
-                elif old_matrix[i, j] >= 0 and new_matrix[i, j] >= 0 and old_matrix[i, j] != new_matrix[i, j]:
-                    to_modify.append((i, j))
-                    logger.debug(f"需要修改链路: {i} <-> {j} (原值: {old_matrix[i, j]}, 新值: {new_matrix[i, j]})")
+        """对比两个矩阵，找出需要添加和删除的链路（只处理上三角矩阵，避免重复）"""
+        to_add, to_remove, to_modify = diff_matrices(old_matrix, new_matrix, symmetric=True)
         
         logger.info(f"找到 {len(to_add)} 条需要添加的链路，{len(to_remove)} 条需要删除的链路，{len(to_modify)} 条需要修改的链路")
         return to_add, to_remove, to_modify
     
-    def validate_csv_file(self, csv_file):
-        """验证CSV文件的格式是否符合要求"""
-        try:
-            # 检查文件是否存在
-            if not os.path.exists(csv_file):
-                logger.error(f"CSV文件不存在: {csv_file}")
-                return False
-                
-            # 检查文件是否为空
-            if os.path.getsize(csv_file) == 0:
-                logger.error(f"CSV文件为空: {csv_file}")
-                return False
-                
-            # 尝试读取文件内容
-            with open(csv_file, 'r') as f:
-                first_line = f.readline().strip()
-                # 检查第一行是否包含逗号（CSV格式）
-                if ',' not in first_line:
-                    logger.warning(f"CSV文件可能格式不正确，第一行未发现逗号: {first_line}")
-                    
-            return True
-        except Exception as e:
-            logger.error(f"验证CSV文件出错: {e}")
-            return False
-    
     def process_links_in_batches(self, links, operation, batch_size=10, new_matrix=None):
-        """分批处理链路操作，支持创建或删除"""
+        """
+        并行处理链路操作，支持创建、删除或修改
+        
+        使用有界线程池并发执行，同一容器的操作通过容器锁串行，
+        不同容器之间的操作并行，并发度根据宿主机负载自适应调整（batch_size为初始并发度）
+
+        返回:
+        - 失败的链路列表
+        """
         total = len(links)
-        success_count = 0
+        logger.info(f"开始{operation}，共 {total} 个链路，初始并发度 {batch_size}")
         
-        for i in range(0, total, batch_size):
-            batch = links[i:i+batch_size]
-            logger.info(f"处理批次 {i//batch_size + 1}/{(total+batch_size-1)//batch_size}，{operation}链路...")
+        def make_task(node1, node2):
+            container1 = f"{self.base_container_name}{node1+1}"
+            container2 = f"{self.base_container_name}{node2+1}"
             
-            for node1, node2 in batch:
-                if operation == "create_link": # "创建"
-                    success = self.create_link(node1, node2)
-                    if success and new_matrix is not None:
+            def task():
+                success = False
+                with self.metrics.timer(operation, container1) as timing:
+                    if operation == "create_link": # "创建"
+                        success = self.create_link(node1, node2)
+                        if success and new_matrix is not None:
+                            delay = new_matrix[node1, node2]
+                            success = self.modify_link(node1, node2, delay)
+                    elif operation == "delete_link":  # "删除"
+                        success = self.delete_link(node1, node2)
+                    elif operation == "modify_link":  # "修改"
                         delay = new_matrix[node1, node2]
                         success = self.modify_link(node1, node2, delay)
-                elif operation == "delete_link":  # "删除"
-                    success = self.delete_link(node1, node2)
-                elif operation == "modify_link":  # "修改"
-                    delay = new_matrix[node1, node2]
-                    success = self.modify_link(node1, node2, delay)
-
-                if success:
-                    success_count += 1
-                    
-            # 批处理之间短暂等待，避免系统过载
-            if i + batch_size < total:
-                time.sleep(0.5)
+                    timing.failures = 0 if success else 1
+                return success
+            return (container1, container2), task
+        
+        applier = ParallelLinkApplier(initial_workers=batch_size)
+        results = applier.run([make_task(node1, node2) for node1, node2 in links], description=operation)
+        success_count = sum(1 for result in results if result)
         
         logger.info(f"{operation}链路完成: {success_count}/{total} 成功")
-        return success_count
+        return [tuple(link) for link, result in zip(links, results) if not result]
     
     def update_topology(self, csv_file):
         """根据CSV文件更新网络拓扑"""
@@ -286,39 +321,58 @@ class NetworkTopologyManager:
         if new_matrix is None:
             logger.error("无法更新拓扑：读取矩阵失败")
             return False
-        
+        return self.apply_matrix(new_matrix)
+
+    def apply_matrix(self, new_matrix, slice_name=None, differences=None):
+        """
+        将已读取的可见性矩阵（稠密数组或SparseTopology）应用到网络拓扑
+
+        参数:
+        - slice_name: 时间片名称（XW没有流水线扫描，不使用，与TSN链路管理器的接口保持一致）
+        - differences: 预先计算的 find_differences(current_matrix, new_matrix) 结果，为None时在此计算
+        """
         if self.current_matrix is not None:
             # 找出需要添加和删除的链路
-            to_add, to_remove, to_modify = self.find_differences(self.current_matrix, new_matrix)
-            
-            # 使用批处理删除旧链路
-            if to_remove:
-                self.process_links_in_batches(to_remove, "delete_link", new_matrix=new_matrix)
-            
-            # 使用批处理添加新链路
-            if to_add:
-                self.process_links_in_batches(to_add, "create_link", new_matrix=new_matrix)
-
-            # 使用批处理修改链路
-            if to_modify:
-                self.process_links_in_batches(to_modify, "modify_link", new_matrix=new_matrix)
+            with self.metrics.timer('diff'):
+                if differences is None:
+                    differences = self.find_differences(self.current_matrix, new_matrix)
+                to_add, to_remove, to_modify = differences
+                to_modify = self.delay_filter.select(to_add, to_remove, to_modify, new_matrix)
+            with self.metrics.timer('apply', ops=len(to_add) + len(to_remove) + len(to_modify)) as timing:
+                failed = self.apply_differences(to_add, to_remove, to_modify, new_matrix)
+                timing.failures = len(failed)
+            self.last_slice_stats = {'add': len(to_add), 'remove': len(to_remove), 'modify': len(to_modify)}
+            failed_set = set(failed)
+            self.delay_filter.mark_failed([link for link in to_modify if tuple(link) in failed_set])
+            if failed and self.auto_reconcile:
+                # 部分链路操作失败，内存状态可能与容器内实际状态不一致
+                logger.warning(f"{len(failed)} 条链路操作失败，根据容器内实际状态校正拓扑")
+                failed = self.reconcile(new_matrix)
+            self.last_failed_links = failed
                     
+        elif self.auto_reconcile or self._resume_reconcile:
+            # 启动时不假设容器处于初始状态（如上次运行中途退出），直接校正到目标时间片
+            logger.info("根据容器内实际状态校正到首个时间片")
+            self._resume_reconcile = False
+            self.last_failed_links = self.reconcile(new_matrix)
+            self.last_slice_stats = {'reconcile': count_active_links(new_matrix, symmetric=self.symmetric_matrix)}
         else:
             # 第一次运行，初始化所有链路
             n = new_matrix.shape[0]
             logger.info(f"首次初始化，矩阵大小: {n}x{n}")
             
-            links_to_create = []
-            for i in range(n):
-                for j in range(i+1, n):  # 只处理上三角矩阵
-                    if new_matrix[i, j] >= 0:  # 如果有链路
-                        links_to_create.append((i, j))
+            links_to_create = active_links(new_matrix, symmetric=True)  # 只处理上三角矩阵
             
-            if links_to_create:
-                self.process_links_in_batches(links_to_create, "create_link", new_matrix=new_matrix)
+            with self.metrics.timer('apply', ops=len(links_to_create)) as timing:
+                self.last_failed_links = self.apply_differences(links_to_create, [], [], new_matrix) if links_to_create else []
+                timing.failures = len(self.last_failed_links)
+            self.last_slice_stats = {'add': len(links_to_create), 'remove': 0, 'modify': 0}
+            self.delay_filter.reset(new_matrix, links_to_create)
         
         # 更新当前矩阵
         self.current_matrix = new_matrix
+        # 持久化本时间片新分配的链路子网
+        self.ip_allocator.save()
         # 显示当前拓扑状态
         self.print_topology_status()
         return True
@@ -330,62 +384,13 @@ class NetworkTopologyManager:
             return
         
         n = self.current_matrix.shape[0]
-        active_links = 0
-        
-        for i in range(n):
-            for j in range(i+1, n):
-                if self.current_matrix[i, j] >= 0:
-                    active_links += 1
+        active_link_count = count_active_links(self.current_matrix, symmetric=True)
         
         logger.info(f"当前网络拓扑状态:")
         logger.info(f"  容器数量: {n}")
-        logger.info(f"  活跃链路: {active_links}")
+        logger.info(f"  活跃链路: {active_link_count}")
         logger.info(f"  总链路容量: {n * (n-1) // 2}")
     
-    def process_csv_directory(self, directory, interval=20):
-        """处理目录中的所有CSV文件，按时间间隔更新网络拓扑"""
-        directory = Path(directory)
-        
-        # 尝试以数字顺序排序CSV文件（例如output_1.csv, output_2.csv...）
-        def get_csv_number(filename):
-            # 从文件名中提取数字
-            match = re.search(r'(\d+)', filename.stem)
-            if match:
-                return int(match.group(1))
-            return float('inf')  # 没有数字的放到最后
-        
-        # 获取目录中的所有CSV文件并排序
-        csv_files = sorted([f for f in directory.glob("*.csv")], key=get_csv_number)
-        
-        if not csv_files:
-            logger.error(f"目录 {directory} 中没有找到CSV文件")
-            return
-         
-        logger.info(f"找到 {len(csv_files)} 个CSV文件待处理，排序后的顺序:")
-        for i, f in enumerate(csv_files):
-            logger.info(f"  {i+1}. {f.name}")
-        
-        # 处理每个CSV文件
-        for i, csv_file in enumerate(csv_files):
-            logger.info(f"\n{'='*50}")
-            logger.info(f"处理文件 [{i+1}/{len(csv_files)}]: {csv_file}")
-            
-            # 验证并更新网络拓扑
-            if self.validate_csv_file(csv_file):
-                start_time = time.time()
-                success = self.update_topology(csv_file)
-                elapsed = time.time() - start_time
-                
-                if success:
-                    logger.info(f"成功应用拓扑: {csv_file.name} (耗时: {elapsed:.2f}秒)")
-                else:
-                    logger.error(f"应用拓扑失败: {csv_file.name}")
-            
-            # 等待指定的时间间隔
-            if i < len(csv_files) - 1:
-                logger.info(f"等待 {interval} 秒后处理下一个文件...")
-                time.sleep(interval)
-
 def main():
     import argparse
     
@@ -394,13 +399,18 @@ def main():
     parser.add_argument('--interval', type=int, default=20, help='更新间隔（秒），默认20秒')
     parser.add_argument('--container-prefix', default='clab-sat-network-XW', 
                         help='容器名称前缀，默认为clab-sat-network-XW')
-    
+    add_link_manager_arguments(parser, 'xw')
     args = parser.parse_args()
+
+    check_link_manager_arguments(parser, args)
+    backend = make_backend(args.backend)
+    set_default_backend(backend)
     
     logger.info(f"启动网络拓扑管理，处理目录: {args.csv_dir}，更新间隔: {args.interval}秒")
     
-    manager = NetworkTopologyManager(base_container_name=args.container_prefix, csv_dir=args.csv_dir)
-    manager.process_csv_directory(args.csv_dir, args.interval)
+    manager = NetworkTopologyManager(base_container_name=args.container_prefix, csv_dir=args.csv_dir,
+                                     **link_manager_options(args))
+    run_link_manager(manager, args, backend)
 
 if __name__ == "__main__":
     main()
@@ -5,9 +5,18 @@ import numpy as np
 import subprocess
 import os
 import time
-import re
 from pathlib import Path
 import logging
+from link_apply_engine import ParallelLinkApplier
+from topology_diff import diff_matrices, active_links, count_active_links, connected_columns
+from sparse_topology import SparseTopology
+from timeline_store import TimelineStore, list_slice_files
+from container_backend import BACKENDS, make_backend, set_default_backend
+from link_shaping import LinkShape, install_commands, change_commands, shell_script
+from ip_allocator import TSN_LINK_POOLS
+from topology_events import TopologySubscriber, EVENT_SOCKETS
+from link_teardown import TsnLinkEndpoints
+from link_manager_base import LinkManagerBase
 
 # 配置日志
 logging.basicConfig(
@@ -16,43 +25,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class NetworkTopologyBuilder:
+class NetworkTopologyBuilder(TsnLinkEndpoints, LinkManagerBase):
+    # 与TSN链路管理脚本相同的TSN×DG全矩阵，只构建首个时间片
+    symmetric_matrix = False
+    default_ip_pools = TSN_LINK_POOLS
+    event_source = 'tsn'
+
     def __init__(self, base_tsn_container_name="clab-sat-network-TSN",
                  base_yg_container_name="clab-sat-network-YG",
                  base_xw_container_name="clab-sat-network-XW",
-                 csv_dir='csv_tsn_modify'
+                 csv_dir='csv_tsn_modify',
+                 batch_mode=True,
+                 sparse=False,
+                 ip_pools=None,
+                 ip_state_file='ip_allocation_tsn.json',
+                 link_shape=None
                  ):
         """
         初始化网络拓扑构建器
         
         参数:
-        - base_container_name: 容器名称的前缀
+        - base_tsn/yg/xw_container_name: TSN、YG、XW容器名称的前缀
+        - batch_mode: 是否将整个时间片的链路差异合并为按命名空间的ip/tc批处理提交
+        - sparse: 是否以稀疏格式（只保存可见链路）读取矩阵，用于大规模星座
+        - ip_pools: 链路子网地址池CIDR列表，默认为 TSN_LINK_POOLS
+        - ip_state_file: 链路子网分配的持久化文件，为None时不持久化
+        - link_shape: 链路整形模板（抖动/丢包/限速），延迟由矩阵决定，默认限速50kbit
         """
         self.base_tsn_container_name = base_tsn_container_name
         self.base_yg_container_name = base_yg_container_name
         self.base_xw_container_name = base_xw_container_name
-        self.csv_dir = csv_dir
-        self.current_matrix = None
-        self.current_links = set()  # 存储当前已建立的链路 (node1, node2, ip_info)
-        self.ip_mapping = {}  # 存储节点对到IP地址的映射
+        super().__init__(csv_dir, batch_mode, sparse, ip_pools=ip_pools, ip_state_file=ip_state_file,
+                         link_shape=link_shape or LinkShape(rate="50kbit"))
         logger.info("网络拓扑构建器初始化完成")
-        
-    def read_matrix_from_csv(self, csv_file):
-        """从CSV文件读取链路可见性矩阵"""
-        try:
-            # 使用pandas读取CSV文件，不设置列名或索引列
-            df = pd.read_csv(csv_file, header=None, sep=',', dtype=float)
-            matrix = df.values
-            
-            # 验证矩阵格式
-            rows, cols = matrix.shape
-            
-            logger.info(f"成功读取矩阵，大小: {rows}x{cols}")
-            return matrix
-        except Exception as e:
-            logger.error(f"读取CSV文件错误: {e}")
-            logger.exception("详细错误信息:")
-            return None
     
     def vm_sat_ip_map(self, type, idx):
         """给定指定tsn编号，返回tsn对应vm名称和ip"""
@@ -77,24 +82,12 @@ class NetworkTopologyBuilder:
     def generate_ip_addresses(self, node1, node2):
         """根据节点编号生成唯一的IP地址对"""
         """同一链路的两端必须处于同一子网中，不同链路之间的端口ip必须处于不同子网中"""
-        """划分范围10.0.0.0/30 -- 10.0.15.0/30"""
-        original_node1, original_node2 = node1+1, node2+1
-        key = (original_node1, original_node2)
+        """子网由PairSubnetAllocator按节点对编号从地址池中确定性分配"""
+        key = (node1, node2)
         if key in self.ip_mapping:
             return self.ip_mapping[key]
         
-        # 计算第三个网段
-        third_byte = ( original_node1*original_node2 // 64 )
-        
-        # 计算第四个网段
-        fourth_byte = ( original_node1*original_node2 % 64 ) * 4 + 1
-        
-        # 生成第一个IP
-        ip1 = f"10.0.{third_byte}.{fourth_byte}/30"
-        
-        # 生成第二个IP (第四个字节+1)
-        ip2 = f"10.0.{third_byte}.{fourth_byte + 1}/30"
-
+        ip1, ip2 = self.ip_allocator.addresses(node1, node2)
         self.ip_mapping[key] = (ip1, ip2)
         
         return ip1, ip2
@@ -103,83 +96,63 @@ class NetworkTopologyBuilder:
         """创建两个节点之间的链路"""
 
         ip1, ip2 = self.generate_ip_addresses(node1, node2)
-
-        original_node1 = node1+1
-        
-        if node2 < 12:
-            original_node2 = node2+1
-            logger.info(f"创建链路: TSN{original_node1} <-> YG{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"创建链路: TSN{original_node1} <-> XW{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"创建链路: {label} (IP: {ip1} <-> {ip2})")
             
-        # 设置带宽限制为50kb
-        bandwidth = "50kbit"
-        logger.info(f"设置链路带宽限制: {bandwidth}")
-        
+        if self.link_shape.rate:
+            logger.info(f"设置链路带宽限制: {self.link_shape.rate}")
+        
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        pids = self.netns_cache.get_pids([tsn_container_name, dg_container_name])
+        n1_pid, n2_pid = pids.get(tsn_container_name, ""), pids.get(dg_container_name, "")
+        if n1_pid == "" or n2_pid == "":
+            logger.error(f"无法获取容器PID，跳过创建链路: {label}")
+            return False
+
         script = f"""
         # 创建veth pair
         sudo ip link add {veth_tsn} type veth peer name {veth_dg}
         
         # 配置第一个容器
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {tsn_container_name})
+        n1_pid={n1_pid}
         sudo ip link set {veth_tsn} netns $n1_pid
         sudo nsenter -t $n1_pid -n ip link set {veth_tsn} up
         sudo nsenter -t $n1_pid -n ip addr add {ip1} dev {veth_tsn}
         
         # 配置第二个容器
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {dg_container_name})
+        n2_pid={n2_pid}
         sudo ip link set {veth_dg} netns $n2_pid
         sudo nsenter -t $n2_pid -n ip link set {veth_dg} up
         sudo nsenter -t $n2_pid -n ip addr add {ip2} dev {veth_dg}
         
-        # 设置带宽限制 (50kb)
-        sudo nsenter -t $n1_pid -n tc qdisc add dev {veth_tsn} root tbf rate {bandwidth} burst 5kb latency 70ms
-        sudo nsenter -t $n2_pid -n tc qdisc add dev {veth_dg} root tbf rate {bandwidth} burst 5kb latency 70ms
+        # 安装整形层次（netem延迟 + tbf带宽限制），之后的延迟修改只需原地change
+        {"; ".join(f"sudo nsenter -t $n1_pid -n tc {command}" for command in install_commands(veth_tsn, self.link_shape))}
+        {"; ".join(f"sudo nsenter -t $n2_pid -n tc {command}" for command in install_commands(veth_dg, self.link_shape))}
         """
         
         success = self.execute_script(script)
         if success:
             # 使用IP地址而不是子网ID来存储链路信息
-            self.current_links.add((node1, node2, f"{ip1}-{ip2}"))
+            with self._links_lock:
+                self.current_links.add((node1, node2, f"{ip1}-{ip2}"))
             return True
         return False
     
     def delete_link(self, node1, node2):
         """删除两个节点之间的链路"""
-        # 记录原始顺序的节点编号
-        original_node1 = node1+1
-        
         # 获取链路的IP地址，仅用于日志记录
         ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"删除链路: {label} (IP: {ip1} <-> {ip2})")
         
-        if node2 < 12:
-            original_node2 = node2+1
-            logger.info(f"删除链路: TSN{original_node1} <-> YG{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"删除链路: TSN{original_node1} <-> XW{original_node2} (IP: {ip1} <-> {ip2})")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
-        
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        pids = self.netns_cache.get_pids([tsn_container_name, dg_container_name])
+        n1_pid, n2_pid = pids.get(tsn_container_name, ""), pids.get(dg_container_name, "")
+
         script = f"""
         # 尝试获取容器PID
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {tsn_container_name} 2>/dev/null)
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {dg_container_name} 2>/dev/null)
+        n1_pid={n1_pid}
+        n2_pid={n2_pid}
         
         # 检查容器是否存在
         if [ -z "$n1_pid" ] || [ "$n1_pid" = "<no value>" ]; then
@@ -199,58 +172,86 @@ class NetworkTopologyBuilder:
         
         success = self.execute_script(script)
         if success:
-            # 从当前链路集合中移除
+            self._forget_link(node1, node2)
+            return True
+        return False
+    
+    def _forget_link(self, node1, node2):
+        """从当前链路集合中移除指定节点对的链路"""
+        with self._links_lock:
             for link in list(self.current_links):
                 if (link[0] == node1 and link[1] == node2):
                     self.current_links.remove(link)
                     logger.debug(f"从当前链路集合中移除: {link}")
-            return True
-        return False
     
     def modify_link(self, node1, node2, delay):
-        """修改两个节点之间的链路延迟等属性参数"""
-        # 记录原始顺序的节点编号
-        original_node1 = node1+1
-        
-        real_delay = delay
-        bandwidth = "50kbit"  # 保持带宽限制为50kb
-        
-        if node2 < 12:
-            original_node2 = node2+1
-            logger.info(f"设置链路延迟: TSN{original_node1} <-> YG{original_node2} (DELAY: {real_delay} ms)")
-            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
-            veth_dg = f"yg{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
-        else:
-            original_node2 = node2 - 11
-            logger.info(f"设置链路延迟: TSN{original_node1} <-> XW{original_node2} (DELAY: {real_delay} ms)")
-            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
-            veth_dg = f"xw{original_node2}-tsn{original_node1}"
-            tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
-            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
+        """修改两个节点之间的链路延迟等属性参数（原地修改netem，带宽限制保持不变）"""
+        shape = self.link_shape.with_delay(delay)
         
-        script = f"""
-        # 尝试获取容器PID
-        n1_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {tsn_container_name} 2>/dev/null)
-        n2_pid=$(docker inspect -f '{{{{.State.Pid}}}}' {dg_container_name} 2>/dev/null)
-        
-        # 清除现有的TC规则（如果有）
-        sudo nsenter -t $n1_pid -n tc qdisc del dev {veth_tsn} root 2>/dev/null || true
-        sudo nsenter -t $n2_pid -n tc qdisc del dev {veth_dg} root 2>/dev/null || true
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"设置链路延迟: {label} (DELAY: {shape.delay} ms)")
         
-        # 添加新的TC规则设置延迟
-        sudo nsenter -t $n1_pid -n tc qdisc add dev {veth_tsn} root netem delay {real_delay}ms
-        sudo nsenter -t $n2_pid -n tc qdisc add dev {veth_dg} root netem delay {real_delay}ms
+        # 从缓存获取容器PID，避免每次操作都调用docker inspect
+        pids = self.netns_cache.get_pids([tsn_container_name, dg_container_name])
+        n1_pid, n2_pid = pids.get(tsn_container_name, ""), pids.get(dg_container_name, "")
+        if n1_pid == "" or n2_pid == "":
+            logger.error(f"无法获取容器PID，跳过设置延迟: {label}")
+            return False
+
+        script = f"""
+        n1_pid={n1_pid}
+        n2_pid={n2_pid}
         
-        # 重新设置带宽限制 (50kb)
-        sudo nsenter -t $n1_pid -n tc qdisc add dev {veth_tsn} handle 1: root tbf rate {bandwidth} burst 5kb latency 70ms
-        sudo nsenter -t $n2_pid -n tc qdisc add dev {veth_dg} handle 1: root tbf rate {bandwidth} burst 5kb latency 70ms
+        # 原地修改延迟，整形层次不存在时（如旧版本创建的链路）再安装
+        {shell_script("sudo nsenter -t $n1_pid -n", veth_tsn, shape, self.link_shape)}
+        {shell_script("sudo nsenter -t $n2_pid -n", veth_dg, shape, self.link_shape)}
         """
         
         success = self.execute_script(script)
         return success
     
+    def plan_create_link(self, executor, node1, node2, delay=None):
+        """将创建链路及整形层次（netem延迟 + tbf带宽限制）的安装登记到批处理执行器"""
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"创建链路: {label} (IP: {ip1} <-> {ip2})")
+        
+        key = (node1, node2)
+        executor.add_veth(key, tsn_container_name, veth_tsn, dg_container_name, veth_dg)
+        executor.ip(key, tsn_container_name, f"link set {veth_tsn} up")
+        executor.ip(key, tsn_container_name, f"addr add {ip1} dev {veth_tsn}")
+        executor.ip(key, dg_container_name, f"link set {veth_dg} up")
+        executor.ip(key, dg_container_name, f"addr add {ip2} dev {veth_dg}")
+        self.plan_modify_link(executor, node1, node2, 0 if delay is None else delay, install=True)
+    
+    def plan_delete_link(self, executor, node1, node2):
+        """将删除链路的操作登记到批处理执行器"""
+        ip1, ip2 = self.generate_ip_addresses(node1, node2)
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        logger.info(f"删除链路: {label} (IP: {ip1} <-> {ip2})")
+        
+        # 删除任一端即会同时删除veth pair，另一端的删除失败可忽略
+        key = (node1, node2)
+        executor.ip(key, tsn_container_name, f"link delete {veth_tsn}", tolerant=True)
+        executor.ip(key, dg_container_name, f"link delete {veth_dg}", tolerant=True)
+    
+    def plan_modify_link(self, executor, node1, node2, delay, install=False):
+        """
+        将修改链路延迟的操作登记到批处理执行器（两端均设置延迟）
+
+        参数:
+        - install: 为True时安装整形层次，否则每端用一条 qdisc change 原地修改，tbf带宽限制保持不变
+        """
+        label, tsn_container_name, veth_tsn, dg_container_name, veth_dg = self.link_endpoints(node1, node2)
+        shape = self.link_shape.with_delay(delay)
+        logger.info(f"设置链路延迟: {label} (DELAY: {shape.delay} ms)")
+        
+        key = (node1, node2)
+        for container, dev in ((tsn_container_name, veth_tsn), (dg_container_name, veth_dg)):
+            commands = install_commands(dev, shape) if install else change_commands(dev, shape, self.link_shape)
+            for command in commands:
+                executor.tc(key, container, command)
+    
     def execute_script(self, script):
         """执行shell脚本并检查是否成功"""
         try:
@@ -273,100 +274,60 @@ class NetworkTopologyBuilder:
             return False
     
     def find_differences(self, old_matrix, new_matrix):
-        """找出两个矩阵之间的差异链路"""
-        rows, cols = old_matrix.shape
-        new_rows, new_cols = new_matrix.shape
-        
-        # 确保矩阵大小相同
-        if rows != new_rows or cols != new_cols:
-            logger.error(f"矩阵大小不匹配: 旧矩阵 {rows}x{cols} vs 新矩阵 {new_rows}x{new_cols}")
-            return [], [], []
-        
-        to_add = []
-        to_remove = []
-        to_modify = []
-        
-        for i in range(rows):
-            for j in range(cols):
-                # 链路存在与否的状态变化
-                if old_matrix[i, j] < 0 and new_matrix[i, j] >= 0:
-                    # 需要添加链路
-                    to_add.append((i, j))
-                elif old_matrix[i, j] >= 0 and new_matrix[i, j] < 0:
-                    # 需要删除链路
-                    to_remove.append((i, j))
-                elif old_matrix[i, j] >= 0 and new_matrix[i, j] >= 0 and old_matrix[i, j] != new_matrix[i, j]:
-                    # 链路属性变化，需要修改
-                    to_modify.append((i, j))
+        """找出两个矩阵之间的差异链路（TSN-DG全矩阵，两个矩阵大小需相同）"""
+        to_add, to_remove, to_modify = diff_matrices(old_matrix, new_matrix)
         
         logger.info(f"识别到差异: 添加 {len(to_add)} 条链路, 删除 {len(to_remove)} 条链路, 修改 {len(to_modify)} 条链路")
         return to_add, to_remove, to_modify
     
-    def validate_csv_file(self, csv_file):
-        """验证CSV文件是否有效"""
-        try:
-            df = pd.read_csv(csv_file, header=None, sep=',', dtype=float)
-            matrix = df.values
-            
-            # 检查矩阵维度
-            rows, cols = matrix.shape
-            if rows == 0 or cols == 0:
-                logger.error(f"无效的矩阵尺寸: {rows}x{cols}")
-                return False
-                
-            # 检查矩阵值是否合法
-            for i in range(rows):
-                for j in range(cols):
-                    # 这里可以添加任何值的验证逻辑
-                    pass
-                    
-            return True
-        except Exception as e:
-            logger.error(f"CSV文件验证失败: {e}")
+    def validate_matrix(self, matrix):
+        """验证已读取的矩阵是否有效（在内存中检查，不再重复解析CSV文件）"""
+        # 检查矩阵维度
+        rows, cols = matrix.shape
+        if rows == 0 or cols == 0:
+            logger.error(f"无效的矩阵尺寸: {rows}x{cols}")
             return False
+        return True
     
     def process_links_in_batches(self, links, operation, batch_size=20, new_matrix=None):
         """
-        批处理方式处理链路的创建、删除或修改
+        并行方式处理链路的创建、删除或修改
+        
+        使用有界线程池并发执行，同一容器的操作通过容器锁串行，
+        不同容器之间的操作并行，并发度根据宿主机负载自适应调整
         
         参数:
         - links: 待处理的链路列表，每个链路为元组 (node1, node2)
         - operation: 要执行的操作，可以是 "create_link"、"delete_link" 或 "modify_link"
-        - batch_size: 每批处理的链路数
+        - batch_size: 初始并发度
         - new_matrix: 如果有新矩阵，用于获取链路属性如延迟
+
+        返回:
+        - 失败的链路列表
         """
         total = len(links)
-        logger.info(f"开始{operation}，共 {total} 个链路，批次大小 {batch_size}")
-        
-        success_count = 0
+        logger.info(f"开始{operation}，共 {total} 个链路，初始并发度 {batch_size}")
         
         # 获取操作函数
         op_func = getattr(self, operation)
         
-        for i in range(0, total, batch_size):
-            batch = links[i:i+batch_size]
-            logger.info(f"处理批次 {i//batch_size + 1}，包含 {len(batch)} 个链路")
+        def make_task(node1, node2):
+            _, tsn_container_name, _, dg_container_name, _ = self.link_endpoints(node1, node2)
             
-            # 对批处理中的每个链路创建一个线程
-            for node1, node2 in batch:
-                try:
-                    if operation == "modify_link" and new_matrix is not None:
-                        # 修改链路需要传递延迟参数
-                        delay = new_matrix[node1, node2]
-                        if op_func(node1, node2, delay):
-                            success_count += 1
-                    else:
-                        # 创建或删除链路
-                        if op_func(node1, node2):
-                            success_count += 1
-                except Exception as e:
-                    logger.error(f"{operation} 链路 {node1}-{node2} 时出错: {e}")
-            
-            # 批次间短暂暂停，避免系统负载过高
-            time.sleep(0.5)
+            def task():
+                if operation == "modify_link" and new_matrix is not None:
+                    # 修改链路需要传递延迟参数
+                    return op_func(node1, node2, new_matrix[node1, node2])
+                # 创建或删除链路
+                return op_func(node1, node2)
+            return (tsn_container_name, dg_container_name), task
+        
+        applier = ParallelLinkApplier(initial_workers=batch_size)
+        results = applier.run([make_task(node1, node2) for node1, node2 in links], description=operation)
+        success_count = sum(1 for result in results if result)
         
         logger.info(f"{operation}链路完成: {success_count}/{total} 成功")
-        return success_count
+        return [tuple(link) for link, result in zip(links, results) if not result]
     
     def update_topology(self, csv_file):
         """根据CSV文件更新网络拓扑"""
@@ -374,39 +335,29 @@ class NetworkTopologyBuilder:
         if new_matrix is None:
             logger.error("无法更新拓扑：读取矩阵失败")
             return False
-        
+        return self.apply_matrix(new_matrix)
+
+    def apply_matrix(self, new_matrix):
+        """将已读取的可见性矩阵（稠密数组或SparseTopology）应用到网络拓扑"""
         if self.current_matrix is not None:
             # 找出需要添加和删除的链路
             to_add, to_remove, to_modify = self.find_differences(self.current_matrix, new_matrix)
-            
-            # 使用批处理删除旧链路
-            if to_remove:
-                self.process_links_in_batches(to_remove, "delete_link", new_matrix=new_matrix)
-            
-            # 使用批处理添加新链路
-            if to_add:
-                self.process_links_in_batches(to_add, "create_link", new_matrix=new_matrix)
-
-            # 使用批处理修改链路
-            if to_modify:
-                self.process_links_in_batches(to_modify, "modify_link", new_matrix=new_matrix)
+            self.apply_differences(to_add, to_remove, to_modify, new_matrix)
                     
         else:
             # 第一次运行，初始化所有链路
             rows,cols = new_matrix.shape
             logger.info(f"首次初始化，矩阵大小: {rows}x{cols}")
             
-            links_to_create = []
-            for i in range(rows):
-                for j in range(cols):  # 处理TSN-DG全矩阵
-                    if new_matrix[i, j] >= 0:  # 如果有链路
-                        links_to_create.append((i, j))
+            links_to_create = active_links(new_matrix)  # 处理TSN-DG全矩阵
             
             if links_to_create:
-                self.process_links_in_batches(links_to_create, "create_link", new_matrix=new_matrix)
+                self.apply_differences(links_to_create, [], [], new_matrix)
         
         # 更新当前矩阵
         self.current_matrix = new_matrix
+        # 持久化本时间片新分配的链路子网
+        self.ip_allocator.save()
         # 显示当前拓扑状态
         self.print_topology_status()
         return True
@@ -418,32 +369,19 @@ class NetworkTopologyBuilder:
             return
         
         rows,cols = self.current_matrix.shape
-        active_links = 0
-        
-        for i in range(rows):
-            for j in range(cols):
-                if self.current_matrix[i, j] >= 0:
-                    active_links += 1
+        active_link_count = count_active_links(self.current_matrix)
         
         logger.info(f"当前网络拓扑状态:")
         logger.info(f"  容器数量: {rows}TSN-{cols}DG")
-        logger.info(f"  活跃链路: {active_links}")
+        logger.info(f"  活跃链路: {active_link_count}")
         logger.info(f"  总链路容量: {rows * cols}")
     
     def build_network_from_csv(self, directory):    
         """从CSV目录中选择第一个文件构建网络拓扑"""
         directory = Path(directory)
         
-        # 尝试以数字顺序排序CSV文件（例如output_1.csv, output_2.csv...）
-        def get_csv_number(filename):
-            # 从文件名中提取数字
-            match = re.search(r'(\d+)', filename.stem)
-            if match:
-                return int(match.group(1))
-            return float('inf')  # 没有数字的放到最后
-        
-        # 获取目录中的所有CSV文件并排序
-        csv_files = sorted([f for f in directory.glob("*.csv")], key=get_csv_number)
+        # 按文件名中的时间片编号排序（例如output_1.csv, output_2.csv...）
+        csv_files = [csv_file for _, csv_file in list_slice_files(directory)]
         
         if not csv_files:
             logger.error(f"目录 {directory} 中没有找到CSV文件")
@@ -455,10 +393,11 @@ class NetworkTopologyBuilder:
         csv_file = csv_files[0]
         logger.info(f"处理文件: {csv_file}")
         
-        # 验证并更新网络拓扑
-        if self.validate_csv_file(csv_file):
+        # 只解析一次CSV文件，读取后在内存中验证并应用
+        matrix = self.read_matrix_from_csv(csv_file)
+        if matrix is not None and self.validate_matrix(matrix):
             start_time = time.time()
-            success = self.update_topology(csv_file)
+            success = self.apply_matrix(matrix)
             elapsed = time.time() - start_time
             
             if success:
@@ -482,16 +421,49 @@ class NetworkTopologyBuilder:
         else:
             logger.error(f"CSV文件验证失败: {csv_file}")
             return False
-    def generate_domain_tables(self):
-        """为每个TSN节点生成分域表（能看到的低轨卫星IP列表）并写入到TSN节点"""
+    def build_network_from_timeline(self, timeline_file):
+        """从预编译的二进制时间线文件中取第一个时间片构建网络拓扑，并生成分域表"""
+        with TimelineStore(timeline_file) as timeline:
+            if len(timeline) == 0:
+                logger.error(f"时间线文件 {timeline_file} 中没有时间片")
+                return False
+            logger.info(f"时间线包含 {len(timeline)} 个时间片，将使用第一个时间片: {timeline.names[0]}")
+
+            start_time = time.time()
+            # 复制出时间线文件关闭后仍需使用的矩阵
+            first_matrix = timeline.matrix_at(0)
+            if not isinstance(first_matrix, SparseTopology):
+                first_matrix = first_matrix.copy()
+            success = self.apply_matrix(first_matrix)
+            elapsed = time.time() - start_time
+
+        if not success:
+            logger.error(f"应用拓扑失败: {timeline.names[0]}")
+            return False
+        logger.info(f"成功应用拓扑: {timeline.names[0]} (耗时: {elapsed:.2f}秒)")
+
+        logger.info("开始生成分域表并写入到TSN节点...")
+        if not self.generate_domain_tables():
+            logger.warning("分域表生成过程中出现问题，请检查日志")
+        return True
+
+    def generate_domain_tables(self, tsn_rows=None):
+        """
+        为每个TSN节点生成分域表（能看到的低轨卫星IP列表）并写入到TSN节点
+
+        参数:
+        - tsn_rows: 只为这些TSN行生成分域表，默认为全部TSN
+        """
         if self.current_matrix is None:
             logger.error("当前没有加载任何网络拓扑，无法生成分域表")
             return False
         
         rows, cols = self.current_matrix.shape
-        logger.info(f"开始为 {rows} 个TSN节点生成分域表")
+        if tsn_rows is None:
+            tsn_rows = range(rows)
+        logger.info(f"开始为 {len(tsn_rows)} 个TSN节点生成分域表")
         
-        for tsn_idx in range(rows):
+        for tsn_idx in tsn_rows:
             original_tsn_idx = tsn_idx + 1  # 转换为原始节点编号
             
             # 查找与当前TSN节点相连的所有低轨卫星节点IP
@@ -501,18 +473,17 @@ class NetworkTopologyBuilder:
             # 获取当前TSN的VM信息
             tsn_vm_name, tsn_vm_ip = self.vm_sat_ip_map("TSN", original_tsn_idx)
             
-            for dg_idx in range(cols):
-                if self.current_matrix[tsn_idx, dg_idx] >= 0:
-                    if dg_idx < 12:  # YG节点
-                        original_dg_idx = dg_idx + 1
-                        dg_type = "YG"
-                    else:  # XW节点
-                        original_dg_idx = dg_idx - 12 + 1
-                        dg_type = "XW"
-
-                    dg_vm_name, dg_vm_ip = self.vm_sat_ip_map(dg_type, original_dg_idx)
-                    dg_ips.append(dg_vm_ip)
-                    dg_info.append(f"{dg_type}{original_dg_idx}({dg_vm_ip})")
+            for dg_idx in connected_columns(self.current_matrix, tsn_idx):
+                if dg_idx < 12:  # YG节点
+                    original_dg_idx = dg_idx + 1
+                    dg_type = "YG"
+                else:  # XW节点
+                    original_dg_idx = dg_idx - 12 + 1
+                    dg_type = "XW"
+
+                dg_vm_name, dg_vm_ip = self.vm_sat_ip_map(dg_type, original_dg_idx)
+                dg_ips.append(dg_vm_ip)
+                dg_info.append(f"{dg_type}{original_dg_idx}({dg_vm_ip})")
             
             if not dg_ips:
                 logger.info(f"TSN{original_tsn_idx} 没有连接的低轨卫星节点")
@@ -527,6 +498,30 @@ class NetworkTopologyBuilder:
         logger.info("所有TSN节点分域表生成完成")
         return True
     
+    def follow_domain_tables(self, socket_path, wait=60.0):
+        """
+        订阅TSN链路管理脚本发布的拓扑变化事件，分域成员变化时只重写变化的TSN的分域表
+
+        分域以已提交的时间片为准，不再重新读取CSV文件；连接关闭（链路管理脚本退出）时返回
+
+        参数:
+        - socket_path: dynamic_frr_tsn_scan_multi_thread.py --event-socket 的套接字路径
+        - wait: 链路管理脚本尚未启动时最多等待的秒数
+        """
+        subscriber = TopologySubscriber(socket_path).connect(wait)
+        logger.info(f"已订阅拓扑变化事件: {socket_path}")
+        try:
+            for event in subscriber.events():
+                rows = sorted(int(row) for row in event['domains'])
+                if not rows:
+                    logger.info(f"时间片 {event['slice']} 分域成员没有变化")
+                    continue
+                self.current_matrix = subscriber.matrix()
+                logger.info(f"时间片 {event['slice']} 中 {len(rows)} 个TSN的分域成员变化，重写其分域表")
+                self.generate_domain_tables(rows)
+        finally:
+            subscriber.close()
+
     def write_domain_table_to_tsn(self, tsn_vm_name, dg_ips_str, tsn_idx, dg_info):
         """将分域表写入到TSN节点"""
         try:
@@ -609,20 +604,53 @@ def main():
                         help='YG容器名称前缀，默认为clab-sat-network-YG')
     parser.add_argument('--container-xw-prefix', default='clab-sat-network-XW',
                         help='XW容器名称前缀，默认为clab-sat-network-XW')
+    parser.add_argument('--no-batch', action='store_true',
+                        help='关闭批处理模式，逐条链路执行bash脚本')
+    parser.add_argument('--sparse', action='store_true',
+                        help='以稀疏格式读取可见性矩阵，适用于大规模星座')
+    parser.add_argument('--timeline', help='预编译的二进制时间线文件（由timeline_store.py生成），指定后代替--csv_dir')
+    parser.add_argument('--ip-pool', action='append',
+                        help='链路子网地址池CIDR，可多次指定，默认为 10.0.0.0/18')
+    parser.add_argument('--rate', default='50kbit', help='链路限速，在netem下挂tbf，默认50kbit')
+    parser.add_argument('--ip-state', default='ip_allocation_tsn.json',
+                        help='链路子网分配的持久化文件，默认为ip_allocation_tsn.json')
+    parser.add_argument('--backend', choices=BACKENDS, default='docker',
+                        help='容器后端: docker为containerlab容器，netns为同名的ip netns命名空间（离线/规模测试），'
+                             'dry-run只记录命令不执行，默认docker')
+    parser.add_argument('--follow-events', nargs='?', const=EVENT_SOCKETS['tsn'],
+                        help=f"构建完成后订阅TSN链路管理脚本的拓扑变化事件，分域成员变化时重写对应TSN的分域表，"
+                             f"不指定路径时为{EVENT_SOCKETS['tsn']}")
     args = parser.parse_args()
+
+    if args.backend != 'docker' and args.no_batch:
+        parser.error("逐链路模式（--no-batch）只支持docker后端")
+    backend = make_backend(args.backend)
+    set_default_backend(backend)
     
     logger.info(f"启动FRR网络拓扑构建，处理目录: {args.csv_dir}")
 
     builder = NetworkTopologyBuilder(base_tsn_container_name=args.container_tsn_prefix,
                                      base_yg_container_name=args.container_yg_prefix,
                                      base_xw_container_name=args.container_xw_prefix,
+                                     batch_mode=not args.no_batch,
+                                     sparse=args.sparse,
+                                     ip_pools=args.ip_pool,
+                                     ip_state_file=args.ip_state,
+                                     link_shape=LinkShape(rate=args.rate),
                                      )
-    success = builder.build_network_from_csv(args.csv_dir)
+    if args.timeline:
+        success = builder.build_network_from_timeline(args.timeline)
+    else:
+        success = builder.build_network_from_csv(args.csv_dir)
+    if args.backend == 'dry-run':
+        backend.log_summary()
     
     if success:
         logger.info("FRR网络拓扑构建成功")
     else:
         logger.error("FRR网络拓扑构建失败")
+    if success and args.follow_events:
+        builder.follow_domain_tables(args.follow_events)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import os
+import json
+import bisect
+import logging
+import threading
+import ipaddress
+
+logger = logging.getLogger(__name__)
+
+# OSPF在所有节点上宣告的网段（见generate_initial_topo.py），链路地址池超出该网段时需同步修改
+OSPF_NETWORK = ipaddress.ip_network("10.0.0.0/16")
+
+# 不参与链路分配的保留网段: VM地址 10.0.64.0/24，TSN环形链路 10.0.{100+tsn_id}.0/30
+RESERVED_NETWORKS = (
+    ("10.0.64.0", "10.0.64.255"),
+    ("10.0.100.0", "10.0.199.255"),
+)
+
+# 默认地址池：TSN-低轨卫星链路与XW星间链路各用一段，互不重叠
+TSN_LINK_POOLS = ("10.0.0.0/18",)
+XW_LINK_POOLS = ("10.0.192.0/18",)
+
+
+def pair_index(i, j, symmetric=False):
+    """
+    将节点对映射为唯一的非负整数编号，O(1)且与矩阵大小无关
+
+    - symmetric=True（XW星间链路）：(i, j)与(j, i)视为同一链路，按上三角编号 j*(j-1)/2 + i（i<j）
+    - symmetric=False（TSN×DG链路）：按Szudzik配对函数编号，节点编号均小于K时编号小于K²
+    """
+    i, j = int(i), int(j)
+    if i < 0 or j < 0:
+        raise ValueError(f"节点编号必须为非负整数: ({i}, {j})")
+    if symmetric:
+        if i == j:
+            raise ValueError(f"对称链路的两端不能是同一节点: {i}")
+        i, j = min(i, j), max(i, j)
+        return j * (j - 1) // 2 + i
+    if i < j:
+        return j * j + i
+    return i * i + i + j
+
+
+class PairSubnetAllocator:
+    def __init__(self, pools, symmetric=False, prefixlen=30, reserved=RESERVED_NETWORKS, state_file=None):
+        """
+        按节点对编号确定性地分配链路子网
+
+        第k个节点对使用地址池中（去掉保留网段后）的第k个子网，不同节点对永远不会得到相同的子网。
+
+        参数:
+        - pools: 地址池CIDR列表，可以大于/16，多个地址池按顺序拼接
+        - symmetric: 是否将(i, j)与(j, i)视为同一链路
+        - prefixlen: 每条链路的子网前缀长度，默认/30
+        - reserved: 不参与分配的 (起始地址, 结束地址) 列表
+        - state_file: 分配结果持久化文件，为None时不持久化
+        """
+        if not 0 < prefixlen <= 30:
+            raise ValueError(f"链路子网前缀长度必须在 /1 ~ /30 之间: /{prefixlen}")
+        self.pools = [str(ipaddress.ip_network(p)) for p in pools]
+        for a, pool_a in enumerate(self.pools):
+            for pool_b in self.pools[a + 1:]:
+                if ipaddress.ip_network(pool_a).overlaps(ipaddress.ip_network(pool_b)):
+                    raise ValueError(f"地址池 {pool_a} 与 {pool_b} 重叠")
+        self.symmetric = symmetric
+        self.prefixlen = prefixlen
+        self.block_size = 2 ** (32 - prefixlen)
+        self.state_file = state_file
+        self.assignments = {}  # "i-j" -> 子网CIDR
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        reserved_ranges = sorted((int(ipaddress.ip_address(start)), int(ipaddress.ip_address(end)))
+                                 for start, end in reserved)
+        # 可用地址段：[(段起始子网序号, 段起始地址, 子网数)]，按段起始子网序号有序
+        self._segments = []
+        total = 0
+        for pool in self.pools:
+            network = ipaddress.ip_network(pool)
+            if network.prefixlen > prefixlen:
+                raise ValueError(f"地址池 {pool} 小于单条链路子网 /{prefixlen}")
+            if not network.subnet_of(OSPF_NETWORK):
+                logger.warning(f"地址池 {pool} 不在OSPF宣告网段 {OSPF_NETWORK} 内，需同步修改generate_initial_topo.py中的network声明")
+            for start, end in self._subtract(int(network.network_address), int(network.broadcast_address), reserved_ranges):
+                # 对齐到子网边界
+                start = -(-start // self.block_size) * self.block_size
+                count = (end + 1 - start) // self.block_size
+                if count > 0:
+                    self._segments.append((total, start, count))
+                    total += count
+        self.capacity = total
+        self._segment_starts = [seg[0] for seg in self._segments]
+        logger.info(f"链路子网分配器: 地址池 {', '.join(self.pools)}，可分配 {self.capacity} 个 /{prefixlen} 子网")
+
+        if state_file:
+            self._load()
+
+    @staticmethod
+    def _subtract(start, end, reserved_ranges):
+        """从地址区间 [start, end] 中去掉保留区间，返回剩余区间列表"""
+        ranges = []
+        cursor = start
+        for r_start, r_end in reserved_ranges:
+            if r_end < cursor or r_start > end:
+                continue
+            if r_start > cursor:
+                ranges.append((cursor, r_start - 1))
+            cursor = max(cursor, r_end + 1)
+        if cursor <= end:
+            ranges.append((cursor, end))
+        return ranges
+
+    def _config(self):
+        return {'pools': self.pools, 'symmetric': self.symmetric, 'prefixlen': self.prefixlen,
+                'capacity': self.capacity}
+
+    def _load(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取子网分配文件 {self.state_file} 失败: {e}")
+            return
+        if state.get('config') != self._config():
+            # 地址池配置变化后旧分配不再有效，已存在的链路需要重建才能使用新地址
+            logger.warning(f"子网分配文件 {self.state_file} 的地址池配置与当前不一致，已忽略其中 {len(state.get('assignments', {}))} 条旧分配")
+            self._dirty = True
+            return
+        self.assignments = state.get('assignments', {})
+        logger.info(f"从 {self.state_file} 加载 {len(self.assignments)} 条链路子网分配")
+
+    def save(self):
+        """将分配结果原子写入持久化文件（无新分配时不写）"""
+        if not self.state_file:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {'config': self._config(), 'assignments': dict(self.assignments)}
+            self._dirty = False
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.state_file)
+
+    def subnet(self, i, j):
+        """返回节点对 (i, j) 的链路子网"""
+        index = pair_index(i, j, self.symmetric)
+        if index >= self.capacity:
+            raise ValueError(f"地址池已耗尽: 节点对 ({i}, {j}) 的编号 {index} 超出容量 {self.capacity}")
+        pos = bisect.bisect_right(self._segment_starts, index) - 1
+        first_index, first_address, _ = self._segments[pos]
+        address = first_address + (index - first_index) * self.block_size
+        return ipaddress.ip_network((address, self.prefixlen))
+
+    def addresses(self, i, j):
+        """
+        返回节点对 (i, j) 两端的接口地址
+
+        返回:
+        - (i端地址, j端地址)，形如 "10.0.0.1/30"
+        """
+        if self.symmetric and i > j:
+            ip_j, ip_i = self.addresses(j, i)
+            return ip_i, ip_j
+
+        network = self.subnet(i, j)
+        hosts = network.hosts()
+        ip1 = f"{next(hosts)}/{self.prefixlen}"
+        ip2 = f"{next(hosts)}/{self.prefixlen}"
+
+        key = f"{i}-{j}"
+        with self._lock:
+            if self.assignments.get(key) != str(network):
+                self.assignments[key] = str(network)
+                self._dirty = True
+        return ip1, ip2
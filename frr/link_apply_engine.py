@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class ContainerLockTable:
+    def __init__(self):
+        """按容器名分配互斥锁，保证同一命名空间内的操作串行执行"""
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def lock(self, container):
+        """返回指定容器对应的锁"""
+        with self._guard:
+            if container not in self._locks:
+                self._locks[container] = threading.Lock()
+            return self._locks[container]
+
+    @contextmanager
+    def hold(self, containers):
+        """同时持有多个容器的锁，按容器名排序加锁以避免死锁"""
+        locks = [self.lock(c) for c in sorted(set(containers))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+_container_locks = ContainerLockTable()
+
+
+def get_container_locks():
+    """返回进程内共享的容器锁表"""
+    return _container_locks
+
+
+class HostLoadMonitor:
+    def __init__(self):
+        """通过/proc/stat的CPU时间增量测量宿主机繁忙程度，不可用时退化为loadavg"""
+        self._last = self._read_cpu_times()
+
+    def _read_cpu_times(self):
+        try:
+            with open('/proc/stat', 'r') as f:
+                fields = f.readline().split()[1:]
+            values = [int(v) for v in fields]
+            idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+            return sum(values), idle
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def busy_ratio(self):
+        """返回自上次采样以来的CPU繁忙比例（0~1）"""
+        current = self._read_cpu_times()
+        if current is None or self._last is None:
+            try:
+                return min(1.0, os.getloadavg()[0] / (os.cpu_count() or 1))
+            except OSError:
+                return 0.0
+        total = current[0] - self._last[0]
+        idle = current[1] - self._last[1]
+        self._last = current
+        if total <= 0:
+            return 0.0
+        return max(0.0, min(1.0, 1.0 - idle / total))
+
+
+class ParallelLinkApplier:
+    def __init__(self, max_workers=None, min_workers=2, initial_workers=None,
+                 target_busy=0.85, lock_table=None, sample_interval=0.5):
+        """
+        初始化并行链路应用引擎
+
+        参数:
+        - max_workers: 工作线程上限，默认为CPU核数的4倍（链路操作主要等待子进程）
+        - min_workers: 并发度下限
+        - initial_workers: 初始并发度，默认取上限的一半
+        - target_busy: 目标CPU繁忙比例，超过则降低并发度，明显低于则提高并发度
+        - lock_table: 容器锁表，默认使用进程内共享锁表
+        - sample_interval: 两次负载采样之间的最短间隔（秒）
+        """
+        cpu = os.cpu_count() or 1
+        self.max_workers = max_workers or cpu * 4
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.concurrency = max(self.min_workers, min(initial_workers or self.max_workers // 2, self.max_workers))
+        self.target_busy = target_busy
+        self.lock_table = lock_table or get_container_locks()
+        self.sample_interval = sample_interval
+        self.monitor = HostLoadMonitor()
+        self._last_sample = time.monotonic()
+
+    def _adapt(self):
+        """根据测得的宿主机负载调整并发度（加性增、乘性减）"""
+        now = time.monotonic()
+        if now - self._last_sample < self.sample_interval:
+            return
+        self._last_sample = now
+        busy = self.monitor.busy_ratio()
+        old = self.concurrency
+        if busy > self.target_busy:
+            self.concurrency = max(self.min_workers, int(self.concurrency * 0.75))
+        elif busy < self.target_busy * 0.7:
+            self.concurrency = min(self.max_workers, self.concurrency + max(1, self.concurrency // 4))
+        if self.concurrency != old:
+            logger.debug(f"宿主机CPU繁忙比例 {busy:.2f}，并发度 {old} -> {self.concurrency}")
+
+    def _run_locked(self, containers, func):
+        with self.lock_table.hold(containers):
+            return func()
+
+    def run(self, tasks, description="链路操作"):
+        """
+        并行执行一组链路任务
+
+        参数:
+        - tasks: [(涉及的容器名列表, 无参可调用对象)]
+        - description: 日志中显示的操作名称
+
+        返回:
+        - 与tasks顺序一致的结果列表，任务抛出异常时对应结果为None
+        """
+        total = len(tasks)
+        results = [None] * total
+        if total == 0:
+            return results
+
+        pending = list(range(total))
+        busy_containers = set()
+        running = {}  # future -> 任务下标
+        start_time = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # 优先派发所涉容器当前空闲的任务，同一容器的任务自然串行
+                deferred = []
+                while pending and len(running) < self.concurrency:
+                    idx = pending.pop(0)
+                    containers = set(tasks[idx][0])
+                    if containers & busy_containers:
+                        deferred.append(idx)
+                        continue
+                    busy_containers |= containers
+                    future = executor.submit(self._run_locked, containers, tasks[idx][1])
+                    running[future] = idx
+                pending = deferred + pending
+
+                if not running:
+                    continue
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    idx = running.pop(future)
+                    busy_containers -= set(tasks[idx][0])
+                    try:
+                        results[idx] = future.result()
+                    except Exception as e:
+                        logger.error(f"{description} 任务执行出错: {e}")
+                self._adapt()
+
+        elapsed = time.time() - start_time
+        logger.info(f"{description} 并行执行完成: {total} 个任务, 耗时 {elapsed:.2f}秒, 最终并发度 {self.concurrency}")
+        return results
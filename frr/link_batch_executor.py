@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from container_backend import DockerBackend, get_default_backend
+from link_apply_engine import get_container_locks
+from link_metrics import get_default_metrics
+
+logger = logging.getLogger(__name__)
+
+# ip/tc 在 -force -batch 模式下对每条失败命令输出 "Command failed -:<行号>"
+BATCH_FAILED_PATTERN = re.compile(r'Command failed \S*:(\d+)')
+
+
+class LinkBatchExecutor:
+    def __init__(self, use_sudo=True, max_workers=16, netns_cache=None, backend=None):
+        """
+        初始化链路批处理执行器
+
+        将一个时间片内所有链路的增删改操作收集起来，提交时：
+        1. 在宿主机上用一次 ip -batch 创建所有veth pair并直接放入两端容器的命名空间
+        2. 对每个容器命名空间各执行一次 ip -batch 和一次 tc -batch，不同命名空间并行执行
+
+        参数:
+        - use_sudo: 是否以sudo执行ip/tc/nsenter命令
+        - max_workers: 并行处理命名空间的最大线程数
+        - netns_cache: 容器PID/命名空间缓存，默认使用进程内共享缓存
+        - backend: 容器后端（见container_backend），默认使用进程内共享后端；
+                   指定了netns_cache或use_sudo=False时使用对应的docker后端
+        """
+        if backend is None:
+            if netns_cache is not None or not use_sudo:
+                backend = DockerBackend(netns_cache=netns_cache, use_sudo=use_sudo)
+            else:
+                backend = get_default_backend()
+        self.backend = backend
+        self.max_workers = max_workers
+        self.metrics = get_default_metrics()
+        self.reset()
+
+    def reset(self):
+        """清空已登记的操作"""
+        self.veth_pairs = []    # [(link_key, container1, veth1, container2, veth2)]
+        self.ip_commands = {}   # container -> [(link_key, command, tolerant)]
+        self.tc_commands = {}   # container -> [(link_key, command, tolerant)]
+        self.link_keys = []     # 按登记顺序记录的链路标识
+
+    def _register(self, link_key):
+        if link_key not in self.link_keys:
+            self.link_keys.append(link_key)
+
+    def add_veth(self, link_key, container1, veth1, container2, veth2):
+        """登记一个veth pair，两端分别放入container1和container2的命名空间"""
+        self._register(link_key)
+        self.veth_pairs.append((link_key, container1, veth1, container2, veth2))
+
+    def ip(self, link_key, container, command, tolerant=False):
+        """
+        登记一条在容器命名空间内执行的ip命令（不含开头的ip）
+
+        参数:
+        - tolerant: 为True时该命令失败不计为链路操作失败（如删除已不存在的接口）
+        """
+        self._register(link_key)
+        self.ip_commands.setdefault(container, []).append((link_key, command, tolerant))
+
+    def tc(self, link_key, container, command, tolerant=False):
+        """登记一条在容器命名空间内执行的tc命令（不含开头的tc）"""
+        self._register(link_key)
+        self.tc_commands.setdefault(container, []).append((link_key, command, tolerant))
+
+    def __len__(self):
+        return len(self.link_keys)
+
+    def resolve_pids(self, containers):
+        """通过容器后端解析所有容器的命名空间句柄（docker后端为PID），返回 {容器名: 句柄}"""
+        return self.backend.resolve(containers)
+
+    def _run_batch(self, argv, entries):
+        """
+        以 -force -batch 方式执行一组命令，返回失败的链路标识集合
+
+        参数:
+        - argv: 批处理进程的命令行，命令通过stdin传入
+        - entries: [(link_key, command, tolerant)]
+        """
+        if not entries:
+            return set()
+        script = "\n".join(command for _, command, _ in entries) + "\n"
+        try:
+            result = self.backend.run(argv, input=script)
+        except Exception as e:
+            logger.error(f"执行批处理命令时出错: {e}")
+            return {key for key, _, tolerant in entries if not tolerant}
+
+        failed_lines = {int(n) for n in BATCH_FAILED_PATTERN.findall(result.stderr)}
+        if result.returncode != 0 and not failed_lines:
+            # 进程本身执行失败（如命名空间不存在），整批视为失败
+            logger.warning(f"批处理执行失败，返回码: {result.returncode}")
+            logger.debug(f"错误输出: {result.stderr}")
+            return {key for key, _, tolerant in entries if not tolerant}
+
+        failed = set()
+        for line_no in failed_lines:
+            if 1 <= line_no <= len(entries):
+                key, command, tolerant = entries[line_no - 1]
+                if not tolerant:
+                    logger.debug(f"批处理命令失败: {command}")
+                    failed.add(key)
+        return failed
+
+    def _apply_namespace(self, container, pid, skip_keys):
+        """在单个容器命名空间内依次执行ip批处理和tc批处理"""
+        ip_entries = [e for e in self.ip_commands.get(container, []) if e[0] not in skip_keys]
+        tc_entries = [e for e in self.tc_commands.get(container, []) if e[0] not in skip_keys]
+
+        if pid is None:
+            return {key for key, _, tolerant in ip_entries + tc_entries if not tolerant}
+
+        backend = self.backend
+        # 与逐链路并行引擎共用容器锁，保证同一命名空间内的操作串行
+        with get_container_locks().hold([container]):
+            with self.metrics.timer('ip', container, ops=len(ip_entries)) as timing:
+                failed = self._run_batch(backend.exec_argv(container, pid, ['ip', '-force', '-batch', '-']), ip_entries)
+                timing.failures = len(failed)
+            with self.metrics.timer('tc', container, ops=len(tc_entries)) as timing:
+                tc_failed = self._run_batch(backend.exec_argv(container, pid, ['tc', '-force', '-batch', '-']), tc_entries)
+                timing.failures = len(tc_failed)
+        return failed | tc_failed
+
+    def commit(self, on_namespace_done=None):
+        """
+        提交所有已登记的操作
+
+        参数:
+        - on_namespace_done: 可选，每个容器命名空间的批处理执行完成后调用
+                             on_namespace_done(容器名, 失败的链路标识集合)，按完成顺序在提交线程中调用
+
+        返回:
+        - {link_key: 是否成功}，按登记顺序排列
+        """
+        containers = set(self.ip_commands) | set(self.tc_commands)
+        for _, container1, _, container2, _ in self.veth_pairs:
+            containers.update((container1, container2))
+        with self.metrics.timer('resolve', ops=len(containers)):
+            pids = self.resolve_pids(containers)
+
+        failed = set()
+
+        # 宿主机侧：一次批处理创建所有veth pair并放入对应命名空间
+        host_entries = []
+        for key, container1, veth1, container2, veth2 in self.veth_pairs:
+            pid1, pid2 = pids.get(container1), pids.get(container2)
+            if pid1 is None or pid2 is None:
+                failed.add(key)
+                continue
+            netns1, netns2 = self.backend.netns_ref(pid1), self.backend.netns_ref(pid2)
+            host_entries.append((key, f"link add {veth1} netns {netns1} type veth peer name {veth2} netns {netns2}", False))
+        if host_entries:
+            logger.info(f"批量创建 {len(host_entries)} 个veth pair")
+            with self.metrics.timer('veth', ops=len(host_entries)) as timing:
+                host_failed = self._run_batch(self.backend.host_argv(['ip', '-force', '-batch', '-']), host_entries)
+                timing.failures = len(host_failed)
+            failed |= host_failed
+
+        # 容器侧：每个命名空间一次ip批处理和一次tc批处理，不同命名空间并行
+        skip_keys = set(failed)
+        ns_containers = sorted(set(self.ip_commands) | set(self.tc_commands))
+        if ns_containers:
+            logger.info(f"在 {len(ns_containers)} 个容器命名空间中并行提交批处理")
+            workers = max(1, min(self.max_workers, len(ns_containers)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._apply_namespace, c, pids.get(c), skip_keys): c
+                           for c in ns_containers}
+                for future in as_completed(futures):
+                    ns_failed = future.result()
+                    failed |= ns_failed
+                    if on_namespace_done is not None:
+                        on_namespace_done(futures[future], ns_failed)
+
+        results = {key: key not in failed for key in self.link_keys}
+        logger.info(f"批处理提交完成: {len(results) - len(failed & set(results))}/{len(results)} 条链路成功")
+        self.reset()
+        return results
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+import pandas as pd
+from link_batch_executor import LinkBatchExecutor
+from topology_diff import active_links, diff_matrices
+from topology_reconciler import TopologyReconciler
+from sparse_topology import SparseTopology
+from timeline_store import TimelineStore, list_slice_files
+from slice_scheduler import SliceScheduler, LATE_POLICIES
+from timeline_controller import TimelineController, CONTROL_SOCKETS
+from netns_cache import get_default_cache
+from link_metrics import get_default_metrics
+from container_backend import BACKENDS
+from link_shaping import LinkShape
+from delay_filter import DelayChangeFilter
+from delay_interpolator import DelayInterpolator, INTERPOLATION_MODES
+from topology_journal import TopologyJournal
+from topology_events import TopologyEventPublisher, EVENT_SOCKETS
+from slice_prefetcher import SlicePrefetcher
+from ip_allocator import PairSubnetAllocator
+
+logger = logging.getLogger(__name__)
+
+
+class LinkManagerBase:
+    """
+    dynamic_frr_xw.py、dynamic_frr_tsn_scan_multi_thread.py 与 frr_network_builder.py 的链路管理器共用的状态和时间片流程
+
+    子类提供矩阵相关的部分（symmetric_matrix、default_ip_pools、event_source、generate_ip_addresses、plan_*_link 等）
+    """
+    # 链路子网地址池的默认值，以及拓扑变化事件中的链路类型（见topology_events）
+    default_ip_pools = None
+    event_source = None
+
+    def __init__(self, csv_dir, batch_mode=True, sparse=False, lookahead=False,
+                 ip_pools=None, ip_state_file=None, reconcile=False,
+                 link_shape=None, delay_threshold=0.0, delay_rel_threshold=0.0, delay_max_staleness=None,
+                 journal_file=None, event_socket=None, prefetch=False,
+                 interpolate=None, interpolate_step=1.0, interpolate_tc_rate=200.0):
+        """
+        初始化链路管理器的共用状态
+
+        参数:
+        - batch_mode: 是否将整个时间片的链路差异合并为按命名空间的ip/tc批处理提交
+        - sparse: 是否以稀疏格式（只保存可见链路）读取矩阵，用于大规模星座
+        - lookahead: 是否在当前时间片内预创建下一时间片的链路（仅批处理模式），时间片边界处只需启停接口和调整延迟
+        - ip_pools: 链路子网地址池CIDR列表，默认为子类的 default_ip_pools
+        - ip_state_file: 链路子网分配的持久化文件，为None时不持久化
+        - reconcile: 是否在启动时以及链路操作失败后，根据容器内实际状态校正拓扑
+        - link_shape: 链路整形模板（抖动/丢包/限速），延迟由矩阵决定，默认只设置延迟
+        - delay_threshold/delay_rel_threshold: 延迟变化的绝对阈值（毫秒）和相对阈值，未超过时暂缓下发tc修改
+        - delay_max_staleness: 暂缓下发的最大时间片数，为None时不限制
+        - journal_file: 崩溃安全日志文件，记录已提交的时间片以便续跑，为None时不记录
+        - event_socket: 拓扑变化事件的unix套接字路径（见topology_events），为None时不发布
+        - prefetch: 是否在当前时间片的等待期间于后台读取、校验下一时间片并计算链路差异（见slice_prefetcher）
+        - interpolate: 时间片之间的链路延迟插值方式（linear/spline，见delay_interpolator，仅批处理模式），为None时不插值
+        - interpolate_step/interpolate_tc_rate: 插值的子时间片步长（秒）和所有链路合计每秒最多的tc调用数
+        """
+        self.csv_dir = csv_dir
+        self.batch_mode = batch_mode
+        self.sparse = sparse
+        self.auto_reconcile = reconcile
+        self.link_shape = link_shape or LinkShape()
+        # 与已下发的延迟比较，跳过netem精度下无意义的修改
+        self.delay_filter = DelayChangeFilter(delay_threshold, delay_rel_threshold, delay_max_staleness,
+                                              convert=self.netem_delay_ms)
+        self.journal = TopologyJournal(journal_file) if journal_file else None
+        self.events = None
+        if event_socket:
+            self.events = TopologyEventPublisher(event_socket, self.event_source, symmetric=self.symmetric_matrix)
+            self.events.start()
+        self.last_slice_stats = {}  # 上一次apply_matrix的链路操作统计
+        self.last_failed_links = []  # 上一次apply_matrix中失败的链路
+        self._resume_reconcile = False  # 续跑且上次运行在时间片中途退出时，首个时间片需要校正
+        self.lookahead = lookahead and batch_mode
+        if lookahead and not batch_mode:
+            logger.warning("预创建链路仅支持批处理模式，已忽略lookahead")
+        self.staged_links = {}   # 预创建且处于down状态的链路 {(node1, node2): 延迟}
+        self.retired_links = {}  # 时间片边界处已置为down、等待删除的链路 {(node1, node2): 延迟}
+        self.current_matrix = None
+        self.current_links = set()  # 存储当前已建立的链路 (node1, node2, ip_info)
+        self._links_lock = threading.Lock()  # 并行操作链路时保护current_links
+        self.netns_cache = get_default_cache()  # 共享的容器PID/命名空间缓存
+        self.metrics = get_default_metrics()  # 共享的链路操作耗时统计
+        self.interpolator = None
+        if interpolate and not batch_mode:
+            logger.warning("链路延迟插值仅支持批处理模式，已忽略interpolate")
+        elif interpolate:
+            self.interpolator = DelayInterpolator(self.apply_delay_updates, self.delay_filter, interpolate,
+                                                  interpolate_step, interpolate_tc_rate, symmetric=self.symmetric_matrix)
+            if not prefetch:
+                # 插值需要在当前时间片内取得下一时间片的矩阵
+                logger.warning("链路延迟插值需要预读下一时间片，已启用预读")
+                prefetch = True
+        self.prefetcher = SlicePrefetcher(self.find_differences, self.metrics) if prefetch else None
+        self.slice_started = None  # 最近一个时间片开始应用的时刻（time.monotonic）
+        self.ip_mapping = {}  # 存储节点对到IP地址的映射
+        # 按节点对编号分配链路子网，不同链路的子网保证不冲突
+        self.ip_allocator = PairSubnetAllocator(ip_pools or self.default_ip_pools, symmetric=self.symmetric_matrix,
+                                                state_file=ip_state_file)
+
+    def netem_delay_ms(self, value):
+        """将矩阵中的值换算为netem延迟（毫秒），默认矩阵中的值即为延迟"""
+        return value
+
+    def validate_csv_file(self, csv_file):
+        """验证CSV文件的格式是否符合要求"""
+        try:
+            # 检查文件是否存在
+            if not os.path.exists(csv_file):
+                logger.error(f"CSV文件不存在: {csv_file}")
+                return False
+                
+            # 检查文件是否为空
+            if os.path.getsize(csv_file) == 0:
+                logger.error(f"CSV文件为空: {csv_file}")
+                return False
+                
+            # 尝试读取文件内容
+            with open(csv_file, 'r') as f:
+                first_line = f.readline().strip()
+                # 检查第一行是否包含逗号（CSV格式）
+                if ',' not in first_line:
+                    logger.warning(f"CSV文件可能格式不正确，第一行未发现逗号: {first_line}")
+                    
+            return True
+        except Exception as e:
+            logger.error(f"验证CSV文件出错: {e}")
+            return False
+
+    def read_matrix_from_csv(self, csv_file):
+        """从CSV文件读取链路可见性矩阵"""
+        try:
+            if self.sparse:
+                matrix = SparseTopology.from_csv(csv_file)
+                logger.info(f"成功读取稀疏矩阵，大小: {matrix.shape[0]}x{matrix.shape[1]}，可见链路: {matrix.nnz}")
+                return matrix
+
+            # 使用pandas读取CSV文件，不设置列名或索引列
+            df = pd.read_csv(csv_file, header=None, sep=',', dtype=float)
+            matrix = df.values
+            
+            # 验证矩阵格式
+            rows, cols = matrix.shape
+            if self.symmetric_matrix and rows != cols:
+                logger.warning(f"矩阵不是方阵！行数: {rows}, 列数: {cols}")
+            
+            logger.info(f"成功读取矩阵，大小: {rows}x{cols}")
+            return matrix
+        except Exception as e:
+            logger.error(f"读取CSV文件错误: {e}")
+            logger.exception("详细错误信息:")
+            return None
+
+    def link_key(self, node1, node2):
+        """链路标识（批处理结果和预创建链路的键），对称矩阵按节点编号排序"""
+        if self.symmetric_matrix:
+            return (min(node1, node2), max(node1, node2))
+        return (node1, node2)
+
+    def apply_differences(self, to_add, to_remove, to_modify, new_matrix, on_namespace_done=None):
+        """
+        执行一个时间片内的全部链路差异
+
+        参数:
+        - on_namespace_done: 批处理模式下每个容器命名空间提交完成后的回调（见LinkBatchExecutor.commit）
+
+        返回:
+        - 执行失败的链路列表
+        """
+        if not self.batch_mode:
+            failed = []
+            # 使用批处理删除旧链路
+            if to_remove:
+                failed += self.process_links_in_batches(to_remove, "delete_link", new_matrix=new_matrix)
+            
+            # 使用批处理添加新链路
+            if to_add:
+                failed += self.process_links_in_batches(to_add, "create_link", new_matrix=new_matrix)
+
+            # 使用批处理修改链路
+            if to_modify:
+                failed += self.process_links_in_batches(to_modify, "modify_link", new_matrix=new_matrix)
+            return failed
+        
+        # 整个时间片的差异合并为每个命名空间一次ip/tc批处理
+        executor = LinkBatchExecutor()
+        staged, self.staged_links = self.staged_links, {}
+        activated = []
+        for node1, node2 in to_remove:
+            if self.lookahead:
+                # 时间片边界处只将接口置为down，真正的删除推迟到预创建下一时间片时执行
+                self.plan_set_link_state(executor, node1, node2, "down")
+            else:
+                self.plan_delete_link(executor, node1, node2)
+        for node1, node2 in to_add:
+            key = self.link_key(node1, node2)
+            if key in staged:
+                # 已预创建的链路只需启用接口，延迟与预设值不同时再调整
+                self.plan_set_link_state(executor, node1, node2, "up")
+                if staged.pop(key) != new_matrix[node1, node2]:
+                    self.plan_modify_link(executor, node1, node2, new_matrix[node1, node2])
+                activated.append(key)
+            else:
+                self.plan_create_link(executor, node1, node2, new_matrix[node1, node2])
+        for node1, node2 in to_modify:
+            self.plan_modify_link(executor, node1, node2, new_matrix[node1, node2])
+        # 预创建但本时间片未用到的链路（如调度时跳过了时间片）本身处于down状态，留待下次统一删除
+        self.retired_links.update(staged)
+        
+        if len(executor) == 0:
+            return []
+        results = executor.commit(on_namespace_done=on_namespace_done)
+        
+        for node1, node2 in to_remove:
+            key = self.link_key(node1, node2)
+            if results.get(key):
+                if self.lookahead:
+                    self.retired_links[key] = self.current_matrix[node1, node2]
+                self._forget_link(node1, node2)
+        for node1, node2 in to_add:
+            key = self.link_key(node1, node2)
+            if results.get(key):
+                ip1, ip2 = self.generate_ip_addresses(node1, node2)
+                self.current_links.add((key[0], key[1], f"{ip1}-{ip2}"))
+            elif key in activated:
+                self.retired_links[key] = new_matrix[node1, node2]
+        
+        for operation, links in (("delete_link", to_remove), ("create_link", to_add), ("modify_link", to_modify)):
+            if links:
+                success_count = sum(1 for node1, node2 in links if results.get(self.link_key(node1, node2)))
+                logger.info(f"{operation}链路完成: {success_count}/{len(links)} 成功")
+        return [key for key, success in results.items() if not success]
+
+    def stage_links(self, next_matrix):
+        """
+        预创建下一时间片新增的链路（lookahead模式）
+
+        veth pair、命名空间、地址和延迟都在当前时间片内提前配置好，接口保持down状态；
+        上一个时间片边界处置为down的链路也在这里真正删除
+        """
+        if self.current_matrix is None or next_matrix is None:
+            return
+        to_add, _, _ = diff_matrices(self.current_matrix, next_matrix, symmetric=self.symmetric_matrix)
+        
+        executor = LinkBatchExecutor()
+        to_stage = []
+        for node1, node2 in to_add:
+            key = self.link_key(node1, node2)
+            if key in self.staged_links:
+                continue
+            if key in self.retired_links:
+                # 刚置为down的链路在下一时间片重新可见，直接复用
+                self.staged_links[key] = self.retired_links.pop(key)
+                continue
+            self.plan_create_link(executor, node1, node2, next_matrix[node1, node2], admin_up=False)
+            to_stage.append(key)
+        retired = list(self.retired_links)
+        for node1, node2 in retired:
+            self.plan_delete_link(executor, node1, node2)
+        self.retired_links = {}
+        
+        if len(executor) == 0:
+            return
+        results = executor.commit()
+        staged_count = 0
+        for key in to_stage:
+            if results.get(key):
+                self.staged_links[key] = next_matrix[key[0], key[1]]
+                staged_count += 1
+        logger.info(f"预创建下一时间片链路: {staged_count}/{len(to_stage)} 成功，清理已停用链路 {len(retired)} 条")
+    
+    def discard_staged_links(self):
+        """删除所有预创建但未启用的链路以及已停用待删除的链路"""
+        links = list(self.staged_links) + list(self.retired_links)
+        self.staged_links, self.retired_links = {}, {}
+        if not links:
+            return
+        executor = LinkBatchExecutor()
+        for node1, node2 in links:
+            self.plan_delete_link(executor, node1, node2)
+        executor.commit()
+
+    def load_csv_slice(self, csv_file):
+        """验证并读取一个时间片的CSV文件，失败时返回None（预读线程与同步读取共用）"""
+        if not self.validate_csv_file(csv_file):
+            return None
+        return self.read_matrix_from_csv(csv_file)
+
+    def apply_next_slice(self, name, loader):
+        """
+        应用一个时间片：优先取用后台预读的矩阵和链路差异，没有预读（首个时间片、跳转）时同步读取
+
+        参数:
+        - name: 时间片名称
+        - loader: 无参数的可调用对象，返回已校验的矩阵，失败时返回None
+        """
+        if self.interpolator is not None:
+            # 插值停在当前位置，由下一时间片的矩阵值接管
+            self.interpolator.stop()
+        self.slice_started = time.monotonic()
+        prefetched = self.prefetcher.take(name) if self.prefetcher is not None else None
+        if prefetched is None:
+            new_matrix, differences = loader(), None
+        else:
+            # 预读之后当前矩阵有变化（跳转/合并/校正）时重新计算差异
+            new_matrix, differences = prefetched.matrix, prefetched.differences_from(self.current_matrix)
+        if new_matrix is None:
+            logger.error("无法更新拓扑：读取矩阵失败")
+            return False
+        return self.apply_matrix(new_matrix, slice_name=name, differences=differences)
+
+    def prepare_next_slice(self, name, loader, after_loader=None, duration=None):
+        """
+        当前时间片已应用，在等待下一个截止时间期间预读下一时间片、预创建它的链路并开始向它插值
+
+        参数:
+        - name: 下一时间片名称
+        - loader: 无参数的可调用对象，返回下一时间片已校验的矩阵，失败时返回None
+        - after_loader: 返回下下时间片矩阵的可调用对象（样条插值使用），没有下下时间片时为None
+        - duration: 距离下一时间片的时长（秒）
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.prefetch(name, loader, self.current_matrix)
+        if self.lookahead:
+            # 在等待下一个截止时间期间预创建下一时间片的链路
+            if self.journal is not None:
+                self.journal.begin(name, event='stage')
+            prefetched = self.prefetcher.peek(name) if self.prefetcher is not None else None
+            self.stage_links(prefetched.matrix if prefetched is not None else loader())
+        if self.interpolator is not None:
+            self.start_interpolation(name, duration, after_loader)
+
+    def finish_slices(self):
+        """时间片序列结束后停止插值，丢弃未取用的预读和预创建的链路"""
+        if self.interpolator is not None:
+            self.interpolator.stop()
+        if self.prefetcher is not None:
+            self.prefetcher.discard()    # 预读线程不再访问CSV目录或时间线文件
+        if self.lookahead:
+            self.discard_staged_links()
+
+    def after_slice(self, name):
+        """时间片应用并提交后的处理（如TSN域扫描），默认不做任何事"""
+
+    def run_slices(self, slices, load, interval=20, late_policy='none', controller=None):
+        """
+        按绝对截止时间依次应用时间片，等待下一个截止时间期间预读、预创建下一时间片并开始插值
+
+        参数:
+        - slices: 按应用顺序的 [(时间片名称, 来源)]
+        - load: 以来源为参数的可调用对象，返回已校验的矩阵，失败时返回None
+        - interval/late_policy/controller: 见process_csv_directory
+        """
+        # 下下时间片的来源（样条插值使用）
+        following = {name: after for (name, _), (_, after) in zip(slices, slices[1:])}
+
+        def apply_slice(name, source):
+            logger.info(f"\n{'='*50}")
+            if self.journal is not None:
+                self.journal.begin(name)
+            logger.info(f"处理时间片: {name}")
+
+            # 验证并更新网络拓扑（已预读时直接取用）
+            start_time = time.time()
+            success = self.apply_next_slice(name, lambda: load(source))
+            elapsed = time.time() - start_time
+            self.metrics.end_slice(name, elapsed, self.last_slice_stats, success)
+
+            if success:
+                logger.info(f"成功应用拓扑: {name} (耗时: {elapsed:.2f}秒)")
+                self.commit_slice(name)
+                self.after_slice(name)
+            else:
+                logger.error(f"应用拓扑失败: {name}")
+            return success
+
+        def prepare_slice(name, source):
+            # 当前时间片已应用，在等待下一个截止时间期间预读下一时间片
+            after = following.get(name)
+            self.prepare_next_slice(name, lambda: load(source),
+                                    (lambda: load(after)) if after is not None else None,
+                                    controller.slot() if controller is not None else interval)
+
+        # 按绝对截止时间调度，应用耗时不累积为漂移
+        scheduler = SliceScheduler(interval, late_policy, controller=controller)
+        scheduler.run(slices, apply_slice,
+                      prepare_slice if self.lookahead or self.prefetcher is not None else None)
+        self.finish_slices()
+
+    def process_csv_directory(self, directory, interval=20, late_policy='none', resume=False, controller=None):
+        """
+        处理目录中的所有CSV文件，按时间间隔更新网络拓扑
+
+        参数:
+        - interval: 时间片周期（秒），第k个时间片在开始后 k*interval 秒应用
+        - late_policy: 应用落后于截止时间时的处理策略（none/skip/coalesce），见SliceScheduler
+        - resume: 是否从日志中最后提交的时间片之后继续
+        - controller: 可选的TimelineController，用于跳转到指定时间片、倍速播放和暂停
+        """
+        directory = Path(directory)
+        # 按文件名中的时间片编号排序（例如output_1.csv, output_2.csv...）
+        csv_files = [csv_file for _, csv_file in list_slice_files(directory)]
+        if not csv_files:
+            logger.error(f"目录 {directory} 中没有找到CSV文件")
+            return
+
+        logger.info(f"找到 {len(csv_files)} 个CSV文件待处理，排序后的顺序:")
+        for i, f in enumerate(csv_files):
+            logger.info(f"  {i+1}. {f.name}")
+
+        # 记录新的运行，或续跑时跳过已提交的时间片
+        csv_files = csv_files[self.prepare_run([f.name for f in csv_files], directory, resume):]
+        self.run_slices([(f.name, f) for f in csv_files], self.load_csv_slice, interval, late_policy, controller)
+
+    def process_timeline(self, timeline_file, interval=20, late_policy='none', resume=False, controller=None):
+        """从预编译的二进制时间线文件（timeline_store.py生成）按时间片更新网络拓扑，省去运行时的CSV解析"""
+        with TimelineStore(timeline_file) as timeline:
+            slices = list(zip(timeline.names, range(len(timeline))))
+            slices = slices[self.prepare_run(timeline.names, timeline_file, resume):]
+            self.run_slices(slices, timeline.matrix_at, interval, late_policy, controller)
+
+    def apply_delay_updates(self, delays):
+        """
+        在时间片之间原地修改链路延迟（延迟插值），不改变链路的建立/删除状态
+
+        参数:
+        - delays: {(node1, node2): 矩阵值}
+
+        返回:
+        - 执行失败的链路列表
+        """
+        executor = LinkBatchExecutor()
+        for (node1, node2), value in delays.items():
+            self.plan_modify_link(executor, node1, node2, value)
+        with self.metrics.timer('interpolate', ops=len(delays)) as timing:
+            results = executor.commit()
+            failed = [key for key, success in results.items() if not success]
+            timing.failures = len(failed)
+        return failed
+
+    def start_interpolation(self, name, duration, after_loader=None):
+        """
+        当前时间片应用完成后，开始向下一时间片插值链路延迟
+
+        参数:
+        - name: 下一时间片名称（已提交预读）
+        - duration: 时间片长度（秒）
+        - after_loader: 无参数的可调用对象，返回下下时间片的矩阵（spline使用），没有时为None
+        """
+        prefetched = self.prefetcher.peek(name)
+        if prefetched is not None and self.slice_started is not None:
+            self.interpolator.start(self.current_matrix, prefetched.matrix, self.slice_started, duration, after_loader)
+
+    def reconcile(self, new_matrix):
+        """
+        导出各容器命名空间中的实际接口、地址和qdisc，与目标矩阵对比后只修正不一致的部分
+
+        返回:
+        - 校正后仍失败的链路列表
+        """
+        return TopologyReconciler(self).reconcile(new_matrix)
+
+    def commit_slice(self, name):
+        """将已应用的时间片及其链路操作结果记入日志，并向订阅者发布拓扑变化事件"""
+        if self.journal is not None:
+            self.journal.commit(name, self.current_matrix, self.last_slice_stats, self.last_failed_links)
+        if self.events is not None:
+            self.events.publish(name, self.current_matrix)
+
+    def prepare_run(self, names, source, resume=False):
+        """
+        开始处理时间片序列前准备日志；续跑时从日志恢复管理器状态
+
+        参数:
+        - names: 全部时间片名称（按应用顺序）
+        - source: 时间片来源（CSV目录或时间线文件），记入日志
+        - resume: 是否从日志中最后提交的时间片之后继续
+
+        返回:
+        - 需要跳过的（已提交的）时间片数量
+        """
+        if self.journal is None:
+            if resume:
+                logger.error("未启用日志，无法续跑，将从第一个时间片开始")
+            return 0
+        if not resume:
+            self.journal.start(source)
+            return 0
+
+        state = self.journal.last_commit()
+        if state is None:
+            logger.warning(f"日志 {self.journal.journal_file} 中没有已提交的时间片，从第一个时间片开始")
+            self._resume_reconcile = True
+            return 0
+        record, matrix, clean = state
+        if record['name'] not in names:
+            logger.warning(f"日志中最后提交的时间片 {record['name']} 不在本次的时间片序列中，从第一个时间片开始")
+            self._resume_reconcile = True
+            return 0
+        skip = names.index(record['name']) + 1
+
+        if clean and not self.auto_reconcile:
+            # 上次运行在两个时间片之间退出且没有失败链路，容器内状态即为快照，直接与快照做差异
+            self.current_matrix = matrix
+            links = active_links(matrix, symmetric=self.symmetric_matrix)
+            with self._links_lock:
+                self.current_links = {(node1, node2, "-".join(self.generate_ip_addresses(node1, node2)))
+                                      for node1, node2 in links}
+            self.delay_filter.reset(matrix, links)
+            logger.info(f"从日志续跑: 已提交到 {record['name']}，从第 {skip + 1} 个时间片继续")
+        else:
+            # 上次运行在时间片中途退出（或有失败链路），首个时间片根据容器内实际状态校正
+            self._resume_reconcile = True
+            logger.info(f"从日志续跑: 已提交到 {record['name']}，上次运行未正常结束，"
+                        f"第 {skip + 1} 个时间片将根据容器内实际状态校正")
+        return skip
+
+
+def add_link_manager_arguments(parser, kind):
+    """
+    添加XW与TSN链路管理脚本共用的命令行参数
+
+    参数:
+    - kind: 链路类型（xw/tsn），决定持久化文件、日志和套接字的默认路径
+    """
+    pool = {'xw': '10.0.192.0/18', 'tsn': '10.0.0.0/18'}[kind]
+    parser.add_argument('--no-batch', action='store_true',
+                        help='关闭批处理模式，逐条链路执行bash脚本')
+    parser.add_argument('--sparse', action='store_true',
+                        help='以稀疏格式读取可见性矩阵，适用于大规模星座')
+    parser.add_argument('--timeline', help='预编译的二进制时间线文件（由timeline_store.py生成），指定后代替--csv_dir')
+    parser.add_argument('--ip-pool', action='append',
+                        help=f'链路子网地址池CIDR，可多次指定，默认为 {pool}')
+    parser.add_argument('--ip-state', default=f'ip_allocation_{kind}.json',
+                        help=f'链路子网分配的持久化文件，默认为ip_allocation_{kind}.json')
+    parser.add_argument('--reconcile', action='store_true',
+                        help='启动时以及链路操作失败后，根据容器内实际接口/地址/qdisc校正拓扑，而不是假设容器处于初始状态')
+    parser.add_argument('--late-policy', choices=LATE_POLICIES, default='none',
+                        help='应用落后于时间片截止时间时的处理策略: none依次应用全部时间片，skip跳过过期时间片，coalesce合并过期时间片，默认none')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='播放倍速，时间片间隔为 interval/speed，应用耗时超过加速后的时间片长度时告警，默认1')
+    parser.add_argument('--start',
+                        help='从指定时间片（名称或编号，如83）开始，直接从当前状态建立到该时间片的链路，不回放之前的时间片')
+    parser.add_argument('--control-socket', nargs='?', const=CONTROL_SOCKETS[kind],
+                        help=f"在unix套接字上接受时间线控制命令（pause/resume/seek/speed/status，"
+                             f"用 python timeline_controller.py 发送），不指定路径时为{CONTROL_SOCKETS[kind]}")
+    parser.add_argument('--lookahead', action='store_true',
+                        help='在当前时间片内预创建下一时间片的链路（接口保持down），时间片边界处只需启停接口')
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help='关闭下一时间片的后台预读（读取、校验和差异计算），在时间片边界处同步读取')
+    parser.add_argument('--interpolate', choices=INTERPOLATION_MODES,
+                        help='在相邻时间片之间对链路延迟做线性（linear）或样条（spline）插值，按--interpolate-step原地修改netem延迟，'
+                             '使延迟平滑变化而不是在时间片边界处阶跃，默认不插值（仅批处理模式）')
+    parser.add_argument('--interpolate-step', type=float, default=1.0, help='延迟插值的步长（秒），默认1')
+    parser.add_argument('--tc-rate', type=float, default=200.0,
+                        help='延迟插值时所有链路合计每秒最多的tc调用数，超出时偏差最大的链路优先，默认200')
+    parser.add_argument('--jitter', type=float, default=0, help='链路延迟抖动（毫秒），默认不设置')
+    parser.add_argument('--loss', type=float, default=0, help='链路丢包率（百分比），默认不设置')
+    parser.add_argument('--rate', help='链路限速（如50kbit），在netem下挂tbf，默认不限速')
+    parser.add_argument('--delay-threshold', type=float, default=0.0,
+                        help='延迟变化的绝对阈值（毫秒），与已下发延迟相差不超过该值时暂缓修改，默认0')
+    parser.add_argument('--delay-rel-threshold', type=float, default=0.0,
+                        help='延迟变化的相对阈值（如0.05表示5%%），默认0')
+    parser.add_argument('--delay-max-stale', type=int,
+                        help='暂缓修改的最大时间片数，超过后无论变化多小都下发，默认不限制')
+    parser.add_argument('--journal', default=f'topology_journal_{kind}.jsonl',
+                        help=f'崩溃安全日志文件，记录已提交的时间片，默认为topology_journal_{kind}.jsonl')
+    parser.add_argument('--resume', action='store_true',
+                        help='从日志中最后提交的时间片之后继续，上次运行在时间片中途退出时先根据容器内实际状态校正')
+    parser.add_argument('--event-socket', nargs='?', const=EVENT_SOCKETS[kind],
+                        help=f"在unix套接字上发布每个已提交时间片的拓扑变化事件（TSN链路含分域成员变化），"
+                             f"供扫描/分域表/资源视图脚本订阅，不指定路径时为{EVENT_SOCKETS[kind]}")
+    parser.add_argument('--metrics',
+                        help='链路操作耗时统计文件（JSONL，每个时间片一行），用 python link_metrics.py <文件> 生成报告')
+    parser.add_argument('--backend', choices=BACKENDS, default='docker',
+                        help='容器后端: docker为containerlab容器，netns为同名的ip netns命名空间（离线/规模测试），'
+                             'dry-run只记录命令不执行，默认docker')
+
+
+def check_link_manager_arguments(parser, args):
+    """检查add_link_manager_arguments添加的参数，不合法时通过parser.error退出"""
+    if args.backend != 'docker' and args.no_batch:
+        parser.error("逐链路模式（--no-batch）只支持docker后端")
+    if args.speed <= 0:
+        parser.error("播放倍速（--speed）必须为正数")
+    if args.interpolate_step <= 0 or args.tc_rate <= 0:
+        parser.error("插值步长（--interpolate-step）和tc调用预算（--tc-rate）必须为正数")
+
+
+def link_manager_options(args):
+    """将命令行参数转换为LinkManagerBase的初始化参数"""
+    return dict(batch_mode=not args.no_batch,
+                sparse=args.sparse,
+                lookahead=args.lookahead,
+                ip_pools=args.ip_pool,
+                ip_state_file=args.ip_state,
+                reconcile=args.reconcile,
+                link_shape=LinkShape(jitter=args.jitter, loss=args.loss, rate=args.rate),
+                delay_threshold=args.delay_threshold,
+                delay_rel_threshold=args.delay_rel_threshold,
+                delay_max_staleness=args.delay_max_stale,
+                journal_file=args.journal,
+                event_socket=args.event_socket,
+                prefetch=not args.no_prefetch,
+                interpolate=args.interpolate,
+                interpolate_step=args.interpolate_step,
+                interpolate_tc_rate=args.tc_rate)
+
+
+def run_link_manager(manager, args, backend):
+    """按命令行参数处理时间线文件或CSV目录中的全部时间片，结束后关闭后台线程和套接字"""
+    if args.metrics:
+        manager.metrics.open(args.metrics)
+    if args.backend == 'docker':
+        # 监听容器重启事件，及时使PID缓存失效
+        manager.netns_cache.start_event_watcher()
+    controller = None
+    if args.speed != 1.0 or args.start or args.control_socket:
+        controller = TimelineController(speed=args.speed, start=args.start)
+        if args.control_socket:
+            controller.serve(args.control_socket)
+    if args.timeline:
+        manager.process_timeline(args.timeline, args.interval, args.late_policy, resume=args.resume,
+                                 controller=controller)
+    else:
+        manager.process_csv_directory(args.csv_dir, args.interval, args.late_policy, resume=args.resume,
+                                      controller=controller)
+    if controller is not None:
+        controller.close()
+    if manager.interpolator is not None:
+        manager.interpolator.close()
+    if manager.prefetcher is not None:
+        manager.prefetcher.close()
+    if manager.events is not None:
+        manager.events.close()
+    if args.backend == 'dry-run':
+        backend.log_summary()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+import json
+import math
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 直方图最小桶的上界（秒），之后每个桶翻倍: 0.1ms, 0.2ms, 0.4ms ... 约1.7小时
+HISTOGRAM_BASE = 1e-4
+HISTOGRAM_BUCKETS = 26
+
+
+class Histogram:
+    def __init__(self, buckets=None):
+        """按2的幂分桶的耗时直方图，桶k的上界为 HISTOGRAM_BASE × 2^k 秒，可按桶合并"""
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        if buckets:
+            self.merge(buckets)
+
+    def add(self, seconds, n=1):
+        if seconds <= HISTOGRAM_BASE:
+            k = 0
+        else:
+            k = min(HISTOGRAM_BUCKETS - 1, math.ceil(math.log2(seconds / HISTOGRAM_BASE)))
+        self.buckets[k] += n
+
+    def merge(self, buckets):
+        """合并另一个直方图，buckets为to_dict()的结果"""
+        for k, n in buckets.items():
+            self.buckets[int(k)] += n
+
+    def count(self):
+        return sum(self.buckets)
+
+    def percentile(self, q):
+        """返回q分位（0~100）所在桶的上界（秒），没有样本时返回0"""
+        total = self.count()
+        if total == 0:
+            return 0.0
+        rank = q / 100 * total
+        seen = 0
+        for k, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return HISTOGRAM_BASE * 2 ** k
+        return HISTOGRAM_BASE * 2 ** (HISTOGRAM_BUCKETS - 1)
+
+    def to_dict(self):
+        """只保存非空桶，{桶序号: 样本数}"""
+        return {str(k): n for k, n in enumerate(self.buckets) if n}
+
+
+class _PhaseStats:
+    def __init__(self):
+        self.calls = 0       # 计时次数（进程调用/逐链路任务数）
+        self.ops = 0         # 其中包含的链路操作/命令数
+        self.failures = 0    # 失败的链路操作/命令数
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = Histogram()
+
+    def add(self, seconds, ops, failures):
+        self.calls += 1
+        self.ops += ops
+        self.failures += failures
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.histogram.add(seconds)
+
+    def to_dict(self):
+        return {'calls': self.calls, 'ops': self.ops, 'failures': self.failures,
+                'seconds': round(self.seconds, 6), 'max_s': round(self.max_seconds, 6),
+                'buckets': self.histogram.to_dict()}
+
+
+class _Timing:
+    """timer()产生的计时对象，调用方可在代码块内设置ops/failures"""
+    def __init__(self, ops):
+        self.ops = ops
+        self.failures = 0
+
+
+class LinkMetrics:
+    def __init__(self, metrics_file=None, top_containers=10):
+        """
+        链路操作的耗时统计
+
+        按阶段（phase）记录计数器和耗时直方图，阶段包括:
+        - resolve: 解析容器命名空间（docker inspect）
+        - veth: 宿主机上批量创建veth pair
+        - ip/tc: 单个容器命名空间内的ip/tc批处理
+        - create_link/delete_link/modify_link: 逐链路模式下的单条链路操作
+        - diff/apply: 时间片差异计算和链路操作总耗时
+        - prefetch: 后台预读下一时间片（读取校验和差异计算，不在时间片边界的关键路径上）
+        - interpolate: 时间片之间延迟插值的tc批处理（计入下一时间片）
+        - dump/reconcile: 状态校正中的命名空间导出和整体校正
+        阶段之间可以嵌套（如apply包含veth/ip/tc），各阶段耗时不能直接相加。
+        每个时间片结束时调用end_slice，将本时间片的统计作为一行JSON追加到metrics_file。
+
+        参数:
+        - metrics_file: 时间片统计的JSONL文件，为None时只在内存中统计
+        - top_containers: 每个时间片记录耗时最长的容器数量
+        """
+        self.metrics_file = metrics_file
+        self.top_containers = top_containers
+        self._lock = threading.Lock()
+        self._reset_slice()
+
+    def _reset_slice(self):
+        self.phases = {}        # 阶段名 -> _PhaseStats
+        self.containers = {}    # 容器名 -> 本时间片在该容器命名空间内的耗时
+
+    def open(self, metrics_file):
+        """开始写入时间片统计文件（清空旧内容）"""
+        open(metrics_file, 'w').close()
+        self.metrics_file = metrics_file
+        logger.info(f"链路操作耗时统计写入: {metrics_file}")
+
+    def observe(self, phase, seconds, container=None, ops=1, failures=0):
+        """记录一次计时"""
+        with self._lock:
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = _PhaseStats()
+            stats.add(seconds, ops, failures)
+            if container is not None:
+                self.containers[container] = self.containers.get(container, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, phase, container=None, ops=1):
+        """
+        对代码块计时，例如:
+
+            with metrics.timer('ip', container, ops=len(entries)) as timing:
+                timing.failures = len(run_batch(...))
+        """
+        timing = _Timing(ops)
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            self.observe(phase, time.perf_counter() - start, container, timing.ops, timing.failures)
+
+    def end_slice(self, name, elapsed, stats=None, success=True):
+        """
+        结束一个时间片：输出耗时最长的阶段，并将本时间片的统计追加到统计文件
+
+        参数:
+        - name: 时间片名称
+        - elapsed: 时间片应用总耗时（秒）
+        - stats: 链路操作统计，如管理器的last_slice_stats
+
+        返回:
+        - 本时间片的统计记录
+        """
+        with self._lock:
+            phases, containers = self.phases, self.containers
+            self._reset_slice()
+        slowest = sorted(containers.items(), key=lambda item: item[1], reverse=True)[:self.top_containers]
+        record = {
+            'slice': name,
+            'time': time.time(),
+            'elapsed_s': round(elapsed, 6),
+            'success': success,
+            'stats': stats or {},
+            'phases': {phase: phase_stats.to_dict() for phase, phase_stats in phases.items()},
+            'containers': {container: round(seconds, 6) for container, seconds in slowest},
+        }
+        if phases:
+            top = sorted(phases.items(), key=lambda item: item[1].seconds, reverse=True)[:3]
+            logger.info(f"时间片 {name} 耗时 {elapsed:.2f}秒，主要阶段: " +
+                        "，".join(f"{phase} {s.seconds:.2f}秒/{s.calls}次" for phase, s in top))
+        if self.metrics_file:
+            with open(self.metrics_file, 'a') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+
+_default_metrics = LinkMetrics()
+
+
+def get_default_metrics():
+    """返回进程内共享的链路操作耗时统计"""
+    return _default_metrics
+
+
+def load_records(metrics_file):
+    """读取时间片统计文件，忽略中途退出时写了一半的最后一行"""
+    records = []
+    with open(metrics_file, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"忽略不完整的记录: {line[:80]}")
+    return records
+
+
+def report(records, slot=None, top=10):
+    """
+    汇总时间片统计并输出报告：各阶段耗时占比和分位数、耗时最长的容器、失败率、超出时间片长度的时间片
+
+    参数:
+    - records: load_records的结果
+    - slot: 时间片长度（秒），为None时不检查超时
+    - top: 列出的容器数量
+    """
+    if not records:
+        logger.info("没有时间片统计记录")
+        return
+
+    total_elapsed = sum(record['elapsed_s'] for record in records)
+    phases = {}
+    containers = {}
+    for record in records:
+        for phase, data in record['phases'].items():
+            merged = phases.setdefault(phase, {'calls': 0, 'ops': 0, 'failures': 0, 'seconds': 0.0,
+                                               'max_s': 0.0, 'histogram': Histogram()})
+            for key in ('calls', 'ops', 'failures', 'seconds'):
+                merged[key] += data[key]
+            merged['max_s'] = max(merged['max_s'], data['max_s'])
+            merged['histogram'].merge(data['buckets'])
+        for container, seconds in record['containers'].items():
+            containers[container] = containers.get(container, 0.0) + seconds
+
+    logger.info(f"共 {len(records)} 个时间片，总耗时 {total_elapsed:.2f}秒，"
+                f"平均 {total_elapsed / len(records):.2f}秒，最长 {max(r['elapsed_s'] for r in records):.2f}秒")
+    logger.info("各阶段耗时（阶段之间可能嵌套，占比为相对时间片总耗时）:")
+    for phase, data in sorted(phases.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        share = data['seconds'] / total_elapsed * 100 if total_elapsed > 0 else 0.0
+        failure_rate = data['failures'] / data['ops'] * 100 if data['ops'] else 0.0
+        histogram = data['histogram']
+        logger.info(f"  {phase:<12} {data['seconds']:>9.2f}秒 {share:>6.1f}%  调用 {data['calls']:>7}  "
+                    f"p50≤{histogram.percentile(50) * 1000:.1f}ms p99≤{histogram.percentile(99) * 1000:.1f}ms "
+                    f"最大 {data['max_s'] * 1000:.1f}ms  失败率 {failure_rate:.2f}% ({data['failures']}/{data['ops']})")
+
+    if containers:
+        logger.info(f"耗时最长的容器命名空间（前{top}个）:")
+        for container, seconds in sorted(containers.items(), key=lambda item: item[1], reverse=True)[:top]:
+            logger.info(f"  {container:<32} {seconds:.2f}秒")
+
+    failed_slices = [record['slice'] for record in records if not record['success']]
+    if failed_slices:
+        logger.info(f"应用失败的时间片 {len(failed_slices)} 个: {', '.join(failed_slices[:top])}")
+
+    if slot is not None:
+        over = [record for record in records if record['elapsed_s'] > slot]
+        logger.info(f"超出时间片长度 {slot} 秒的时间片: {len(over)}/{len(records)}")
+        for record in sorted(over, key=lambda r: r['elapsed_s'], reverse=True)[:top]:
+            dominant = max(record['phases'].items(), key=lambda item: item[1]['seconds'], default=None)
+            detail = f"，主要阶段 {dominant[0]} {dominant[1]['seconds']:.2f}秒" if dominant else ""
+            logger.info(f"  {record['slice']}: {record['elapsed_s']:.2f}秒{detail}")
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='汇总链路管理脚本写入的时间片耗时统计（--metrics）')
+    parser.add_argument('metrics_file', help='时间片统计的JSONL文件')
+    parser.add_argument('--slot', type=float, help='时间片长度（秒），列出超时的时间片及其主要阶段')
+    parser.add_argument('--top', type=int, default=10, help='列出的容器/时间片数量，默认10')
+    args = parser.parse_args()
+
+    report(load_records(args.metrics_file), slot=args.slot, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每条链路的整形层次: 根为netem（延迟/抖动/丢包），限速时在netem下挂一个tbf子队列
+#   root 1: netem  ->  parent 1:1 handle 10: tbf
+# 层次只在创建链路时安装一次，之后用 tc qdisc change 原地修改参数，不会删除队列或中断流量
+NETEM_HANDLE = "1:"
+TBF_PARENT = "1:1"
+TBF_HANDLE = "10:"
+
+
+def _format_ms(value):
+    """将毫秒数格式化为tc参数，整数不带小数点"""
+    value = float(value)
+    if value.is_integer():
+        return f"{int(value)}ms"
+    return f"{value:g}ms"
+
+
+class LinkShape:
+    def __init__(self, delay=0, jitter=0, loss=0, rate=None, burst="5kb", latency="70ms"):
+        """
+        单条链路的整形参数
+
+        参数:
+        - delay: 单向延迟（毫秒）
+        - jitter: 延迟抖动（毫秒），0表示不设置
+        - loss: 丢包率（百分比），0表示不设置
+        - rate: tbf限速（如"50kbit"），为None时不挂tbf
+        - burst/latency: tbf的桶大小和最大排队时延
+        """
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.rate = rate
+        self.burst = burst
+        self.latency = latency
+
+    def with_delay(self, delay):
+        """返回只修改了延迟的新整形参数"""
+        return LinkShape(delay, self.jitter, self.loss, self.rate, self.burst, self.latency)
+
+    def netem_args(self):
+        args = f"delay {_format_ms(self.delay)}"
+        if self.jitter:
+            args += f" {_format_ms(self.jitter)}"
+        if self.loss:
+            args += f" loss {self.loss:g}%"
+        return args
+
+    def tbf_args(self):
+        return f"rate {self.rate} burst {self.burst} latency {self.latency}"
+
+    def __eq__(self, other):
+        return isinstance(other, LinkShape) and (self.netem_args(), self.rate and self.tbf_args()) == \
+            (other.netem_args(), other.rate and other.tbf_args())
+
+    def __repr__(self):
+        return f"LinkShape({self.netem_args()}{', ' + self.tbf_args() if self.rate else ''})"
+
+
+def install_commands(dev, shape):
+    """
+    安装整形层次的tc命令（不含开头的tc），可重复执行
+
+    对已有的同类队列 replace 会原地修改参数，其他类型的根队列（如旧版本留下的tbf根队列）会被替换
+    """
+    commands = [f"qdisc replace dev {dev} root handle {NETEM_HANDLE} netem {shape.netem_args()}"]
+    if shape.rate:
+        commands.append(f"qdisc replace dev {dev} parent {TBF_PARENT} handle {TBF_HANDLE} tbf {shape.tbf_args()}")
+    return commands
+
+
+def change_commands(dev, shape, previous=None):
+    """
+    原地修改已安装的整形层次的tc命令（不含开头的tc）
+
+    参数:
+    - previous: 当前已安装的整形参数，用于省略未变化的tbf；为None时按需全部修改
+
+    返回:
+    - 命令列表，只修改延迟时仅一条 qdisc change
+    """
+    commands = [f"qdisc change dev {dev} root handle {NETEM_HANDLE} netem {shape.netem_args()}"]
+    previous_tbf = previous.tbf_args() if previous is not None and previous.rate else None
+    if shape.rate:
+        if previous is None or shape.tbf_args() != previous_tbf:
+            verb = "change" if previous_tbf else "replace"
+            commands.append(f"qdisc {verb} dev {dev} parent {TBF_PARENT} handle {TBF_HANDLE} tbf {shape.tbf_args()}")
+    elif previous_tbf:
+        commands.append(f"qdisc delete dev {dev} parent {TBF_PARENT} handle {TBF_HANDLE}")
+    return commands
+
+
+def shell_script(nsenter, dev, shape, previous=None):
+    """
+    逐链路模式使用的shell片段: 先原地修改，整形层次不存在时（如旧链路）再安装
+
+    参数:
+    - nsenter: 进入命名空间的命令前缀，如 "sudo nsenter -t $n1_pid -n"
+    """
+    change = " && ".join(f"{nsenter} tc {command}" for command in change_commands(dev, shape, previous))
+    install = " && ".join(f"{nsenter} tc {command}" for command in install_commands(dev, shape))
+    return f"{{ {change}; }} 2>/dev/null || {{ {install}; }}"
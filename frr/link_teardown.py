@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import re
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from container_backend import get_default_backend
+from link_batch_executor import LinkBatchExecutor, BATCH_FAILED_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# 链路管理脚本动态创建的veth命名规则，环形链路和eth*接口不匹配，不会被删除
+TSN_VETH_PATTERN = re.compile(r'^(tsn\d+-(yg|xw)\d+|(yg|xw)\d+-tsn\d+)$')   # TSN与YG/XW之间的链路
+XW_VETH_PATTERN = re.compile(r'^\d+-\d+$')                                # XW星间链路
+VETH_PATTERNS = {
+    'tsn': (TSN_VETH_PATTERN,),
+    'xw': (XW_VETH_PATTERN,),
+    'all': (TSN_VETH_PATTERN, XW_VETH_PATTERN),
+}
+
+
+def peer_name(ifname):
+    """veth对端的接口名: "a-b" 的对端为 "b-a"（XW与TSN链路均按此规则命名）"""
+    left, _, right = ifname.partition('-')
+    return f"{right}-{left}"
+
+
+class TsnLinkEndpoints:
+    """
+    TSN矩阵中链路两端的容器名与veth名（TSN链路管理、拆除和静态组网脚本共用同一命名规则）
+
+    TSN矩阵的行为TSN，前YG_COLUMNS列为YG节点，其余列为XW节点。
+    使用者需提供 base_tsn_container_name、base_yg_container_name、base_xw_container_name 属性
+    """
+    YG_COLUMNS = 12
+
+    def link_endpoints(self, node1, node2):
+        """返回链路两端信息: (链路描述, TSN容器名, TSN端veth, DG容器名, DG端veth)"""
+        original_node1 = node1 + 1
+        tsn_container_name = f"{self.base_tsn_container_name}{original_node1}"
+
+        if node2 < self.YG_COLUMNS:
+            original_node2 = node2 + 1
+            label = f"TSN{original_node1} <-> YG{original_node2}"
+            veth_tsn = f"tsn{original_node1}-yg{original_node2}"
+            veth_dg = f"yg{original_node2}-tsn{original_node1}"
+            dg_container_name = f"{self.base_yg_container_name}{original_node2}"
+        else:
+            original_node2 = node2 - self.YG_COLUMNS + 1
+            label = f"TSN{original_node1} <-> XW{original_node2}"
+            veth_tsn = f"tsn{original_node1}-xw{original_node2}"
+            veth_dg = f"xw{original_node2}-tsn{original_node1}"
+            dg_container_name = f"{self.base_xw_container_name}{original_node2}"
+
+        return label, tsn_container_name, veth_tsn, dg_container_name, veth_dg
+
+
+def list_containers(prefixes, backend=None):
+    """列出名称为 <前缀><编号> 的运行中容器（docker后端为一次docker ps，netns后端为已创建的命名空间）"""
+    return (backend or get_default_backend()).list_containers(prefixes)
+
+
+class LinkTeardown:
+    def __init__(self, kind='tsn', max_workers=32, backend=None):
+        """
+        批量拆除链路管理脚本动态创建的全部veth
+
+        每个命名空间执行一次 ip -j link show 列出接口，按命名规则筛选后，
+        每个命名空间再执行一次 ip -batch 删除，所有命名空间并行处理。
+        veth两端都找到时只删除其中一端（另一端随之消失），避免并行删除时的无效报错。
+
+        参数:
+        - kind: 拆除的链路类型，tsn / xw / all，见VETH_PATTERNS
+        - max_workers: 并行处理命名空间的最大线程数
+        - backend: 容器后端（见container_backend），默认使用进程内共享后端
+        """
+        if kind not in VETH_PATTERNS:
+            raise ValueError(f"未知的链路类型: {kind}，可选: {', '.join(VETH_PATTERNS)}")
+        self.patterns = VETH_PATTERNS[kind]
+        self.max_workers = max_workers
+        self.backend = backend or get_default_backend()
+
+    def _matches(self, ifname):
+        return any(pattern.match(ifname) for pattern in self.patterns)
+
+    def _list_interfaces(self, argv):
+        """执行 ip -j link show，返回匹配命名规则的接口名列表，失败时返回None"""
+        try:
+            result = self.backend.run(argv)
+            links = json.loads(result.stdout or "[]")
+        except (OSError, ValueError) as e:
+            logger.error(f"列出接口时出错: {e}")
+            return None
+        return [link['ifname'] for link in links if self._matches(link.get('ifname', ''))]
+
+    def _list_namespace(self, container, handle):
+        if handle is None:
+            logger.warning(f"容器 {container} 不存在或无法进入其命名空间，跳过")
+            return None
+        return self._list_interfaces(self.backend.exec_argv(container, handle, ['ip', '-j', 'link', 'show']))
+
+    def collect(self, containers):
+        """
+        并行列出各容器命名空间中需要删除的接口
+
+        返回:
+        - {容器名: [接口名]}，无法访问的容器对应None
+        """
+        containers = sorted(set(containers))
+        handles = self.backend.resolve(containers)
+        workers = max(1, min(self.max_workers, len(containers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            found = list(executor.map(lambda c: self._list_namespace(c, handles.get(c)), containers))
+        return dict(zip(containers, found))
+
+    def teardown_host(self):
+        """删除宿主机上残留的veth（逐链路脚本在移入容器前中断时会留下）"""
+        names = self._list_interfaces(['ip', '-j', 'link', 'show']) or []
+        if not names:
+            return 0, 0
+        script = "".join(f"link delete {name}\n" for name in names)
+        result = self.backend.run(self.backend.host_argv(['ip', '-force', '-batch', '-']), input=script)
+        failed = len(set(BATCH_FAILED_PATTERN.findall(result.stderr)))
+        return len(names) - failed, failed
+
+    def teardown(self, containers, include_host=True):
+        """
+        删除指定容器中全部匹配命名规则的veth
+
+        返回:
+        - (删除的veth对数量, 删除失败数量, 无法访问的容器列表)
+        """
+        start_time = time.time()
+        found = self.collect(containers)
+        unreachable = [container for container, names in found.items() if names is None]
+
+        present = {name for names in found.values() if names for name in names}
+        executor = LinkBatchExecutor(max_workers=self.max_workers, backend=self.backend)
+        for container, names in found.items():
+            for name in names or []:
+                peer = peer_name(name)
+                if peer in present and peer < name:
+                    # 对端也在待删除列表中，由对端负责删除
+                    continue
+                executor.ip((container, name), container, f"link delete {name}")
+
+        deleted = failed = 0
+        if len(executor):
+            results = executor.commit()
+            deleted = sum(1 for success in results.values() if success)
+            failed = len(results) - deleted
+        if include_host:
+            host_deleted, host_failed = self.teardown_host()
+            deleted += host_deleted
+            failed += host_failed
+
+        logger.info(f"链路拆除完成: {len(found)} 个命名空间，删除 {deleted} 个veth对，失败 {failed} 个，"
+                    f"无法访问的容器 {len(unreachable)} 个，耗时 {time.time() - start_time:.2f}秒")
+        return deleted, failed, unreachable
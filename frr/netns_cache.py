@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import os
+import subprocess
+import threading
+import logging
+from link_metrics import get_default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def read_process_start_time(pid):
+    """读取/proc/<pid>/stat中的进程启动时间（第22个字段），进程不存在时返回None"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 第2个字段comm可能包含空格，从最后一个')'之后开始按空格切分，第一个元素为第3个字段
+    fields = stat[stat.rfind(')') + 2:].split()
+    if len(fields) < 20:
+        return None
+    return int(fields[19])
+
+
+class ContainerNetnsCache:
+    def __init__(self):
+        """
+        初始化容器PID/网络命名空间缓存
+
+        每个容器只在首次使用时通过docker inspect解析一次PID，并打开其
+        /proc/<pid>/ns/net 句柄。之后每次取用只比对进程启动时间，
+        容器重启（PID复用或变化）时自动失效并重新解析。
+        """
+        self._entries = {}  # 容器名 -> {'pid', 'start_time', 'ns_fd'}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watcher_proc = None
+
+    def _open_netns(self, pid):
+        """打开容器网络命名空间句柄，无权限时返回None"""
+        try:
+            return os.open(f"/proc/{pid}/ns/net", os.O_RDONLY)
+        except OSError as e:
+            logger.debug(f"无法打开 /proc/{pid}/ns/net: {e}")
+            return None
+
+    def _is_valid(self, entry):
+        return read_process_start_time(entry['pid']) == entry['start_time']
+
+    def _drop(self, container):
+        entry = self._entries.pop(container, None)
+        if entry and entry['ns_fd'] is not None:
+            try:
+                os.close(entry['ns_fd'])
+            except OSError:
+                pass
+        return entry
+
+    def _inspect(self, containers):
+        """一次docker inspect调用解析多个容器的PID"""
+        try:
+            with get_default_metrics().timer('docker_inspect', ops=len(containers)):
+                result = subprocess.run(['docker', 'inspect', '-f', '{{.Name}} {{.State.Pid}}'] + list(containers),
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE,
+                                        text=True)
+        except Exception as e:
+            logger.error(f"获取容器PID时出错: {e}")
+            return {}
+        pids = {}
+        for line in result.stdout.splitlines():
+            parts = line.strip().split()
+            if len(parts) != 2 or not parts[1].isdigit() or parts[1] == '0':
+                continue
+            pids[parts[0].lstrip('/')] = int(parts[1])
+        return pids
+
+    def get_pids(self, containers):
+        """
+        批量获取容器PID，未缓存或已失效的容器合并为一次docker inspect解析
+
+        返回:
+        - {容器名: pid}，不存在或未运行的容器不在结果中
+        """
+        containers = sorted(set(containers))
+        pids = {}
+        missing = []
+        with self._lock:
+            for container in containers:
+                entry = self._entries.get(container)
+                if entry is not None and not self._is_valid(entry):
+                    logger.info(f"容器 {container} 已重启，PID缓存失效")
+                    self._drop(container)
+                    entry = None
+                if entry is None:
+                    missing.append(container)
+                else:
+                    pids[container] = entry['pid']
+
+        if missing:
+            resolved = self._inspect(missing)
+            with self._lock:
+                for container in missing:
+                    pid = resolved.get(container)
+                    if pid is None:
+                        logger.warning(f"容器 {container} 不存在或无法获取PID")
+                        continue
+                    start_time = read_process_start_time(pid)
+                    if start_time is None:
+                        logger.warning(f"容器 {container} 的进程 {pid} 已退出")
+                        continue
+                    self._drop(container)
+                    self._entries[container] = {
+                        'pid': pid,
+                        'start_time': start_time,
+                        'ns_fd': self._open_netns(pid),
+                    }
+                    pids[container] = pid
+        return pids
+
+    def get_pid(self, container):
+        """获取单个容器的PID，失败时返回None"""
+        return self.get_pids([container]).get(container)
+
+    def netns_path(self, container):
+        """返回容器网络命名空间路径，优先使用已打开句柄对应的/proc/self/fd路径"""
+        pid = self.get_pid(container)
+        if pid is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(container)
+            if entry is not None and entry['ns_fd'] is not None:
+                return f"/proc/{os.getpid()}/fd/{entry['ns_fd']}"
+        return f"/proc/{pid}/ns/net"
+
+    def invalidate(self, container=None):
+        """使指定容器（或全部容器）的缓存失效"""
+        with self._lock:
+            if container is None:
+                for name in list(self._entries):
+                    self._drop(name)
+            else:
+                self._drop(container)
+
+    def start_event_watcher(self):
+        """后台订阅docker events，容器启动/停止/重启时立即使对应缓存失效"""
+        if self._watcher is not None:
+            return
+        try:
+            self._watcher_proc = subprocess.Popen(
+                ['docker', 'events', '--filter', 'type=container',
+                 '--filter', 'event=start', '--filter', 'event=die', '--filter', 'event=restart',
+                 '--format', '{{.Actor.Attributes.name}}'],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except Exception as e:
+            logger.warning(f"无法订阅docker events，仅依赖进程启动时间校验: {e}")
+            return
+
+        def watch():
+            for line in self._watcher_proc.stdout:
+                name = line.strip()
+                if name:
+                    logger.debug(f"收到容器事件，使缓存失效: {name}")
+                    self.invalidate(name)
+
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+        logger.info("已启动docker events监听")
+
+    def close(self):
+        """停止事件监听并关闭所有命名空间句柄"""
+        if self._watcher_proc is not None:
+            self._watcher_proc.terminate()
+            self._watcher_proc = None
+            self._watcher = None
+        self.invalidate()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """返回进程内共享的容器命名空间缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ContainerNetnsCache()
+        return _default_cache
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+import json
+import logging
+import contextlib
+import numpy as np
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+MU_EARTH = 398600.4418          # 地球引力常数 km^3/s^2
+J2 = 1.08262668e-3              # 地球扁率J2项
+LIGHT_SPEED_KM_PER_MS = 299.792458
+
+# 链路管理脚本中TSN矩阵的前12列固定为YG
+YG_COUNT = 12
+
+# 单个计算块中两两距离数组的大致内存上限（字节），超过时按时间分块
+CHUNK_BYTES = 256 * 1024 * 1024
+
+# 与当前containerlab拓扑规模一致的示例配置（8个TSN、12个YG、24个XW）
+EXAMPLE_CONFIG = {
+    "tsn": {"walker": {"planes": 2, "per_plane": 4, "altitude_km": 20200, "inclination_deg": 55}},
+    "yg": {"walker": {"planes": 3, "per_plane": 4, "altitude_km": 1100, "inclination_deg": 86, "phasing": 1}},
+    "xw": {"walker": {"planes": 3, "per_plane": 8, "altitude_km": 780, "inclination_deg": 53, "phasing": 1}},
+    "xw_max_range_km": 6000,
+    "xw_max_links": 4,
+    "tsn_max_range_km": 40000,
+    "min_altitude_km": 80,
+}
+
+
+class OrbitalElements:
+    def __init__(self, a, e, i, raan, argp, mean_anomaly):
+        """
+        一组卫星的开普勒轨道根数，每个参数为长度相同的数组（角度为弧度，半长轴为km）
+
+        参数:
+        - a: 半长轴
+        - e: 偏心率
+        - i: 轨道倾角
+        - raan: 升交点赤经
+        - argp: 近地点幅角
+        - mean_anomaly: 历元（t=0）时刻的平近点角
+        """
+        self.a = np.asarray(a, dtype=float)
+        self.e = np.asarray(e, dtype=float)
+        self.i = np.asarray(i, dtype=float)
+        self.raan = np.asarray(raan, dtype=float)
+        self.argp = np.asarray(argp, dtype=float)
+        self.mean_anomaly = np.asarray(mean_anomaly, dtype=float)
+
+    def __len__(self):
+        return len(self.a)
+
+    @classmethod
+    def walker(cls, planes, per_plane, altitude_km, inclination_deg, phasing=0, raan_spread_deg=360.0):
+        """
+        Walker星座（圆轨道），卫星按轨道面依次编号
+
+        参数:
+        - planes: 轨道面数
+        - per_plane: 每个轨道面的卫星数
+        - altitude_km: 轨道高度
+        - inclination_deg: 轨道倾角（度）
+        - phasing: 相位因子F，相邻轨道面卫星的相位差为 F×360/总卫星数
+        - raan_spread_deg: 轨道面升交点赤经的分布范围，Walker-Delta为360，Walker-Star为180
+        """
+        total = planes * per_plane
+        plane = np.repeat(np.arange(planes), per_plane)
+        slot = np.tile(np.arange(per_plane), planes)
+        raan = np.radians(plane * raan_spread_deg / planes)
+        mean_anomaly = np.radians(slot * 360.0 / per_plane + plane * phasing * 360.0 / total)
+        return cls(np.full(total, EARTH_RADIUS_KM + altitude_km), np.zeros(total),
+                   np.full(total, np.radians(inclination_deg)), raan, np.zeros(total), mean_anomaly)
+
+    @classmethod
+    def from_list(cls, satellites):
+        """
+        由逐颗卫星的根数列表构造，每项为 {altitude_km 或 a_km, e, inclination_deg, raan_deg, argp_deg, mean_anomaly_deg}
+        """
+        a = [s['a_km'] if 'a_km' in s else EARTH_RADIUS_KM + s['altitude_km'] for s in satellites]
+        return cls(a, [s.get('e', 0.0) for s in satellites],
+                   np.radians([s.get('inclination_deg', 0.0) for s in satellites]),
+                   np.radians([s.get('raan_deg', 0.0) for s in satellites]),
+                   np.radians([s.get('argp_deg', 0.0) for s in satellites]),
+                   np.radians([s.get('mean_anomaly_deg', 0.0) for s in satellites]))
+
+    @classmethod
+    def from_config(cls, layer):
+        """由配置中的一层（{"walker": {...}} 或 {"satellites": [...]}）构造"""
+        if 'walker' in layer:
+            return cls.walker(**layer['walker'])
+        if 'satellites' in layer:
+            return cls.from_list(layer['satellites'])
+        raise ValueError(f"无法识别的卫星层配置: {layer}")
+
+    @classmethod
+    def concatenate(cls, parts):
+        return cls(*(np.concatenate([getattr(p, name) for p in parts])
+                     for name in ('a', 'e', 'i', 'raan', 'argp', 'mean_anomaly')))
+
+
+def propagate(elements, times, j2=True):
+    """
+    向量化地计算所有卫星在所有时刻的惯性系位置（二体运动，可选J2长期摄动）
+
+    参数:
+    - elements: OrbitalElements
+    - times: 相对历元的时刻数组（秒）
+    - j2: 是否计入J2引起的升交点赤经和近地点幅角长期漂移
+
+    返回:
+    - 位置数组 (T, N, 3)，单位km
+    """
+    t = np.asarray(times, dtype=float)[:, None]
+    a, e, inc = elements.a, elements.e, elements.i
+    n = np.sqrt(MU_EARTH / a ** 3)
+
+    raan = elements.raan + 0 * t
+    argp = elements.argp + 0 * t
+    if j2:
+        factor = 1.5 * n * J2 * (EARTH_RADIUS_KM / (a * (1 - e ** 2))) ** 2
+        raan = raan - factor * np.cos(inc) * t
+        argp = argp + 0.5 * factor * (5 * np.cos(inc) ** 2 - 1) * t
+
+    # 牛顿迭代求解开普勒方程 E - e·sinE = M
+    mean_anomaly = np.mod(elements.mean_anomaly + n * t, 2 * np.pi)
+    ecc = np.where(e < 0.8, mean_anomaly, np.pi)
+    for _ in range(8):
+        ecc = ecc - (ecc - e * np.sin(ecc) - mean_anomaly) / (1 - e * np.cos(ecc))
+
+    x = a * (np.cos(ecc) - e)
+    y = a * np.sqrt(1 - e ** 2) * np.sin(ecc)
+    cos_o, sin_o = np.cos(raan), np.sin(raan)
+    cos_w, sin_w = np.cos(argp), np.sin(argp)
+    cos_i, sin_i = np.cos(inc), np.sin(inc)
+    return np.stack([
+        x * (cos_o * cos_w - sin_o * sin_w * cos_i) - y * (cos_o * sin_w + sin_o * cos_w * cos_i),
+        x * (sin_o * cos_w + cos_o * sin_w * cos_i) - y * (sin_o * sin_w - cos_o * cos_w * cos_i),
+        x * sin_w * sin_i + y * cos_w * sin_i,
+    ], axis=-1)
+
+
+def pairwise_visibility(pos_a, pos_b, min_altitude_km=80.0):
+    """
+    计算两组卫星之间的距离和视线是否被地球（含大气层余量）遮挡
+
+    参数:
+    - pos_a: (T, Na, 3) 位置
+    - pos_b: (T, Nb, 3) 位置
+    - min_altitude_km: 视线最低点需要高于地表的高度
+
+    返回:
+    - (距离 (T, Na, Nb)，是否可视 (T, Na, Nb))
+    """
+    p = pos_a[:, :, None, :]
+    d = pos_b[:, None, :, :] - p
+    dd = np.einsum('tabk,tabk->tab', d, d)
+    pd = np.einsum('tabk,tabk->tab', np.broadcast_to(p, d.shape), d)
+    pp = np.einsum('tak,tak->ta', pos_a, pos_a)[:, :, None]
+    # 线段上离地心最近的点
+    s = np.clip(-pd / np.where(dd > 0, dd, 1), 0, 1)
+    closest = pp + 2 * s * pd + s ** 2 * dd
+    visible = closest > (EARTH_RADIUS_KM + min_altitude_km) ** 2
+    return np.sqrt(dd), visible
+
+
+def limit_links(distance, visible, max_links):
+    """每颗卫星只保留最近的max_links条链路（双方都在对方最近的max_links内才保留，模拟激光终端数量）"""
+    masked = np.where(visible, distance, np.inf)
+    ranks = np.argsort(np.argsort(masked, axis=-1), axis=-1)
+    nearest = ranks < max_links
+    return visible & nearest & np.swapaxes(nearest, -1, -2)
+
+
+class VisibilityGenerator:
+    def __init__(self, config):
+        """
+        由轨道根数生成XW星间链路和TSN与YG/XW之间链路的可见性时间线
+
+        输出格式与链路管理脚本读取的CSV一致:
+        - XW: N_xw×N_xw 对称矩阵，值为星间距离（km，管理器按 距离//300 换算为毫秒延迟），不可见为-1
+        - TSN: N_tsn×(12+N_xw) 矩阵，前12列为YG，值为传播延迟（毫秒），不可见为-1
+
+        参数:
+        - config: 配置字典，格式见EXAMPLE_CONFIG
+        """
+        self.tsn = OrbitalElements.from_config(config['tsn'])
+        self.yg = OrbitalElements.from_config(config['yg'])
+        self.xw = OrbitalElements.from_config(config['xw'])
+        self.dg = OrbitalElements.concatenate([self.yg, self.xw])
+        self.xw_max_range_km = config.get('xw_max_range_km', 6000)
+        self.xw_max_links = config.get('xw_max_links')
+        self.tsn_max_range_km = config.get('tsn_max_range_km', 40000)
+        self.min_altitude_km = config.get('min_altitude_km', 80)
+        self.j2 = config.get('j2', True)
+        if len(self.yg) != YG_COUNT:
+            logger.warning(f"YG卫星数为 {len(self.yg)}，链路管理脚本假定TSN矩阵前 {YG_COUNT} 列为YG")
+        logger.info(f"星座规模: TSN {len(self.tsn)}，YG {len(self.yg)}，XW {len(self.xw)}")
+
+    def _chunk_size(self):
+        """按两两距离计算的内存占用确定每块的时间步数"""
+        pairs = len(self.xw) ** 2 + len(self.tsn) * len(self.dg)
+        return max(1, CHUNK_BYTES // max(1, pairs * 8 * 8))
+
+    def compute(self, times):
+        """
+        计算一组时刻的可见性矩阵
+
+        返回:
+        - (XW矩阵 (T, N_xw, N_xw)，TSN矩阵 (T, N_tsn, 12+N_xw))
+        """
+        xw_pos = propagate(self.xw, times, self.j2)
+        distance, visible = pairwise_visibility(xw_pos, xw_pos, self.min_altitude_km)
+        visible &= distance <= self.xw_max_range_km
+        visible &= ~np.eye(len(self.xw), dtype=bool)
+        # 数值误差可能使阈值附近的两个方向结果不同，保证矩阵对称
+        visible &= np.swapaxes(visible, -1, -2)
+        if self.xw_max_links:
+            visible = limit_links(distance, visible, self.xw_max_links)
+        xw = np.where(visible, np.round(distance, 2), -1.0)
+
+        tsn_pos = propagate(self.tsn, times, self.j2)
+        dg_pos = propagate(self.dg, times, self.j2)
+        distance, visible = pairwise_visibility(tsn_pos, dg_pos, self.min_altitude_km)
+        visible &= distance <= self.tsn_max_range_km
+        tsn = np.where(visible, distance / LIGHT_SPEED_KM_PER_MS, -1.0)
+        return xw, tsn
+
+    def iter_slices(self, slices, step_s, start_s=0.0):
+        """
+        按时间分块逐个产生时间片，内存占用与总时间片数无关
+
+        参数:
+        - slices: 时间片数
+        - step_s: 时间片间隔（秒）
+        - start_s: 首个时间片相对历元的时刻（秒）
+
+        返回:
+        - 生成器，产生 (时间片编号(从1开始), XW矩阵, TSN矩阵)
+        """
+        chunk = self._chunk_size()
+        for first in range(0, slices, chunk):
+            count = min(chunk, slices - first)
+            times = start_s + step_s * np.arange(first, first + count)
+            xw, tsn = self.compute(times)
+            for k in range(count):
+                yield first + k + 1, xw[k], tsn[k]
+
+
+def load_config(config_file):
+    """读取JSON配置文件，为None时返回示例配置"""
+    if config_file is None:
+        return EXAMPLE_CONFIG
+    with open(config_file, 'r') as f:
+        return json.load(f)
+
+
+def write_csv(csv_file, matrix):
+    """按链路管理脚本的CSV格式写出矩阵（无表头，不可见为-1）"""
+    np.savetxt(csv_file, matrix, delimiter=',', fmt='%.10g')
+
+
+def prepare_output(target, output_format, clear=False):
+    """
+    检查输出位置是否已有数据
+
+    参数:
+    - target: csv格式为输出目录，timeline格式为时间线文件
+    - clear: 为True时创建输出目录并删除其中原有的output_*.csv
+
+    返回:
+    - 检查时输出位置是否已有数据（非空目录或已存在的时间线文件）
+    """
+    target = Path(target)
+    if output_format != 'csv':
+        return target.exists()
+    existing = target.is_dir() and any(target.iterdir())
+    if clear:
+        target.mkdir(parents=True, exist_ok=True)
+        stale = list(target.glob("output_*.csv"))
+        for csv_file in stale:
+            csv_file.unlink()
+        if stale:
+            logger.info(f"已删除 {target} 中原有的 {len(stale)} 个时间片")
+    return existing
+
+
+def main():
+    import argparse
+    from timeline_store import TimelineWriter
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='由卫星轨道根数生成XW与TSN可见性时间线，代替外部工具生成的CSV')
+    parser.add_argument('--config', help='星座配置JSON文件，默认使用与当前拓扑规模一致的示例星座')
+    parser.add_argument('--print-example', action='store_true', help='输出示例配置并退出')
+    parser.add_argument('--slices', type=int, default=100, help='时间片数，默认100')
+    parser.add_argument('--step', type=float, default=20.0, help='时间片间隔（秒），默认20')
+    parser.add_argument('--start', type=float, default=0.0, help='首个时间片相对历元的时刻（秒），默认0')
+    parser.add_argument('--xw-out', help='XW可见性输出目录或时间线文件，默认csv_xw_orbit（timeline格式为xw_orbit.tl）')
+    parser.add_argument('--tsn-out', help='TSN可见性输出目录或时间线文件，默认csv_tsn_orbit（timeline格式为tsn_orbit.tl）')
+    parser.add_argument('--format', choices=['csv', 'timeline'], default='csv',
+                        help='csv输出output_N.csv目录，timeline直接输出二进制时间线文件（链路管理脚本的--timeline），默认csv')
+    parser.add_argument('--sparse', action='store_true', help='timeline格式下按稀疏格式保存，适用于大规模星座')
+    parser.add_argument('--force', action='store_true',
+                        help='输出目录非空或时间线文件已存在时仍然写入，并删除目录中原有的output_*.csv')
+    args = parser.parse_args()
+    if args.slices < 1:
+        parser.error(f"--slices 至少为1: {args.slices}")
+
+    config = load_config(args.config)
+    if args.print_example:
+        print(json.dumps(EXAMPLE_CONFIG, indent=2, ensure_ascii=False))
+        return
+
+    if args.format == 'csv':
+        args.xw_out = args.xw_out or 'csv_xw_orbit'
+        args.tsn_out = args.tsn_out or 'csv_tsn_orbit'
+    else:
+        args.xw_out = args.xw_out or 'xw_orbit.tl'
+        args.tsn_out = args.tsn_out or 'tsn_orbit.tl'
+    for target in (args.xw_out, args.tsn_out):
+        # 写入已有数据的目录会留下原来的其余时间片，链路管理脚本会回放一半生成、一半原有的时间线
+        if not args.force and prepare_output(target, args.format, clear=False):
+            hint = "（将删除目录中原有的output_*.csv）" if args.format == 'csv' else ""
+            parser.error(f"输出 {target} 已存在数据，加 --force 覆盖{hint}")
+
+    generator = VisibilityGenerator(config)
+    if args.format == 'csv':
+        for target in (args.xw_out, args.tsn_out):
+            prepare_output(target, args.format, clear=True)
+
+    xw_links = tsn_links = 0
+    with contextlib.ExitStack() as stack:
+        if args.format == 'timeline':
+            # 逐个时间片流式写入时间线文件，不在内存中保存全部时间片
+            xw_writer = stack.enter_context(TimelineWriter(args.xw_out, sparse=args.sparse))
+            tsn_writer = stack.enter_context(TimelineWriter(args.tsn_out, sparse=args.sparse))
+        for number, xw, tsn in generator.iter_slices(args.slices, args.step, args.start):
+            xw_links += int((xw >= 0).sum()) // 2
+            tsn_links += int((tsn >= 0).sum())
+            if args.format == 'csv':
+                write_csv(Path(args.xw_out) / f"output_{number}.csv", xw)
+                write_csv(Path(args.tsn_out) / f"output_{number}.csv", tsn)
+            else:
+                name = f"output_{number}.csv"
+                xw_writer.append(number, name, xw)
+                tsn_writer.append(number, name, tsn)
+
+    logger.info(f"已生成 {args.slices} 个时间片（间隔 {args.step} 秒）: 平均每个时间片XW链路 {xw_links / args.slices:.1f} 条，"
+                f"TSN可见链路 {tsn_links / args.slices:.1f} 条")
+    if args.format == 'csv':
+        logger.info(f"TSN可见性需经 csv_modify_tsn.py 生成分域表后再交给TSN链路管理脚本")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import time
+import threading
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ScanSlice:
+    def __init__(self, pipeline, name, matrix):
+        """
+        一个时间片的扫描阶段，由ScanPipeline.begin_slice创建
+
+        每个TSN的扫描在其链路涉及的全部容器命名空间提交完成后立即开始，不等待整个时间片应用结束
+
+        参数:
+        - pipeline: 所属的ScanPipeline
+        - name: 时间片名称
+        - matrix: 本时间片分域表的快照，扫描期间不受后续时间片应用的影响
+        """
+        self.pipeline = pipeline
+        self.name = name
+        self.matrix = matrix
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+        self._waiting = {}          # TSN行号 -> 尚未提交完成的容器名集合
+        self._released = set()      # 已提交扫描的TSN行号
+        self._remaining = matrix.shape[0]   # 尚未结束（完成或被更新的时间片取代）的TSN扫描数
+        self.superseded = 0         # 被更新时间片取代的TSN扫描数
+
+    def hold(self, tsn_idx, containers):
+        """登记TSN的扫描需要等待containers的命名空间批处理提交完成"""
+        with self._lock:
+            if tsn_idx not in self._released:
+                self._waiting.setdefault(tsn_idx, set()).update(containers)
+
+    def namespace_done(self, container, failed=None):
+        """容器命名空间提交完成（LinkBatchExecutor.commit的回调），释放不再等待的TSN"""
+        ready = []
+        with self._lock:
+            for tsn_idx, containers in list(self._waiting.items()):
+                containers.discard(container)
+                if not containers:
+                    del self._waiting[tsn_idx]
+                    self._released.add(tsn_idx)
+                    ready.append(tsn_idx)
+        for tsn_idx in ready:
+            self.pipeline.submit(self, tsn_idx)
+
+    def release_unheld(self):
+        """释放本时间片没有链路变化的TSN，它们的链路已经就绪"""
+        self._release(lambda tsn_idx: tsn_idx not in self._waiting)
+
+    def release_all(self):
+        """时间片应用结束，释放全部尚未开始扫描的TSN（包括链路操作失败的）"""
+        self._release(lambda tsn_idx: True)
+
+    def _release(self, condition):
+        with self._lock:
+            ready = [tsn_idx for tsn_idx in range(self.matrix.shape[0])
+                     if tsn_idx not in self._released and condition(tsn_idx)]
+            for tsn_idx in ready:
+                self._waiting.pop(tsn_idx, None)
+                self._released.add(tsn_idx)
+        for tsn_idx in ready:
+            self.pipeline.submit(self, tsn_idx)
+
+    def _finish_one(self, superseded=False):
+        """一个TSN的扫描结束，全部结束时返回资源视图完成的耗时，否则返回None"""
+        with self._lock:
+            self._remaining -= 1
+            self.superseded += superseded
+            if self._remaining == 0:
+                return time.monotonic() - self.start
+        return None
+
+
+class ScanPipeline:
+    def __init__(self, scan_func, max_workers=32):
+        """
+        链路应用与TSN域扫描的流水线
+
+        - 时间片N的扫描按TSN逐个开始: 某个TSN的链路一提交完成即开始扫描该TSN
+        - 时间片N的扫描在后台执行，时间片N+1的应用可以与扫描N的尾部重叠
+        - 同一个TSN同时只执行一个扫描（虚拟机控制台不能并发登录）；前一个扫描未结束时，
+          该TSN只保留最新时间片的待扫描任务，更早的待扫描任务被取代
+        - 扫描使用时间片开始时的分域表快照，不受之后时间片应用的影响
+
+        参数:
+        - scan_func: scan_func(tsn_idx, matrix) 扫描单个TSN
+        - max_workers: 扫描线程数，应不小于TSN数量
+        """
+        self.scan_func = scan_func
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tsn-scan')
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running = set()       # 正在扫描的TSN行号
+        self._pending = {}          # TSN行号 -> 等待扫描的ScanSlice
+        self.view_times = []        # [(时间片名称, 资源视图完成耗时)]
+        self.superseded = 0         # 被更新时间片取代的扫描数
+
+    def begin_slice(self, name, matrix):
+        """开始一个时间片的扫描阶段，返回ScanSlice；matrix为稠密数组时复制一份作为快照"""
+        if isinstance(matrix, np.ndarray):
+            matrix = matrix.copy()
+        return ScanSlice(self, name, matrix)
+
+    def submit(self, scan_slice, tsn_idx):
+        with self._lock:
+            if tsn_idx in self._running:
+                replaced = self._pending.get(tsn_idx)
+                self._pending[tsn_idx] = scan_slice
+                self.superseded += replaced is not None
+            else:
+                replaced = None
+                self._running.add(tsn_idx)
+                self._executor.submit(self._run, tsn_idx, scan_slice)
+        if replaced is not None:
+            logger.warning(f"TSN{tsn_idx + 1} 上一次扫描尚未结束，时间片 {replaced.name} 的扫描被 {scan_slice.name} 取代")
+            self._finish(replaced, superseded=True)
+
+    def _run(self, tsn_idx, scan_slice):
+        while scan_slice is not None:
+            try:
+                self.scan_func(tsn_idx, scan_slice.matrix)
+            except Exception as e:
+                logger.error(f"TSN{tsn_idx + 1} 扫描时间片 {scan_slice.name} 时出错: {e}")
+            self._finish(scan_slice)
+            with self._lock:
+                scan_slice = self._pending.pop(tsn_idx, None)
+                if scan_slice is None:
+                    self._running.discard(tsn_idx)
+                    self._idle.notify_all()
+
+    def _finish(self, scan_slice, superseded=False):
+        elapsed = scan_slice._finish_one(superseded)
+        if elapsed is None:
+            return
+        if scan_slice.superseded:
+            logger.info(f"时间片 {scan_slice.name} 的TSN域扫描结束，其中 {scan_slice.superseded} 个TSN被更新的时间片取代")
+        else:
+            self.view_times.append((scan_slice.name, elapsed))
+            logger.info(f"时间片 {scan_slice.name} 的TSN域扫描全部完成，资源视图耗时 {elapsed:.2f}秒")
+
+    def drain(self):
+        """等待所有正在执行和待执行的扫描结束"""
+        with self._idle:
+            while self._running:
+                self._idle.wait()
+
+    def close(self):
+        """等待扫描结束并输出统计"""
+        self.drain()
+        self._executor.shutdown(wait=True)
+        if self.view_times:
+            times = [elapsed for _, elapsed in self.view_times]
+            logger.info(f"扫描流水线: {len(times)} 个时间片完成资源视图，平均 {sum(times) / len(times):.2f}秒，"
+                        f"最长 {max(times):.2f}秒，被取代的扫描 {self.superseded} 个")
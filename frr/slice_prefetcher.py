@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchedSlice:
+    def __init__(self, name, matrix, base=None, differences=None, load_seconds=0.0, diff_seconds=0.0):
+        """
+        预读的时间片：已读取并校验的矩阵，以及相对于base的链路差异
+
+        参数:
+        - name: 时间片名称
+        - matrix: 时间片的矩阵，读取或校验失败时为None
+        - base: 计算差异时的当前矩阵，为None时没有预先计算差异
+        - differences: find_differences(base, matrix) 的结果 (to_add, to_remove, to_modify)
+        """
+        self.name = name
+        self.matrix = matrix
+        self.base = base
+        self.differences = differences
+        self.load_seconds = load_seconds
+        self.diff_seconds = diff_seconds
+
+    def differences_from(self, current_matrix):
+        """当前矩阵正是预读时的base（期间没有跳转/合并/校正）时返回预先计算的差异，否则返回None"""
+        if self.differences is not None and self.base is current_matrix:
+            return self.differences
+        return None
+
+
+class SlicePrefetcher:
+    def __init__(self, diff_func=None, metrics=None):
+        """
+        在当前时间片的等待期间于后台线程中读取、校验下一时间片并计算链路差异，
+        时间片边界处直接取用内存中的结果，CSV解析和差异计算不再占用截止时间之后的关键路径
+
+        预读的差异以预读时的当前矩阵为基准；之后当前矩阵发生变化（跳转、合并过期时间片、
+        失败后校正）时，取用方应通过PrefetchedSlice.differences_from放弃预先计算的差异重新计算。
+
+        参数:
+        - diff_func: diff_func(base, matrix) 计算链路差异（如NetworkTopologyManager.find_differences），
+                     为None时只预读矩阵
+        - metrics: LinkMetrics，记录prefetch阶段的耗时
+        """
+        self.diff_func = diff_func
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slice-prefetch')
+        self._lock = threading.Lock()
+        self._pending = {}      # 时间片名称 -> Future[PrefetchedSlice]
+        self.hits = 0           # 在时间片边界处取用预读结果的次数
+        self.misses = 0         # 没有预读结果（跳转等）而同步读取的次数
+
+    def prefetch(self, name, loader, base=None):
+        """
+        在后台预读一个时间片
+
+        参数:
+        - name: 时间片名称
+        - loader: 无参数的可调用对象，返回已校验的矩阵，失败时返回None
+        - base: 当前矩阵，不为None时同时计算到该时间片的链路差异（base在预读期间不能被修改）
+        """
+        with self._lock:
+            if name not in self._pending:
+                self._pending[name] = self._executor.submit(self._load, name, loader, base)
+
+    def _load(self, name, loader, base):
+        start = time.perf_counter()
+        matrix = loader()
+        load_seconds = time.perf_counter() - start
+        differences = None
+        if matrix is not None and base is not None and self.diff_func is not None:
+            if base.shape == matrix.shape:
+                differences = self.diff_func(base, matrix)
+            else:
+                base = None
+        diff_seconds = time.perf_counter() - start - load_seconds
+        if self.metrics is not None:
+            self.metrics.observe('prefetch', load_seconds + diff_seconds)
+        logger.info(f"已预读时间片 {name}: 读取校验 {load_seconds:.3f}秒，差异计算 {diff_seconds:.3f}秒")
+        return PrefetchedSlice(name, matrix, base, differences, load_seconds, diff_seconds)
+
+    def peek(self, name):
+        """等待并返回预读结果但不取走（预创建下一时间片的链路时使用），没有预读时返回None"""
+        with self._lock:
+            future = self._pending.get(name)
+        return self._result(future)
+
+    def take(self, name):
+        """
+        在时间片边界处取走预读结果，同时丢弃其他时间片的预读（跳转或跳过后不再需要）
+
+        返回:
+        - PrefetchedSlice，没有预读该时间片时返回None（调用方同步读取）
+        """
+        with self._lock:
+            future = self._pending.pop(name, None)
+            for other in self._pending.values():
+                other.cancel()
+            self._pending = {}
+        if future is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._result(future)
+
+    def _result(self, future):
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"预读时间片时出错: {e}")
+            return None
+
+    def discard(self):
+        """丢弃尚未取用的预读，并等待正在执行的预读结束（之后loader引用的时间线文件等可以关闭）"""
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        wait([future for future in pending if not future.cancel()])
+
+    def close(self):
+        """丢弃尚未取用的预读并输出统计"""
+        self.discard()
+        self._executor.shutdown(wait=True)
+        if self.hits or self.misses:
+            logger.info(f"时间片预读: {self.hits} 个时间片在边界处直接取用，{self.misses} 个同步读取")
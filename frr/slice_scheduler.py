@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 落后于截止时间时的处理策略
+LATE_POLICIES = ('none', 'skip', 'coalesce')
+
+
+class SliceScheduler:
+    def __init__(self, interval, policy='none', clock=time.monotonic, sleep=time.sleep, controller=None):
+        """
+        按绝对截止时间调度时间片
+
+        第k个时间片的截止时间固定为 start + k*interval，应用耗时不会累积成时间漂移。
+        落后时按policy处理:
+        - none: 依次应用所有时间片，直到追上截止时间为止不再等待
+        - skip: 丢弃所有已过期的时间片，等待下一个尚未到期的截止时间再应用
+        - coalesce: 立即应用已到期的最新时间片，中间时间片合并为一次差异
+
+        参数:
+        - interval: 时间片周期（秒）
+        - policy: 落后时的处理策略，取值见LATE_POLICIES
+        - clock/sleep: 单调时钟和等待函数，便于测试时替换
+        - controller: 可选的TimelineController，支持跳转、倍速播放和暂停；
+                      有控制器时时间片周期为 interval / 倍速；跳转和暂停后继续时以当前时刻为新的时间基准，
+                      改变倍速时保留当前时间片周期内已经过去的比例
+        """
+        if policy not in LATE_POLICIES:
+            raise ValueError(f"未知的落后处理策略: {policy}，可选: {', '.join(LATE_POLICIES)}")
+        self.interval = interval
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.controller = controller
+        self.reports = []
+
+    def _slot(self):
+        return self.controller.slot() if self.controller is not None else self.interval
+
+    def _wait_until(self, deadline):
+        """等待到截止时间，等待期间收到控制命令时提前返回True"""
+        remaining = deadline - self.clock()
+        if remaining <= 0:
+            return False
+        if self.controller is not None:
+            return self.controller.wait(remaining)
+        self.sleep(remaining)
+        return False
+
+    def _latest_due(self, origin, origin_k, slot, k, total):
+        """返回当前时刻已到期的最后一个时间片下标（不小于k）"""
+        elapsed = self.clock() - origin
+        due = origin_k + int(elapsed // slot) if slot > 0 else total - 1
+        return max(k, min(due, total - 1))
+
+    def run(self, slices, apply_func, prepare_func=None):
+        """
+        按截止时间依次应用时间片
+
+        参数:
+        - slices: [(名称, 负载)]，负载原样传给apply_func
+        - apply_func: apply_func(名称, 负载) -> 是否成功
+        - prepare_func: 可选，每个时间片应用完成后以下一个时间片调用 prepare_func(名称, 负载)，
+                        用于在等待期间预先准备下一时间片，耗时不计入应用耗时
+
+        返回:
+        - 每个实际应用的时间片的报告列表，字段:
+          name, index, lateness（开始时比截止时间晚多少秒）, duration（应用耗时）,
+          overrun（结束时超过下一个截止时间多少秒，未超过为0）, success, dropped（被跳过或合并的时间片名称）
+        """
+        total = len(slices)
+        self.reports = []
+        if total == 0:
+            return self.reports
+
+        if self.controller is not None:
+            self.controller.interval = self.interval
+        names = [name for name, _ in slices]
+        # 第k个时间片的截止时间为 origin + (k - origin_k) * 时间片周期
+        origin, origin_k = self.clock(), 0
+        slot = self._slot()
+        k = 0
+        while k < total:
+            if self.controller is not None:
+                k, rebase = self.controller.take(names, k)
+                if rebase:
+                    origin, origin_k = self.clock(), k
+                elif self._slot() != slot:
+                    # 改变倍速：按旧周期已经过去的比例保持不变，剩余部分按新的周期计算
+                    now = self.clock()
+                    origin = now - (now - origin) / slot * self._slot() if slot > 0 else now
+                slot = self._slot()
+            deadline = origin + (k - origin_k) * slot
+            if self._wait_until(deadline):
+                continue    # 等待期间收到控制命令，重新确定下一个时间片
+
+            dropped = []
+            if self.policy != 'none':
+                latest = self._latest_due(origin, origin_k, slot, k, total)
+                if latest > k:
+                    if self.policy == 'skip':
+                        # 跳过所有已过期的时间片，等到下一个截止时间再应用
+                        next_k = min(latest + 1, total - 1)
+                        dropped = [name for name, _ in slices[k:next_k]]
+                        k = next_k
+                        deadline = origin + (k - origin_k) * slot
+                        self._wait_until(deadline)
+                    else:
+                        dropped = [name for name, _ in slices[k:latest]]
+                        k = latest
+                        deadline = origin + (k - origin_k) * slot
+                    logger.warning(f"落后于截止时间，{'跳过' if self.policy == 'skip' else '合并'} {len(dropped)} 个时间片: {', '.join(map(str, dropped))}")
+
+            name, payload = slices[k]
+            begin = self.clock()
+            lateness = begin - deadline
+            try:
+                success = bool(apply_func(name, payload))
+            except Exception as e:
+                logger.error(f"应用时间片 {name} 时出错: {e}")
+                success = False
+            end = self.clock()
+            if self.controller is not None:
+                self.controller.record(end - begin)
+
+            next_deadline = origin + (k + 1 - origin_k) * slot
+            overrun = max(0.0, end - next_deadline) if k < total - 1 else 0.0
+            report = {
+                'name': name,
+                'index': k,
+                'lateness': lateness,
+                'duration': end - begin,
+                'overrun': overrun,
+                'success': success,
+                'dropped': dropped,
+            }
+            self.reports.append(report)
+
+            if overrun > 0:
+                logger.warning(f"时间片 {name} 开始延迟 {lateness:.3f}秒，耗时 {report['duration']:.2f}秒，超出下一个截止时间 {overrun:.3f}秒")
+            else:
+                logger.info(f"时间片 {name} 开始延迟 {lateness:.3f}秒，耗时 {report['duration']:.2f}秒")
+            k += 1
+
+            if prepare_func is not None and k < total:
+                try:
+                    prepare_func(*slices[k])
+                except Exception as e:
+                    logger.error(f"预处理时间片 {slices[k][0]} 时出错: {e}")
+
+        self.log_summary(total)
+        return self.reports
+
+    def log_summary(self, total):
+        """输出本次运行的截止时间统计"""
+        if not self.reports:
+            return
+        lateness = [r['lateness'] for r in self.reports]
+        overruns = sum(1 for r in self.reports if r['overrun'] > 0)
+        dropped = sum(len(r['dropped']) for r in self.reports)
+        logger.info(f"调度完成: 应用 {len(self.reports)}/{total} 个时间片，"
+                    f"{'跳过' if self.policy == 'skip' else '合并'} {dropped} 个，超时 {overruns} 个，"
+                    f"开始延迟 平均 {sum(lateness) / len(lateness):.3f}秒 / 最大 {max(lateness):.3f}秒")
+        feasible = self.controller.max_feasible_speed() if self.controller is not None else None
+        if feasible is not None:
+            logger.info(f"按最近 {len(self.controller.durations)} 个时间片的最长应用耗时估计，"
+                        f"最大可行倍速约 {feasible:.1f}×（当前 {self.controller.speed}×）")
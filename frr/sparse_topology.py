@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SparseTopology:
+    def __init__(self, shape, rows, cols, values):
+        """
+        稀疏链路可见性矩阵（按行优先线性下标排序的COO，附带CSR行指针）
+
+        只存储值>=0的可见链路，不可见位置统一视为-1.0，
+        内存与差异计算开销与可见链路数成正比而不是N²
+
+        参数:
+        - shape: 对应稠密矩阵的 (行数, 列数)
+        - rows/cols/values: 可见链路的行号、列号和值（延迟或距离）
+        """
+        self.shape = (int(shape[0]), int(shape[1]))
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(rows * self.shape[1] + cols, kind='stable')
+        self.rows = rows[order]
+        self.cols = cols[order]
+        self.values = values[order]
+        self.linear_index = self.rows * self.shape[1] + self.cols
+        # CSR行指针：第i行的链路位于 [indptr[i], indptr[i+1])
+        self.indptr = np.searchsorted(self.rows, np.arange(self.shape[0] + 1))
+
+    @classmethod
+    def from_dense(cls, matrix):
+        """由稠密矩阵构造，值<0的位置视为无链路"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        rows, cols = np.nonzero(matrix >= 0)
+        return cls(matrix.shape, rows, cols, matrix[rows, cols])
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        """逐行解析CSV文件，只保留可见链路，不构造完整的稠密矩阵"""
+        rows, cols, values = [], [], []
+        n_rows, n_cols = 0, None
+        with open(csv_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = np.array(line.split(','), dtype=np.float64)
+                if n_cols is None:
+                    n_cols = len(row)
+                elif len(row) != n_cols:
+                    raise ValueError(f"第 {n_rows + 1} 行元素数 {len(row)} 与首行 {n_cols} 不一致")
+                visible = np.nonzero(row >= 0)[0]
+                rows.append(np.full(len(visible), n_rows, dtype=np.int64))
+                cols.append(visible)
+                values.append(row[visible])
+                n_rows += 1
+        if n_cols is None:
+            raise ValueError(f"CSV文件为空: {csv_file}")
+        return cls((n_rows, n_cols),
+                   np.concatenate(rows), np.concatenate(cols), np.concatenate(values))
+
+    @property
+    def nnz(self):
+        """可见链路数量"""
+        return len(self.values)
+
+    def __getitem__(self, key):
+        """按 (i, j) 取值，不可见位置返回-1.0，与稠密矩阵的取值方式一致"""
+        i, j = key
+        target = int(i) * self.shape[1] + int(j)
+        pos = np.searchsorted(self.linear_index, target)
+        if pos < len(self.linear_index) and self.linear_index[pos] == target:
+            return self.values[pos]
+        return -1.0
+
+    def row(self, i):
+        """返回第i行的可见列号和对应值"""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.cols[start:end], self.values[start:end]
+
+    def crop(self, n_rows, n_cols):
+        """截取左上角 n_rows×n_cols 子矩阵"""
+        keep = (self.rows < n_rows) & (self.cols < n_cols)
+        return SparseTopology((n_rows, n_cols), self.rows[keep], self.cols[keep], self.values[keep])
+
+    def upper_triangle(self):
+        """只保留上三角（不含对角线）的链路，用于对称的XW星间矩阵"""
+        keep = self.cols > self.rows
+        return SparseTopology(self.shape, self.rows[keep], self.cols[keep], self.values[keep])
+
+    def to_dense(self):
+        """转换为稠密矩阵，不可见位置填充-1.0"""
+        matrix = np.full(self.shape, -1.0)
+        matrix[self.rows, self.cols] = self.values
+        return matrix
+
+    def __repr__(self):
+        return f"SparseTopology(shape={self.shape}, nnz={self.nnz})"
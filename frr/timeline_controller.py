@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import socket
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 各链路管理脚本默认的控制套接字（相对于frr目录）
+CONTROL_SOCKETS = {'tsn': 'timeline_control_tsn.sock', 'xw': 'timeline_control_xw.sock'}
+
+# 用于可行性估计的最近应用耗时数量
+RECENT_DURATIONS = 20
+
+
+def resolve_slice(names, target):
+    """
+    将时间片名称或编号解析为下标
+
+    参数:
+    - names: 时间片名称列表（如 output_1.csv ...）
+    - target: 时间片名称，或名称中的编号（如 83 对应 output_83.csv）
+
+    返回:
+    - 时间片在names中的下标
+    """
+    target = str(target)
+    if target in names:
+        return names.index(target)
+    if target.isdigit():
+        for index, name in enumerate(names):
+            match = re.search(r'(\d+)', os.path.basename(str(name)))
+            if match and int(match.group(1)) == int(target):
+                return index
+    raise ValueError(f"找不到时间片: {target}")
+
+
+class TimelineController:
+    def __init__(self, speed=1.0, start=None):
+        """
+        时间片播放控制：跳转、加速、暂停和继续，供SliceScheduler在每个时间片之前查询
+
+        跳转时直接应用目标时间片（链路管理器从当前状态计算到目标时间片的差异），不回放中间的时间片。
+        跳转和暂停后继续时立即应用目标（下一个）时间片，并以当前时刻作为新的时间基准；
+        改变倍速时保留当前时间片周期内已经过去的比例，剩余部分按新的倍速到期。
+        暂停在正在应用的时间片完成后生效，等待下一个截止时间期间收到暂停则立即生效
+
+        参数:
+        - speed: 播放倍速，时间片间隔为 interval / speed
+        - start: 开始播放的时间片（名称或编号），默认从第一个时间片开始
+        """
+        if speed <= 0:
+            raise ValueError(f"播放倍速必须为正数: {speed}")
+        self.speed = speed
+        self.paused = False
+        self.interval = None        # 由SliceScheduler在运行时设置
+        self.names = []
+        self.index = None           # 最近开始应用的时间片下标
+        self.durations = []         # 最近的时间片应用耗时
+        self._seek = start
+        self._changed = False
+        self._cond = threading.Condition()
+        self._server = None
+        self._socket_path = None
+
+    def slot(self):
+        """加速后的时间片长度（秒）"""
+        return self.interval / self.speed
+
+    def pause(self):
+        with self._cond:
+            self.paused = True
+            self._notify()
+        logger.info("时间线已暂停（正在应用的时间片完成后生效，下一个时间片在继续后应用）")
+
+    def resume(self):
+        with self._cond:
+            self.paused = False
+            self._notify()
+        logger.info("时间线继续")
+
+    def seek(self, target):
+        """跳转到指定时间片，当前时间片应用完成后生效"""
+        if self.names:
+            resolve_slice(self.names, target)    # 立即报告不存在的时间片
+        with self._cond:
+            self._seek = target
+            self._notify()
+        logger.info(f"时间线跳转到: {target}")
+
+    def set_speed(self, speed):
+        if speed <= 0:
+            raise ValueError(f"播放倍速必须为正数: {speed}")
+        with self._cond:
+            self.speed = speed
+            self._notify()
+        logger.info(f"播放倍速: {speed}×")
+        self.check_feasibility()
+
+    def _notify(self):
+        self._changed = True
+        self._cond.notify_all()
+
+    def wait(self, timeout):
+        """等待至多timeout秒，期间收到控制命令时提前返回True"""
+        with self._cond:
+            if not self._changed:
+                self._cond.wait(timeout)
+            return self._changed
+
+    def take(self, names, k):
+        """
+        在应用第k个时间片之前调用：暂停时阻塞到继续，有待处理的跳转时返回目标下标
+
+        返回:
+        - (下一个应用的时间片下标, 是否需要以当前时刻重新计算截止时间)，只有跳转和暂停后继续时需要；
+          改变倍速时由调用方按新的时间片长度换算截止时间
+        """
+        with self._cond:
+            self.names = list(names)
+            rebase = False
+            while self.paused:
+                self._cond.wait()
+                rebase = True
+            if self._seek is not None:
+                target, self._seek = self._seek, None
+                try:
+                    k = resolve_slice(self.names, target)
+                    rebase = True
+                except ValueError as e:
+                    logger.error(f"跳转失败: {e}")
+            self._changed = False
+            self.index = k
+            return k, rebase
+
+    def record(self, duration):
+        """记录一个时间片的应用耗时，超过加速后的时间片长度时告警"""
+        self.durations = (self.durations + [duration])[-RECENT_DURATIONS:]
+        if self.speed != 1.0 and duration > self.slot():
+            logger.warning(f"应用耗时 {duration:.2f}秒 超过 {self.speed}× 倍速下的时间片长度 {self.slot():.3f}秒，"
+                           f"当前倍速不可行，最大可行倍速约 {self.max_feasible_speed():.1f}×")
+
+    def max_feasible_speed(self):
+        """按最近的最长应用耗时估计的最大可行倍速，没有记录时返回None"""
+        if not self.durations or self.interval is None:
+            return None
+        longest = max(self.durations)
+        return self.interval / longest if longest > 0 else float('inf')
+
+    def check_feasibility(self):
+        """按最近的应用耗时检查当前倍速是否可行"""
+        feasible = self.max_feasible_speed()
+        if feasible is not None and self.speed > feasible:
+            logger.warning(f"最近的最长应用耗时 {max(self.durations):.2f}秒 超过 {self.speed}× 倍速下的时间片长度 "
+                           f"{self.slot():.3f}秒，最大可行倍速约 {feasible:.1f}×")
+
+    def status(self):
+        return {
+            'slice': self.names[self.index] if self.names and self.index is not None and self.index < len(self.names) else None,
+            'index': self.index,
+            'total': len(self.names),
+            'speed': self.speed,
+            'paused': self.paused,
+            'max_feasible_speed': self.max_feasible_speed(),
+        }
+
+    def handle(self, command):
+        """
+        执行一条文本控制命令，返回应答
+
+        命令: pause / resume / seek <时间片名称或编号> / speed <倍速> / status
+        """
+        parts = command.split()
+        if not parts:
+            return {'ok': False, 'error': '空命令'}
+        try:
+            if parts[0] == 'pause':
+                self.pause()
+            elif parts[0] == 'resume':
+                self.resume()
+            elif parts[0] == 'seek' and len(parts) == 2:
+                self.seek(parts[1])
+            elif parts[0] == 'speed' and len(parts) == 2:
+                self.set_speed(float(parts[1]))
+            elif parts[0] != 'status':
+                return {'ok': False, 'error': f'未知命令: {command}'}
+        except ValueError as e:
+            return {'ok': False, 'error': str(e)}
+        return dict(self.status(), ok=True)
+
+    def serve(self, socket_path):
+        """在unix套接字上接受控制命令（每个连接一行命令，返回一行JSON应答）"""
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)    # 上次运行遗留的套接字文件
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(socket_path)
+        self._server.listen()
+        self._socket_path = socket_path
+        threading.Thread(target=self._serve_loop, daemon=True).start()
+        logger.info(f"时间线控制命令: python timeline_controller.py {socket_path} pause|resume|seek <时间片>|speed <倍速>|status")
+
+    def _serve_loop(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return    # 套接字已关闭
+            with client:
+                try:
+                    command = client.makefile('r').readline().strip()
+                    client.sendall((json.dumps(self.handle(command), ensure_ascii=False) + "\n").encode())
+                except OSError as e:
+                    logger.warning(f"处理控制命令时出错: {e}")
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            if os.path.exists(self._socket_path):
+                os.unlink(self._socket_path)
+
+
+def send_command(socket_path, command, timeout=5.0):
+    """向运行中的链路管理脚本发送一条控制命令，返回应答"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((command + "\n").encode())
+        return json.loads(sock.makefile('r').readline())
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='控制链路管理脚本的时间线播放（--control-socket）')
+    parser.add_argument('socket', help=f"控制套接字路径，如 {CONTROL_SOCKETS['tsn']}")
+    parser.add_argument('command', nargs='+', help='pause / resume / seek <时间片名称或编号> / speed <倍速> / status')
+    args = parser.parse_args()
+
+    reply = send_command(args.socket, " ".join(args.command))
+    if not reply.pop('ok'):
+        logger.error(reply['error'])
+        return
+    feasible = reply['max_feasible_speed']
+    position = f"{reply['index'] + 1}/{reply['total']}" if reply['index'] is not None else f"-/{reply['total']}"
+    logger.info(f"当前时间片: {reply['slice']} ({position})，倍速 {reply['speed']}×，"
+                f"{'已暂停' if reply['paused'] else '运行中'}"
+                + (f"，最大可行倍速约 {feasible:.1f}×" if feasible is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import mmap
+import shutil
+import struct
+import logging
+import tempfile
+import numpy as np
+from pathlib import Path
+from sparse_topology import SparseTopology
+
+logger = logging.getLogger(__name__)
+
+# 文件布局: MAGIC | 头部长度(uint32, 小端) | JSON头部 | 填充到8字节对齐 | 数据区
+MAGIC = b'SATTL001'
+HEADER_LEN = struct.Struct('<I')
+ALIGN = 8
+
+# 拼接数据区时每次复制的字节数
+COPY_CHUNK = 16 * 1024 * 1024
+
+
+def get_csv_number(filename):
+    """从文件名中提取时间片编号（例如output_12.csv -> 12），没有数字时返回None"""
+    match = re.search(r'(\d+)', Path(filename).stem)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def list_slice_files(directory):
+    """返回目录中按时间片编号排序的 [(编号, CSV路径)]，跳过文件名中没有编号的文件"""
+    slices = []
+    for csv_file in Path(directory).glob("*.csv"):
+        number = get_csv_number(csv_file)
+        if number is None:
+            logger.warning(f"文件名中没有时间片编号，跳过: {csv_file.name}")
+            continue
+        slices.append((number, csv_file))
+    return sorted(slices)
+
+
+def compile_timeline(csv_dir, output_file, sparse=False):
+    """
+    将CSV时间片目录编译为单个二进制时间线文件
+
+    参数:
+    - csv_dir: 包含output_N.csv的目录
+    - output_file: 输出文件路径
+    - sparse: 为True时每个时间片按COO格式只保存可见链路，否则保存稠密的 T×N×M float64 数组
+
+    返回:
+    - 编译的时间片数量
+    """
+    slices = list_slice_files(csv_dir)
+    if not slices:
+        raise ValueError(f"目录 {csv_dir} 中没有找到带编号的CSV文件")
+
+    # 逐个读取CSV并写入，不同时保存全部时间片
+    matrices = (SparseTopology.from_csv(csv_file) for _, csv_file in slices)
+    return write_timeline(output_file, [number for number, _ in slices],
+                          [csv_file.name for _, csv_file in slices], matrices, sparse=sparse)
+
+
+def write_timeline(output_file, numbers, names, matrices, sparse=False):
+    """
+    将矩阵序列写入二进制时间线文件（如轨道可见性生成器的输出，无需先写CSV）
+
+    参数:
+    - output_file: 输出文件路径
+    - numbers: 时间片编号序列
+    - names: 时间片名称序列
+    - matrices: 与编号对应的矩阵序列（稠密数组或SparseTopology），大小必须一致；
+                可以是生成器，逐个时间片写入，内存占用与时间片数无关
+    - sparse: 为True时按COO格式只保存可见链路
+
+    返回:
+    - 写入的时间片数量
+    """
+    with TimelineWriter(output_file, sparse=sparse) as writer:
+        for number, name, matrix in zip(numbers, names, matrices):
+            writer.append(number, name, matrix)
+    return len(writer)
+
+
+class TimelineWriter:
+    def __init__(self, output_file, sparse=False):
+        """
+        逐个时间片流式写入二进制时间线文件，内存中只保留时间片编号、名称和偏移
+
+        头部需要全部时间片的编号和偏移，因此数据区先按段写入输出目录下的临时文件
+        （稀疏格式的values/rows/cols各一段，稠密格式一段），close时写出头部并依次拼接各段，
+        最后原子替换输出文件，运行中的管理器不会读到写了一半的时间线。
+        作为上下文管理器使用时正常退出即close，出现异常时丢弃已写入的数据。
+
+        参数:
+        - output_file: 输出文件路径
+        - sparse: 为True时按COO格式只保存可见链路
+        """
+        self.output_file = Path(output_file)
+        self.sparse = sparse
+        self.shape = None
+        self.numbers = []
+        self.names = []
+        self.offsets = [0]
+        n_parts = 3 if sparse else 1
+        self._parts = [tempfile.TemporaryFile(dir=self.output_file.parent, prefix=self.output_file.name + '.')
+                       for _ in range(n_parts)]
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def append(self, number, name, matrix):
+        """追加一个时间片，矩阵大小必须与首个时间片一致"""
+        if self.shape is None:
+            self.shape = tuple(matrix.shape)
+        elif tuple(matrix.shape) != self.shape:
+            raise ValueError(f"{name} 的矩阵大小 {matrix.shape} 与首个时间片 {self.shape} 不一致")
+        if self.sparse:
+            if not isinstance(matrix, SparseTopology):
+                matrix = SparseTopology.from_dense(matrix)
+            # 数据区依次为全部时间片的values(float64)、rows(int32)、cols(int32)
+            values, rows, cols = self._parts
+            values.write(matrix.values.astype('<f8').tobytes())
+            rows.write(matrix.rows.astype('<i4').tobytes())
+            cols.write(matrix.cols.astype('<i4').tobytes())
+            self.offsets.append(self.offsets[-1] + matrix.nnz)
+        else:
+            dense = matrix.to_dense() if isinstance(matrix, SparseTopology) else np.asarray(matrix)
+            self._parts[0].write(dense.astype('<f8').tobytes())
+        self.numbers.append(int(number))
+        self.names.append(name)
+
+    def close(self):
+        """
+        写出头部和数据区并原子替换输出文件
+
+        返回:
+        - 写入的时间片数量
+        """
+        if not self.numbers:
+            self.discard()
+            raise ValueError(f"没有时间片可写入 {self.output_file}")
+        header = {
+            'format': 'sparse' if self.sparse else 'dense',
+            'shape': list(self.shape),
+            'numbers': self.numbers,
+            'names': self.names,
+        }
+        if self.sparse:
+            header['offsets'] = self.offsets
+            header['nnz'] = self.offsets[-1]
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        prefix_len = len(MAGIC) + HEADER_LEN.size + len(header_bytes)
+        padding = (-prefix_len) % ALIGN
+
+        tmp_file = self.output_file.with_name(self.output_file.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(MAGIC)
+            f.write(HEADER_LEN.pack(len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\0' * padding)
+            for part in self._parts:
+                part.seek(0)
+                shutil.copyfileobj(part, f, COPY_CHUNK)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.output_file)
+        self.discard()
+
+        logger.info(f"已写入 {len(self.numbers)} 个时间片到 {self.output_file}，格式: {header['format']}，"
+                    f"矩阵大小: {self.shape[0]}x{self.shape[1]}")
+        return len(self.numbers)
+
+    def discard(self):
+        """丢弃已写入的数据，不生成输出文件"""
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class TimelineStore:
+    def __init__(self, timeline_file):
+        """
+        以内存映射方式打开二进制时间线文件，按时间片编号随机读取矩阵
+
+        参数:
+        - timeline_file: compile_timeline生成的文件
+        """
+        self.timeline_file = Path(timeline_file)
+        self._file = open(self.timeline_file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"不是有效的时间线文件: {timeline_file}")
+        (header_len,) = HEADER_LEN.unpack_from(self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LEN.size
+        header = json.loads(self._mmap[header_start:header_start + header_len].decode('utf-8'))
+        data_offset = header_start + header_len
+        data_offset += (-data_offset) % ALIGN
+
+        self.format = header['format']
+        self.shape = tuple(header['shape'])
+        self.numbers = header['numbers']
+        self.names = header['names']
+        self.nnz = header.get('nnz')  # 仅稀疏格式：全部时间片的可见链路总数
+        self._index = {number: i for i, number in enumerate(self.numbers)}
+
+        n_slices = len(self.numbers)
+        if self.format == 'sparse':
+            self._offsets = header['offsets']
+            nnz = header['nnz']
+            self._values = np.frombuffer(self._mmap, dtype='<f8', count=nnz, offset=data_offset)
+            self._rows = np.frombuffer(self._mmap, dtype='<i4', count=nnz, offset=data_offset + nnz * 8)
+            self._cols = np.frombuffer(self._mmap, dtype='<i4', count=nnz, offset=data_offset + nnz * 12)
+        else:
+            count = n_slices * self.shape[0] * self.shape[1]
+            self._dense = np.frombuffer(self._mmap, dtype='<f8', count=count,
+                                        offset=data_offset).reshape(n_slices, *self.shape)
+
+        logger.info(f"已加载时间线 {self.timeline_file}: {n_slices} 个时间片，格式: {self.format}，矩阵大小: {self.shape[0]}x{self.shape[1]}")
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __contains__(self, number):
+        return number in self._index
+
+    def position(self, number):
+        """返回时间片编号在时间线中的位置下标"""
+        if number not in self._index:
+            raise KeyError(f"时间线中没有编号为 {number} 的时间片")
+        return self._index[number]
+
+    def matrix_at(self, position):
+        """
+        按位置下标读取时间片矩阵
+
+        返回:
+        - 稠密格式返回只读的numpy数组视图，稀疏格式返回SparseTopology
+        """
+        if self.format == 'sparse':
+            start, end = self._offsets[position], self._offsets[position + 1]
+            return SparseTopology(self.shape, self._rows[start:end], self._cols[start:end], self._values[start:end])
+        return self._dense[position]
+
+    def get(self, number):
+        """按时间片编号（output_N.csv中的N）读取矩阵"""
+        return self.matrix_at(self.position(number))
+
+    def __iter__(self):
+        """按时间片顺序遍历 (编号, 矩阵)"""
+        for position, number in enumerate(self.numbers):
+            yield number, self.matrix_at(position)
+
+    def close(self):
+        """释放内存映射和文件句柄，之后不能再访问已返回的稠密视图"""
+        for name in ('_dense', '_values', '_rows', '_cols'):
+            if hasattr(self, name):
+                delattr(self, name)
+        try:
+            self._mmap.close()
+        except (AttributeError, BufferError):
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='CSV时间片目录与二进制时间线文件转换工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = subparsers.add_parser('compile', help='将CSV目录编译为时间线文件')
+    compile_parser.add_argument('csv_dir', help='包含output_N.csv的目录')
+    compile_parser.add_argument('-o', '--output', help='输出文件路径，默认为 <csv_dir>.timeline')
+    compile_parser.add_argument('--sparse', action='store_true',
+                                help='按稀疏格式只保存可见链路，适用于大规模星座')
+
+    info_parser = subparsers.add_parser('info', help='显示时间线文件信息')
+    info_parser.add_argument('timeline_file', help='时间线文件路径')
+
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        output = args.output or f"{str(args.csv_dir).rstrip('/')}.timeline"
+        compile_timeline(args.csv_dir, output, sparse=args.sparse)
+    else:
+        with TimelineStore(args.timeline_file) as timeline:
+            logger.info(f"时间片编号范围: {timeline.numbers[0]} ~ {timeline.numbers[-1]}")
+            if timeline.format == 'sparse':
+                logger.info(f"可见链路总数: {timeline.nnz}")
+
+
+if __name__ == "__main__":
+    main()
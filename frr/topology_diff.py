@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import logging
+import numpy as np
+from sparse_topology import SparseTopology
+
+logger = logging.getLogger(__name__)
+
+
+def link_mask(matrix, symmetric=False):
+    """
+    返回有链路（值>=0）位置的布尔掩码
+
+    参数:
+    - matrix: 链路可见性矩阵
+    - symmetric: 为True时矩阵按对称处理，只保留上三角（不含对角线），
+                 用于XW星间矩阵；为False时使用全矩阵，用于TSN×DG矩阵
+    """
+    if isinstance(matrix, SparseTopology):
+        matrix = matrix.to_dense()
+    mask = np.asarray(matrix) >= 0
+    if symmetric:
+        mask &= np.triu(np.ones(mask.shape, dtype=bool), k=1)
+    return mask
+
+
+def _to_pairs(mask):
+    """将布尔掩码转换为按行优先排列的 [(i, j)] 列表"""
+    rows, cols = np.nonzero(mask)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def _sparse_links(matrix, symmetric):
+    return matrix.upper_triangle() if symmetric else matrix
+
+
+def active_links(matrix, symmetric=False):
+    """返回矩阵中所有存在的链路 [(i, j)]"""
+    if isinstance(matrix, SparseTopology):
+        links = _sparse_links(matrix, symmetric)
+        return list(zip(links.rows.tolist(), links.cols.tolist()))
+    return _to_pairs(link_mask(matrix, symmetric))
+
+
+def count_active_links(matrix, symmetric=False):
+    """统计矩阵中存在的链路数量"""
+    if isinstance(matrix, SparseTopology):
+        return _sparse_links(matrix, symmetric).nnz
+    return int(np.count_nonzero(link_mask(matrix, symmetric)))
+
+
+def connected_columns(matrix, row):
+    """返回第row行中存在链路的列号列表（如某个TSN可见的全部低轨卫星）"""
+    if isinstance(matrix, SparseTopology):
+        return matrix.row(row)[0].tolist()
+    return np.nonzero(np.asarray(matrix)[row] >= 0)[0].tolist()
+
+
+def _linear_to_pairs(linear_index, n_cols):
+    rows, cols = np.divmod(linear_index, n_cols)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def diff_sparse(old_matrix, new_matrix, symmetric=False):
+    """
+    稀疏矩阵的差异计算，开销与可见链路数成正比
+
+    返回值与diff_matrices相同
+    """
+    if not isinstance(old_matrix, SparseTopology):
+        old_matrix = SparseTopology.from_dense(old_matrix)
+    if not isinstance(new_matrix, SparseTopology):
+        new_matrix = SparseTopology.from_dense(new_matrix)
+
+    if symmetric:
+        n = min(old_matrix.shape[0], new_matrix.shape[0])
+        old_matrix = old_matrix.crop(n, n).upper_triangle()
+        new_matrix = new_matrix.crop(n, n).upper_triangle()
+    elif old_matrix.shape != new_matrix.shape:
+        logger.error(f"矩阵大小不匹配: 旧矩阵 {old_matrix.shape[0]}x{old_matrix.shape[1]} vs 新矩阵 {new_matrix.shape[0]}x{new_matrix.shape[1]}")
+        return [], [], []
+
+    n_cols = new_matrix.shape[1]
+    old_idx, new_idx = old_matrix.linear_index, new_matrix.linear_index
+    common, old_pos, new_pos = np.intersect1d(old_idx, new_idx, assume_unique=True, return_indices=True)
+    changed = old_matrix.values[old_pos] != new_matrix.values[new_pos]
+
+    to_add = _linear_to_pairs(np.setdiff1d(new_idx, old_idx, assume_unique=True), n_cols)
+    to_remove = _linear_to_pairs(np.setdiff1d(old_idx, new_idx, assume_unique=True), n_cols)
+    to_modify = _linear_to_pairs(common[changed], n_cols)
+    return to_add, to_remove, to_modify
+
+
+def diff_matrices(old_matrix, new_matrix, symmetric=False):
+    """
+    用布尔掩码一次性计算两个矩阵之间需要添加、删除和修改的链路
+
+    对称模式下按两个矩阵的最小尺寸比较上三角；全矩阵模式下要求两个矩阵尺寸相同。
+    任一矩阵为SparseTopology时改用diff_sparse计算
+
+    返回:
+    - (to_add, to_remove, to_modify)，均为按行优先排列的 [(i, j)] 列表
+    """
+    if isinstance(old_matrix, SparseTopology) or isinstance(new_matrix, SparseTopology):
+        return diff_sparse(old_matrix, new_matrix, symmetric)
+
+    old_matrix = np.asarray(old_matrix)
+    new_matrix = np.asarray(new_matrix)
+
+    if symmetric:
+        n = min(old_matrix.shape[0], new_matrix.shape[0])
+        old_matrix = old_matrix[:n, :n]
+        new_matrix = new_matrix[:n, :n]
+    elif old_matrix.shape != new_matrix.shape:
+        logger.error(f"矩阵大小不匹配: 旧矩阵 {old_matrix.shape[0]}x{old_matrix.shape[1]} vs 新矩阵 {new_matrix.shape[0]}x{new_matrix.shape[1]}")
+        return [], [], []
+
+    old_mask = link_mask(old_matrix, symmetric)
+    new_mask = link_mask(new_matrix, symmetric)
+
+    to_add = _to_pairs(~old_mask & new_mask)
+    to_remove = _to_pairs(old_mask & ~new_mask)
+    to_modify = _to_pairs(old_mask & new_mask & (old_matrix != new_matrix))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, j in to_add:
+            logger.debug(f"需要添加链路: {i} <-> {j} (值: {new_matrix[i, j]})")
+        for i, j in to_remove:
+            logger.debug(f"需要删除链路: {i} <-> {j}")
+        for i, j in to_modify:
+            logger.debug(f"需要修改链路: {i} <-> {j} (原值: {old_matrix[i, j]}, 新值: {new_matrix[i, j]})")
+
+    return to_add, to_remove, to_modify
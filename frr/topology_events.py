@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import queue
+import select
+import socket
+import threading
+import logging
+import numpy as np
+from topology_diff import active_links, diff_matrices
+
+logger = logging.getLogger(__name__)
+
+# 事件格式版本，订阅者遇到不同版本时拒绝解析
+EVENT_VERSION = 1
+
+# 各链路管理脚本默认的事件套接字（相对于frr目录）
+EVENT_SOCKETS = {'tsn': 'topology_events_tsn.sock', 'xw': 'topology_events_xw.sock'}
+
+# 向单个订阅者发送一个事件的最长时间（秒），超时的订阅者被断开
+SEND_TIMEOUT = 1.0
+
+# 单个订阅者最多积压的未发送事件数，超过时断开该订阅者
+MAX_PENDING_EVENTS = 64
+
+
+def _link_list(matrix, links):
+    return [[i, j, float(matrix[i, j])] for i, j in links]
+
+
+def _domains(matrix, rows):
+    """每个TSN行当前连接的列号（分域成员）"""
+    domains = {str(row): [] for row in rows}
+    if domains:
+        for i, j in active_links(matrix):
+            if str(i) in domains:
+                domains[str(i)].append(j)
+    return domains
+
+
+class _Subscription:
+    def __init__(self, client):
+        """
+        单个订阅者的发送队列，由独立的线程写入套接字，发布端只负责入队，不会被接收慢的订阅者阻塞
+
+        参数:
+        - client: 已接受的订阅者套接字
+        """
+        self.client = client
+        self.client.settimeout(SEND_TIMEOUT)
+        self.alive = True
+        self._queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def put(self, data):
+        """排队一个事件，订阅者已断开或积压过多时返回False"""
+        if not self.alive:
+            return False
+        try:
+            self._queue.put_nowait(data)
+            return True
+        except queue.Full:
+            logger.warning(f"拓扑事件订阅者积压超过 {MAX_PENDING_EVENTS} 个事件，已断开")
+            self.abort()
+            return False
+
+    def _write_loop(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            try:
+                self.client.sendall(data)
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info("拓扑事件订阅者已断开")
+                break
+            except OSError as e:
+                if self.alive:
+                    logger.warning(f"拓扑事件订阅者接收过慢，已断开: {e}")
+                break
+        self.alive = False
+        self.client.close()
+
+    def abort(self):
+        """立即断开，丢弃尚未发送的事件"""
+        self.alive = False
+        try:
+            self.client.shutdown(socket.SHUT_RDWR)    # 唤醒阻塞在sendall中的发送线程
+        except OSError:
+            pass
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def finish(self, timeout):
+        """发送完已排队的事件后断开，最多等待timeout秒"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            self.abort()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.abort()
+
+
+class TopologyEventPublisher:
+    def __init__(self, socket_path, source, symmetric=False):
+        """
+        拓扑变化事件的发布端，在本地unix套接字上以JSON行的形式广播每个已提交时间片的链路变化
+
+        事件字段:
+        - v: 事件格式版本（EVENT_VERSION）
+        - seq: 递增序号，每个已提交的时间片加1
+        - type: snapshot（订阅者连接时收到的当前完整状态）或 slice（一个时间片的增量）
+        - source: tsn / xw
+        - slice: 时间片名称
+        - shape: 矩阵大小（尚未发布任何时间片时的snapshot中为null）
+        - symmetric: 矩阵是否对称（XW星间矩阵只发送上三角的链路）
+        - links: snapshot中的全部链路 [[i, j, 值]]
+        - added/removed/modified: slice中新增 [[i, j, 值]]、删除 [[i, j]]、值变化 [[i, j, 值]] 的链路
+        - domains: TSN矩阵中分域成员有变化的行 {行号: [列号]}（snapshot中为全部行）
+
+        新订阅者先收到snapshot（尚未发布任何时间片时为slice为null、没有链路的空快照），
+        之后按顺序收到每个时间片的增量，不会错过或重复时间片。
+        事件在锁内编码并放入各订阅者的发送队列，由每个订阅者的发送线程写入套接字，
+        发布时不等待订阅者接收。
+
+        参数:
+        - socket_path: unix套接字路径
+        - source: 事件来源（tsn/xw）
+        - symmetric: 矩阵是否对称
+        """
+        self.socket_path = socket_path
+        self.source = source
+        self.symmetric = symmetric
+        self.seq = 0
+        self.slice = None
+        self.matrix = None
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        """监听套接字，在后台线程中接受订阅者"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)    # 上次运行遗留的套接字文件
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        logger.info(f"拓扑变化事件发布于: {self.socket_path}")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return    # 套接字已关闭
+            subscription = _Subscription(client)
+            with self._lock:
+                # 在锁内排队快照，保证订阅者从快照之后的下一个时间片开始接收增量
+                subscription.put(self._snapshot())
+                self._clients.append(subscription)
+            logger.info(f"新的拓扑事件订阅者，当前 {len(self._clients)} 个")
+
+    def _event(self, event_type, **fields):
+        event = {'v': EVENT_VERSION, 'seq': self.seq, 'type': event_type, 'source': self.source,
+                 'slice': self.slice, 'time': time.time(),
+                 'shape': None if self.matrix is None else list(self.matrix.shape),
+                 'symmetric': self.symmetric}
+        event.update(fields)
+        return (json.dumps(event) + "\n").encode()
+
+    def _snapshot(self):
+        if self.matrix is None:
+            return self._event('snapshot', links=[], domains={})
+        links = active_links(self.matrix, self.symmetric)
+        rows = [] if self.symmetric else range(self.matrix.shape[0])
+        return self._event('snapshot', links=_link_list(self.matrix, links), domains=_domains(self.matrix, rows))
+
+    def publish(self, name, matrix):
+        """
+        发布一个已提交的时间片，增量由上一个已发布的矩阵计算
+
+        参数:
+        - name: 时间片名称
+        - matrix: 时间片的矩阵（稠密数组或SparseTopology）
+        """
+        with self._lock:
+            if self.matrix is None or self.matrix.shape != matrix.shape:
+                to_add, to_remove, to_modify = active_links(matrix, self.symmetric), [], []
+                if self.matrix is not None:
+                    to_remove = active_links(self.matrix, self.symmetric)
+            else:
+                to_add, to_remove, to_modify = diff_matrices(self.matrix, matrix, self.symmetric)
+            self.seq += 1
+            self.slice = name
+            self.matrix = matrix
+            rows = [] if self.symmetric else sorted({i for i, _ in to_add} | {i for i, _ in to_remove})
+            data = self._event('slice', added=_link_list(matrix, to_add),
+                               removed=[[i, j] for i, j in to_remove],
+                               modified=_link_list(matrix, to_modify),
+                               domains=_domains(matrix, rows))
+            self._clients = [subscription for subscription in self._clients if subscription.put(data)]
+
+    def close(self):
+        """关闭套接字，把已排队的事件发送完后断开所有订阅者"""
+        if self._server is None:
+            return
+        self._server.close()
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for subscription in clients:
+            subscription.finish(SEND_TIMEOUT)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = None
+
+
+class TopologySubscriber:
+    def __init__(self, socket_path):
+        """
+        拓扑变化事件的订阅端，根据收到的事件维护当前时间片的链路状态
+
+        参数:
+        - socket_path: 发布端的unix套接字路径
+        """
+        self.socket_path = socket_path
+        self.seq = 0
+        self.slice = None
+        self.shape = None
+        self.symmetric = False
+        self.links = {}     # {(i, j): 值}
+        self._sock = None
+        self._buffer = b""
+
+    def connect(self, wait=0.0):
+        """连接发布端，发布端尚未启动时最多等待wait秒"""
+        deadline = time.monotonic() + wait
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                self._sock = sock
+                return self
+            except OSError:
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _next_line(self, block=True):
+        """读取一行事件，非阻塞模式下没有完整的行时返回None，连接关闭时返回None"""
+        while b"\n" not in self._buffer:
+            if not block and not select.select([self._sock], [], [], 0)[0]:
+                return None
+            data = self._sock.recv(65536)
+            if not data:
+                return None
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def apply(self, event):
+        """将一个事件应用到本地链路状态"""
+        if event.get('v') != EVENT_VERSION:
+            raise ValueError(f"不支持的拓扑事件版本: {event.get('v')}，当前版本: {EVENT_VERSION}")
+        if event['type'] == 'snapshot':
+            self.links = {(i, j): value for i, j, value in event['links']}
+        else:
+            if self.seq and event['seq'] != self.seq + 1:
+                logger.warning(f"拓扑事件序号不连续: {self.seq} -> {event['seq']}")
+            for i, j in event['removed']:
+                self.links.pop((i, j), None)
+            for i, j, value in event['added'] + event['modified']:
+                self.links[(i, j)] = value
+        self.seq = event['seq']
+        self.slice = event['slice']
+        self.shape = None if event['shape'] is None else tuple(event['shape'])
+        self.symmetric = event['symmetric']
+        return event
+
+    def events(self, coalesce=False):
+        """
+        逐个产生收到的事件（已应用到本地状态），连接关闭时结束；
+        发布端尚未提交任何时间片时的空快照只应用不产生
+
+        参数:
+        - coalesce: 为True时，处理速度跟不上时只产生已到达的最新事件（中间事件仍应用到本地状态），
+                    事件中的skipped为被合并的事件数
+        """
+        while True:
+            line = self._next_line()
+            if line is None:
+                return
+            event = self.apply(json.loads(line))
+            if event['slice'] is None:
+                continue
+            skipped = 0
+            while coalesce:
+                line = self._next_line(block=False)
+                if line is None:
+                    break
+                event = self.apply(json.loads(line))
+                skipped += 1
+            event['skipped'] = skipped
+            yield event
+
+    def matrix(self):
+        """当前时间片的稠密矩阵，不存在的链路为-1.0，对称矩阵补全下三角；尚未收到任何时间片时返回None"""
+        if self.shape is None:
+            return None
+        matrix = np.full(self.shape, -1.0)
+        if self.links:
+            index = np.array(list(self.links))
+            values = np.array(list(self.links.values()))
+            matrix[index[:, 0], index[:, 1]] = values
+            if self.symmetric:
+                matrix[index[:, 1], index[:, 0]] = values
+        return matrix
+
+    def domain(self, row):
+        """TSN行当前连接的列号"""
+        return sorted(j for i, j in self.links if i == row)
+
+
+def fetch_topology(socket_path, timeout=5.0):
+    """
+    连接发布端，取得当前时间片的完整状态后断开
+
+    返回:
+    - TopologySubscriber，其slice/links/matrix()为当前时间片的状态；
+      发布端尚未提交任何时间片时slice和matrix()为None
+    """
+    subscriber = TopologySubscriber(socket_path).connect()
+    try:
+        subscriber._sock.settimeout(timeout)
+        line = subscriber._next_line()
+        if line is None:
+            raise ConnectionError(f"拓扑事件发布端 {socket_path} 已关闭")
+        subscriber.apply(json.loads(line))
+    finally:
+        subscriber.close()
+    return subscriber
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='订阅并输出链路管理脚本发布的拓扑变化事件（--event-socket）')
+    parser.add_argument('socket', help=f"事件套接字路径，如 {EVENT_SOCKETS['tsn']}")
+    parser.add_argument('--wait', type=float, default=0.0, help='发布端尚未启动时最多等待的秒数，默认0')
+    args = parser.parse_args()
+
+    subscriber = TopologySubscriber(args.socket).connect(args.wait)
+    try:
+        for event in subscriber.events():
+            if event['type'] == 'snapshot':
+                logger.info(f"[{event['seq']}] 当前时间片 {event['slice']}: {len(event['links'])} 条链路")
+            else:
+                domains = "" if event['symmetric'] else f"分域变化 {len(event['domains'])} 个TSN，"
+                logger.info(f"[{event['seq']}] 时间片 {event['slice']}: 新增 {len(event['added'])}，"
+                            f"删除 {len(event['removed'])}，修改 {len(event['modified'])}，"
+                            f"{domains}当前共 {len(subscriber.links)} 条链路")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
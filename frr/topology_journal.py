@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import logging
+import numpy as np
+from pathlib import Path
+from sparse_topology import SparseTopology
+
+logger = logging.getLogger(__name__)
+
+
+def _fsync_directory(directory):
+    """fsync目录，保证os.replace后的文件名在崩溃后依然可见"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def save_matrix(matrix_file, matrix, name):
+    """将矩阵（稠密数组或SparseTopology）连同时间片名称原子写入npz文件"""
+    matrix_file = Path(matrix_file)
+    tmp_file = matrix_file.with_name(matrix_file.name + '.tmp')
+    if isinstance(matrix, SparseTopology):
+        arrays = {'format': 'sparse', 'shape': np.asarray(matrix.shape),
+                  'rows': matrix.rows, 'cols': matrix.cols, 'values': matrix.values}
+    else:
+        arrays = {'format': 'dense', 'data': np.asarray(matrix, dtype=float)}
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, name=name, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, matrix_file)
+    _fsync_directory(matrix_file.parent)
+
+
+def load_matrix(matrix_file):
+    """
+    读取save_matrix写入的矩阵
+
+    返回:
+    - (时间片名称, 矩阵)
+    """
+    with np.load(matrix_file, allow_pickle=False) as data:
+        name = str(data['name'])
+        if str(data['format']) == 'sparse':
+            matrix = SparseTopology(tuple(int(n) for n in data['shape']), data['rows'], data['cols'], data['values'])
+        else:
+            matrix = data['data']
+    return name, matrix
+
+
+class TopologyJournal:
+    def __init__(self, journal_file):
+        """
+        链路管理器的崩溃安全日志
+
+        日志为只追加的JSON Lines文件，每条记录写入后立即fsync:
+        - start: 一次新的运行开始（重写日志，只保留本次运行）
+        - begin/stage: 开始应用/预创建某个时间片，之后没有commit说明上次运行在中途退出
+        - commit: 时间片应用完成，附带本时间片的链路操作统计和失败链路
+        提交时先原子写入current_matrix快照（<日志文件>.matrix.npz），再追加commit记录。
+
+        参数:
+        - journal_file: 日志文件路径
+        """
+        self.journal_file = Path(journal_file)
+        self.matrix_file = self.journal_file.with_name(self.journal_file.name + '.matrix.npz')
+
+    def _append(self, record):
+        record['time'] = time.time()
+        with open(self.journal_file, 'a') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, source):
+        """开始一次新的运行，原子替换掉旧日志"""
+        tmp_file = self.journal_file.with_name(self.journal_file.name + '.tmp')
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps({'event': 'start', 'source': str(source), 'time': time.time()}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.journal_file)
+        _fsync_directory(self.journal_file.parent)
+
+    def begin(self, name, event='begin'):
+        """记录开始应用（begin）或预创建（stage）某个时间片"""
+        self._append({'event': event, 'name': name})
+
+    def commit(self, name, matrix, stats, failed_links):
+        """
+        记录时间片应用完成
+
+        参数:
+        - name: 时间片名称
+        - matrix: 应用后的current_matrix
+        - stats: {'add': 数量, 'remove': 数量, 'modify': 数量}
+        - failed_links: 失败的链路 [(node1, node2)]
+        """
+        save_matrix(self.matrix_file, matrix, name)
+        self._append({'event': 'commit', 'name': name, 'stats': stats,
+                      'failed': [[int(node1), int(node2)] for node1, node2 in failed_links]})
+
+    def records(self):
+        """读取本次运行（最后一条start之后）的全部记录，忽略崩溃时写了一半的最后一行"""
+        if not self.journal_file.exists():
+            return []
+        records = []
+        with open(self.journal_file, 'r') as f:
+            lines = f.readlines()
+        for n, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if n == len(lines) - 1:
+                    logger.warning(f"日志 {self.journal_file} 最后一行不完整，已忽略")
+                    break
+                raise
+            if record.get('event') == 'start':
+                records = []
+            records.append(record)
+        return records
+
+    def last_commit(self):
+        """
+        返回最后一个已提交的时间片
+
+        返回:
+        - (commit记录, 矩阵快照或None, 是否干净)，没有已提交的时间片时返回None。
+          干净指commit之后没有begin/stage记录、没有失败链路且快照与记录一致，此时容器内状态应与快照一致
+        """
+        records = self.records()
+        commits = [n for n, record in enumerate(records) if record.get('event') == 'commit']
+        if not commits:
+            return None
+        record = records[commits[-1]]
+        clean = commits[-1] == len(records) - 1 and not record.get('failed')
+
+        matrix = None
+        try:
+            snapshot_name, matrix = load_matrix(self.matrix_file)
+            if snapshot_name != record['name']:
+                # 快照已写入但commit记录未追加，快照比日志新
+                logger.warning(f"矩阵快照 ({snapshot_name}) 与最后提交的时间片 ({record['name']}) 不一致")
+                matrix, clean = None, False
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"读取矩阵快照 {self.matrix_file} 失败: {e}")
+            clean = False
+        return record, matrix, clean
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='查看链路管理器的运行日志')
+    parser.add_argument('journal_file', help='日志文件路径')
+    args = parser.parse_args()
+
+    journal = TopologyJournal(args.journal_file)
+    records = journal.records()
+    if not records:
+        logger.info("日志为空")
+        return
+    if records[0].get('event') == 'start':
+        logger.info(f"本次运行的时间片来源: {records[0].get('source')}")
+    commits = [record for record in records if record.get('event') == 'commit']
+    failed = sum(len(record.get('failed', [])) for record in commits)
+    logger.info(f"已提交 {len(commits)} 个时间片，失败链路 {failed} 条")
+    state = journal.last_commit()
+    if state is not None:
+        record, _, clean = state
+        logger.info(f"最后提交的时间片: {record['name']}，{'可直接续跑' if clean else '续跑时需根据容器内实际状态校正'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from container_backend import get_default_backend
+from link_batch_executor import LinkBatchExecutor
+from link_metrics import get_default_metrics
+from topology_diff import active_links
+
+logger = logging.getLogger(__name__)
+
+# 一次nsenter内依次输出接口和qdisc的JSON，以分隔行区分
+DUMP_SEPARATOR = "----8<----"
+DUMP_SCRIPT = f"ip -j addr show; echo '{DUMP_SEPARATOR}'; tc -j qdisc show"
+
+# netem延迟比较的容差（毫秒）
+DELAY_TOLERANCE_MS = 0.01
+
+
+def parse_interfaces(ip_json):
+    """解析 ip -j addr show 的输出，返回 {接口名: {'up': 是否已启用, 'addresses': {IPv4地址/前缀}}}"""
+    interfaces = {}
+    for link in json.loads(ip_json or "[]"):
+        addresses = {f"{a['local']}/{a['prefixlen']}" for a in link.get('addr_info', [])
+                     if a.get('family') == 'inet'}
+        interfaces[link['ifname']] = {
+            'up': 'UP' in link.get('flags', []),
+            'addresses': addresses,
+        }
+    return interfaces
+
+
+def parse_netem_delays(tc_json):
+    """解析 tc -j qdisc show 的输出，返回 {接口名: netem延迟(毫秒)}"""
+    delays = {}
+    for qdisc in json.loads(tc_json or "[]"):
+        if qdisc.get('kind') != 'netem':
+            continue
+        delay = qdisc.get('options', {}).get('delay', {})
+        # iproute2的JSON输出中时间单位为秒
+        value = delay.get('delay', 0) if isinstance(delay, dict) else delay
+        delays[qdisc['dev']] = float(value) * 1000
+    return delays
+
+
+class TopologyReconciler:
+    def __init__(self, manager, backend=None, max_workers=16):
+        """
+        根据容器命名空间中的实际状态校正网络拓扑
+
+        每个命名空间只执行一次nsenter，以JSON格式导出全部接口、地址和qdisc，
+        与目标时间片对比后只提交必要的修正操作，修正后重建管理器的current_links/current_matrix。
+
+        参数:
+        - manager: 链路管理器，需提供 symmetric_matrix、managed_veth_pattern、managed_containers()、
+                   link_interfaces()、netem_delay_ms() 以及 plan_create_link/plan_delete_link/plan_modify_link
+        - backend: 容器后端（见container_backend），默认使用进程内共享后端
+        - max_workers: 并行导出命名空间状态的最大线程数
+        """
+        self.manager = manager
+        self.backend = backend or get_default_backend()
+        self.max_workers = max_workers
+
+    def dump_namespace(self, container, handle):
+        """
+        导出单个容器命名空间的状态
+
+        参数:
+        - handle: 容器后端解析出的命名空间句柄，为None表示容器不可用
+
+        返回:
+        - {'interfaces': parse_interfaces结果, 'netem': parse_netem_delays结果}，容器不可用时返回None
+        """
+        if handle is None:
+            return None
+        argv = self.backend.exec_argv(container, handle, ['sh', '-c', DUMP_SCRIPT])
+        try:
+            with get_default_metrics().timer('dump', container):
+                result = self.backend.run(argv)
+            ip_json, _, tc_json = result.stdout.partition(DUMP_SEPARATOR)
+            return {
+                'interfaces': parse_interfaces(ip_json.strip()),
+                'netem': parse_netem_delays(tc_json.strip()),
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"导出容器 {container} 的网络状态失败: {e}")
+            return None
+
+    def snapshot(self, containers):
+        """并行导出多个容器命名空间的状态，返回 {容器名: 状态或None}"""
+        containers = sorted(set(containers))
+        handles = self.backend.resolve(containers)
+        workers = max(1, min(self.max_workers, len(containers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            states = list(executor.map(lambda c: self.dump_namespace(c, handles.get(c)), containers))
+        return dict(zip(containers, states))
+
+    def plan(self, matrix, snapshot):
+        """
+        对比目标矩阵与实际状态，计算最小修正集合
+
+        返回:
+        - {'stray': [(容器名, 接口名)], 'rebuild': [(node1, node2)], 'create': [(node1, node2)],
+           'fix': [(node1, node2, [(容器名, 子命令)])], 'delay': [(node1, node2)],
+           'ok': [(node1, node2)], 'unreachable': [(node1, node2)]}
+        """
+        manager = self.manager
+        plan = {'stray': [], 'rebuild': [], 'create': [], 'fix': [], 'delay': [], 'ok': [], 'unreachable': []}
+        expected = set()
+
+        for node1, node2 in active_links(matrix, manager.symmetric_matrix):
+            ends = manager.link_interfaces(node1, node2)
+            expected.update((container, veth) for container, veth, _ in ends)
+            states = [snapshot.get(container) for container, _, _ in ends]
+            if any(state is None for state in states):
+                plan['unreachable'].append((node1, node2))
+                continue
+
+            present = [veth in state['interfaces'] for (_, veth, _), state in zip(ends, states)]
+            if not any(present):
+                plan['create'].append((node1, node2))
+                continue
+            if not all(present):
+                # 只剩一端的残缺链路，删除后重建
+                plan['rebuild'].append((node1, node2))
+                continue
+
+            commands = []
+            for (container, veth, address), state in zip(ends, states):
+                interface = state['interfaces'][veth]
+                for extra in sorted(interface['addresses'] - {address}):
+                    commands.append((container, f"addr del {extra} dev {veth}"))
+                if address not in interface['addresses']:
+                    commands.append((container, f"addr add {address} dev {veth}"))
+                if not interface['up']:
+                    commands.append((container, f"link set {veth} up"))
+            if commands:
+                plan['fix'].append((node1, node2, commands))
+
+            # 只在第一端（设置延迟的一端）检查netem延迟
+            container, veth, _ = ends[0]
+            actual = states[0]['netem'].get(veth)
+            wanted = manager.netem_delay_ms(matrix[node1, node2])
+            if actual is None or abs(actual - wanted) > DELAY_TOLERANCE_MS:
+                plan['delay'].append((node1, node2))
+            elif not commands:
+                plan['ok'].append((node1, node2))
+
+        # 本管理器负责、但目标拓扑中不存在的接口；环形链路和eth*接口不匹配命名规则，不会被处理
+        for container, state in snapshot.items():
+            if state is None:
+                continue
+            for ifname in state['interfaces']:
+                if manager.managed_veth_pattern.match(ifname) and (container, ifname) not in expected:
+                    plan['stray'].append((container, ifname))
+        return plan
+
+    def reconcile(self, matrix):
+        """
+        将容器内的实际拓扑收敛到目标矩阵
+
+        返回:
+        - 修正后仍失败的链路列表
+        """
+        with get_default_metrics().timer('reconcile'):
+            return self._reconcile(matrix)
+
+    def _reconcile(self, matrix):
+        manager = self.manager
+        snapshot = self.snapshot(manager.managed_containers(matrix))
+        plan = self.plan(matrix, snapshot)
+        logger.info(f"状态校正: 正常 {len(plan['ok'])} 条，缺失 {len(plan['create'])} 条，残缺 {len(plan['rebuild'])} 条，"
+                    f"地址/状态不一致 {len(plan['fix'])} 条，延迟不一致 {len(plan['delay'])} 条，"
+                    f"多余接口 {len(plan['stray'])} 个，容器不可用 {len(plan['unreachable'])} 条")
+
+        failed = set(plan['unreachable'])
+
+        # 第一阶段：删除多余接口和残缺链路（veth创建在宿主机批处理中先于命名空间批处理执行，必须分两次提交）
+        executor = LinkBatchExecutor(backend=self.backend)
+        for container, ifname in plan['stray']:
+            executor.ip(('stray', container, ifname), container, f"link delete {ifname}", tolerant=True)
+        for node1, node2 in plan['rebuild']:
+            manager.plan_delete_link(executor, node1, node2)
+        if len(executor):
+            executor.commit()
+
+        # 第二阶段：创建缺失链路，修正地址、接口状态和延迟
+        executor = LinkBatchExecutor(backend=self.backend)
+        for node1, node2 in plan['create'] + plan['rebuild']:
+            manager.plan_create_link(executor, node1, node2, matrix[node1, node2])
+        for node1, node2, commands in plan['fix']:
+            for container, command in commands:
+                executor.ip((node1, node2), container, command)
+        for node1, node2 in plan['delay']:
+            # 整形层次可能缺失或被替换，重新安装而不是原地change
+            manager.plan_modify_link(executor, node1, node2, matrix[node1, node2], install=True)
+        if len(executor):
+            results = executor.commit()
+            failed |= {key for key, success in results.items() if not success}
+
+        # 按校正结果重建管理器的内存状态
+        links = set()
+        for node1, node2 in active_links(matrix, manager.symmetric_matrix):
+            if (node1, node2) not in failed:
+                ip1, ip2 = manager.generate_ip_addresses(node1, node2)
+                links.add((node1, node2, f"{ip1}-{ip2}"))
+        with manager._links_lock:
+            manager.current_links = links
+        manager.current_matrix = matrix
+        manager.staged_links, manager.retired_links = {}, {}
+        manager.delay_filter.reset(matrix, [(node1, node2) for node1, node2, _ in links])
+        manager.ip_allocator.save()
+
+        if failed:
+            logger.warning(f"状态校正后仍有 {len(failed)} 条链路不一致")
+        else:
+            logger.info("状态校正完成，实际拓扑与目标一致")
+        return sorted(failed)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='根据容器内实际状态将链路拓扑校正到指定时间片')
+    parser.add_argument('kind', choices=['xw', 'tsn'], help='链路类型: xw为星间链路，tsn为TSN与低轨卫星间链路')
+    parser.add_argument('csv_file', help='目标时间片的CSV文件')
+    args = parser.parse_args()
+
+    if args.kind == 'xw':
+        from dynamic_frr_xw import NetworkTopologyManager
+    else:
+        from dynamic_frr_tsn_scan_multi_thread import NetworkTopologyManager
+    manager = NetworkTopologyManager()
+    matrix = manager.read_matrix_from_csv(args.csv_file)
+    if matrix is None:
+        return
+    TopologyReconciler(manager).reconcile(matrix)
+
+
+if __name__ == "__main__":
+    main()
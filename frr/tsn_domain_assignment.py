@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import os
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from timeline_store import list_slice_files
+
+logger = logging.getLogger(__name__)
+
+
+def best_domains(stack):
+    """
+    每个时间片每个YG/XW节点延迟最小的TSN（csv_modify_tsn.py的逐片分域规则）
+
+    每个节点只归属一个TSN：多个TSN延迟同为最小时取行号最小者，
+    而csv_modify_tsn.py的process_matrix会保留全部并列的TSN
+
+    参数:
+    - stack: (T, N_tsn, N_dg) 延迟矩阵，<=0 表示不可见
+
+    返回:
+    - (T, N_dg) TSN行号，不可见任何TSN时为-1
+    """
+    masked = np.where(stack > 0, stack, np.inf)
+    best = masked.argmin(axis=1)
+    return np.where(np.isfinite(masked.min(axis=1)), best, -1)
+
+
+def _rebalance(delays, choice, previous, capacity):
+    """
+    单个时间片内的负载均衡：超过capacity的TSN依次移出代价最小的节点（移到下一个可见且未满的TSN）
+
+    新接入的节点优先移出，已在该域的节点尽量保持不动
+    """
+    n_tsn = delays.shape[0]
+    load = np.bincount(choice[choice >= 0], minlength=n_tsn)
+    for tsn in np.argsort(-load):
+        while load[tsn] > capacity:
+            members = np.flatnonzero(choice == tsn)
+            # 其他未满的TSN中延迟最小者作为备选
+            alternative = np.where((delays[:, members] > 0) & (load[:, None] < capacity), delays[:, members], np.inf)
+            alternative[tsn] = np.inf
+            target = alternative.argmin(axis=0)
+            cost = alternative[target, np.arange(len(members))] - delays[tsn, members]
+            cost = np.where(previous[members] == tsn, cost + 1e6, cost)   # 已在该域的节点最后才移出
+            if not np.isfinite(cost).any():
+                break
+            k = int(np.argmin(cost))
+            choice[members[k]] = target[k]
+            load[tsn] -= 1
+            load[target[k]] += 1
+    return choice
+
+
+def assign_domains(stack, margin_ms=0.0, rel_margin=0.0, capacity=None):
+    """
+    按整个时间线计算稳定的TSN分域
+
+    当前TSN仍可见、且延迟不超过最优TSN延迟 + max(margin_ms, rel_margin × 最优延迟) 时保持不切换，
+    避免延迟相近时节点在TSN之间来回切换（每次切换需删建两条链路并重写分域表）。
+    每个时间片内对所有节点向量化计算，时间片之间依次递推。
+
+    参数:
+    - stack: (T, N_tsn, N_dg) 延迟矩阵，<=0 表示不可见
+    - margin_ms: 切换的绝对迟滞（毫秒），为0且rel_margin为0时退化为逐片取最小延迟
+    - rel_margin: 切换的相对迟滞（如0.1表示10%）
+    - capacity: 每个TSN最多接入的节点数，为None时不做负载均衡；
+                可见的TSN都已满时超出的节点仍留在原TSN，结果中的接入数可能超过capacity
+
+    返回:
+    - (T, N_dg) TSN行号，不可见任何TSN时为-1
+    """
+    if capacity is not None and capacity < 1:
+        raise ValueError(f"capacity 至少为1: {capacity}")
+    stack = np.asarray(stack, dtype=float)
+    best = best_domains(stack)
+    if margin_ms <= 0 and rel_margin <= 0 and capacity is None:
+        return best
+
+    n_slices, _, n_dg = stack.shape
+    columns = np.arange(n_dg)
+    assignment = np.empty_like(best)
+    previous = np.full(n_dg, -1)
+    for t in range(n_slices):
+        delays = stack[t]
+        choice = best[t].copy()
+        has_best = choice >= 0
+        # 不可见任何TSN的节点不参与比较（keep要求has_best），取0避免 0 × inf 的无效运算
+        best_delay = np.where(has_best, delays[np.maximum(choice, 0), columns], 0.0)
+        current_delay = np.where(previous >= 0, delays[np.maximum(previous, 0), columns], -1.0)
+        keep = (previous >= 0) & (current_delay > 0) & has_best & \
+            (current_delay <= best_delay + np.maximum(margin_ms, rel_margin * best_delay))
+        choice[keep] = previous[keep]
+        if capacity is not None:
+            choice = _rebalance(delays, choice, previous, capacity)
+        assignment[t] = choice
+        previous = choice
+    return assignment
+
+
+def apply_domains(stack, assignment):
+    """按分域结果生成分域表矩阵：每列只保留所属TSN的延迟，其余为-1"""
+    stack = np.asarray(stack, dtype=float)
+    rows = np.arange(stack.shape[1])[None, :, None]
+    return np.where(rows == assignment[:, None, :], stack, -1.0)
+
+
+def count_handovers(assignment):
+    """统计相邻时间片之间切换TSN的节点数（不含从不可见到接入、从接入到不可见）"""
+    before, after = assignment[:-1], assignment[1:]
+    return int(((before >= 0) & (after >= 0) & (before != after)).sum())
+
+
+def read_slice(csv_file):
+    return pd.read_csv(csv_file, header=None, sep=',', dtype=float).values
+
+
+def write_slice(csv_file, matrix):
+    """原子写入一个分域表CSV（先写临时文件再替换），运行中的链路管理脚本不会读到写了一半的文件"""
+    csv_file = Path(csv_file)
+    tmp_file = csv_file.with_name(csv_file.name + '.tmp')
+    np.savetxt(tmp_file, matrix, delimiter=',', fmt='%.15g')
+    os.replace(tmp_file, csv_file)
+
+
+def process_directory(input_dir, output_dir, margin_ms=0.0, rel_margin=0.0, capacity=None):
+    """
+    读取整个TSN可见性目录，计算稳定分域并写出全部分域表
+
+    写出后删除输出目录中不属于本次输入的其余时间片，避免链路管理脚本回放一半新、一半原有的分域表
+
+    返回:
+    - (处理的时间片数, 切换次数, 逐片取最小延迟时的切换次数)
+    """
+    slices = list_slice_files(input_dir)
+    if not slices:
+        raise ValueError(f"目录 {input_dir} 中没有找到带编号的CSV文件")
+    stack = np.stack([read_slice(csv_file) for _, csv_file in slices])
+    n_tsn, n_dg = stack.shape[1:]
+    if capacity is not None and capacity * n_tsn < n_dg:
+        logger.warning(f"TSN总容量 {capacity} × {n_tsn} 小于节点数 {n_dg}，无法满足每个TSN的接入上限")
+
+    assignment = assign_domains(stack, margin_ms, rel_margin, capacity)
+    output = apply_domains(stack, assignment)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    for (_, csv_file), matrix in zip(slices, output):
+        write_slice(Path(output_dir) / csv_file.name, matrix)
+    names = {csv_file.name for _, csv_file in slices}
+    stale = [csv_file for _, csv_file in list_slice_files(output_dir) if csv_file.name not in names]
+    for csv_file in stale:
+        csv_file.unlink()
+    if stale:
+        logger.info(f"已删除 {output_dir} 中不属于本次输入的 {len(stale)} 个时间片")
+
+    handovers = count_handovers(assignment)
+    baseline = count_handovers(best_domains(stack))
+    logger.info(f"已生成 {len(slices)} 个时间片的分域表到 {output_dir}: TSN切换 {handovers} 次"
+                f"（逐片取最小延迟为 {baseline} 次）")
+    if capacity is not None:
+        load = np.array([np.bincount(row[row >= 0], minlength=n_tsn) for row in assignment])
+        logger.info(f"每个TSN的最大接入节点数: {load.max()}（上限 {capacity}）")
+        over = int((load > capacity).any(axis=1).sum())
+        if over:
+            logger.warning(f"{over} 个时间片中可见的TSN容量不足，超出的节点仍保留在原分域，"
+                           f"最大接入节点数 {load.max()} 超过上限 {capacity}")
+    return len(slices), handovers, baseline
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='带切换迟滞的TSN分域：处理整个时间线，减少节点在TSN之间来回切换')
+    parser.add_argument('--input', default='csv_tsn', help='TSN可见性CSV目录，默认csv_tsn')
+    parser.add_argument('--output', default='csv_tsn_modify', help='分域表输出目录，默认csv_tsn_modify')
+    parser.add_argument('--margin', type=float, default=2.0,
+                        help='切换的绝对迟滞（毫秒），当前TSN延迟不超过最优TSN+该值时不切换，默认2')
+    parser.add_argument('--rel-margin', type=float, default=0.0, help='切换的相对迟滞（如0.05表示5%%），默认0')
+    parser.add_argument('--capacity', type=int, help='每个TSN最多接入的YG/XW节点数，默认不限制')
+    args = parser.parse_args()
+    if args.capacity is not None and args.capacity < 1:
+        parser.error(f"--capacity 至少为1: {args.capacity}")
+
+    process_directory(args.input, args.output, args.margin, args.rel_margin, args.capacity)
+
+
+if __name__ == "__main__":
+    main()
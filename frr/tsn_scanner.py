@@ -10,6 +10,7 @@ import pandas as pd
 import argparse
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
+from topology_events import TopologySubscriber, EVENT_SOCKETS
 
 # 配置日志
 logging.basicConfig(
@@ -104,6 +105,31 @@ class TSNScanner:
         logger.info("所有TSN节点扫描完成")
         return True
 
+    def follow_events(self, socket_path, wait=60.0):
+        """
+        订阅TSN链路管理脚本发布的拓扑变化事件，每个已提交的时间片扫描一次
+
+        扫描耗时超过时间片间隔时，跳过积压的中间时间片，直接扫描最新的时间片；
+        连接关闭（链路管理脚本退出）时返回
+
+        参数:
+        - socket_path: dynamic_frr_tsn_scan_multi_thread.py --event-socket 的套接字路径
+        - wait: 链路管理脚本尚未启动时最多等待的秒数
+        """
+        subscriber = TopologySubscriber(socket_path).connect(wait)
+        logger.info(f"已订阅拓扑变化事件: {socket_path}")
+        try:
+            for event in subscriber.events(coalesce=True):
+                if event['skipped']:
+                    logger.warning(f"扫描落后，跳过 {event['skipped']} 个时间片")
+                self.current_matrix = subscriber.matrix()
+                logger.info(f"时间片 {event['slice']}（事件序号 {event['seq']}）开始扫描")
+                scan_start_time = time.time()
+                self.scan_connected_nodes()
+                logger.info(f"时间片 {event['slice']} 扫描完成 (耗时: {time.time() - scan_start_time:.2f}秒)")
+        finally:
+            subscriber.close()
+
     def _scan_single_tsn_node(self, tsn_idx):
         """扫描单个TSN节点连接的所有低轨卫星节点"""
 
@@ -261,7 +287,11 @@ if {{$errMsg ne ""}} {{
 
 def main():
     parser = argparse.ArgumentParser(description='TSN节点扫描工具')
-    parser.add_argument('--csv_file', required=True, help='网络拓扑矩阵CSV文件路径')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv_file', help='网络拓扑矩阵CSV文件路径')
+    source.add_argument('--events', nargs='?', const=EVENT_SOCKETS['tsn'],
+                        help=f"订阅TSN链路管理脚本的拓扑变化事件，每个已提交的时间片扫描一次，"
+                             f"不指定路径时为{EVENT_SOCKETS['tsn']}")
     parser.add_argument('--container-tsn-prefix', default='clab-sat-network-TSN', 
                         help='TSN容器名称前缀，默认为clab-sat-network-TSN')
     parser.add_argument('--container-yg-prefix', default='clab-sat-network-YG', 
@@ -270,12 +300,15 @@ def main():
                         help='XW容器名称前缀，默认为clab-sat-network-XW')
     args = parser.parse_args()
     
-    logger.info(f"启动TSN扫描，使用网络拓扑文件: {args.csv_file}")
-
     scanner = TSNScanner(base_tsn_container_name=args.container_tsn_prefix,
                          base_yg_container_name=args.container_yg_prefix,
                          base_xw_container_name=args.container_xw_prefix,
                          csv_file=args.csv_file)
+    if args.events:
+        scanner.follow_events(args.events)
+        return
+
+    logger.info(f"启动TSN扫描，使用网络拓扑文件: {args.csv_file}")
     
     scan_start_time = time.time()
     success = scanner.scan_connected_nodes()
@@ -11,17 +11,25 @@ YAML文件预处理脚本
 import yaml
 import random
 import os
+import sys
 import csv
 import json
+import argparse
 from typing import List, Dict, Any, Tuple
 
 COMPLETE_TASK_PATH = "./temp/complete_task.json"  # 完整任务文件路径
 # COMPLETE_TASK_PATH = "/root/ftp/double_ts/complete_task.json"
 TSN_CSV_PATH = "./frr/csv_tsn_modify/output_1.csv"  # TSN连接CSV文件路径
 XW_CSV_PATH = "./frr/csv_xw/output_1.csv"  # XW连接CSV文件路径
+FRR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "frr")  # topology_events所在目录
 
 class YAMLPreModifier:
-    def __init__(self):
+    def __init__(self, tsn_events: str = None, xw_events: str = None):
+        """
+        Args:
+            tsn_events: TSN链路管理脚本的拓扑事件套接字，指定后从当前已提交的时间片读取TSN连接，代替TSN_CSV_PATH
+            xw_events: XW链路管理脚本的拓扑事件套接字，指定后代替XW_CSV_PATH
+        """
         # 链路类型和带宽配置（使用BW值，按波段分类通信类型）
         self.link_configs = {
             # 激光链路
@@ -86,9 +94,35 @@ class YAMLPreModifier:
             4: "Tbps"
         }
         
-        # 载入CSV数据
-        self.tsn_connections = self.load_csv_matrix(TSN_CSV_PATH)
-        self.xw_connections = self.load_csv_matrix(XW_CSV_PATH)
+        # 载入连接数据：优先从链路管理脚本发布的当前时间片读取，否则读取CSV
+        self.tsn_connections = self.load_event_matrix(tsn_events) if tsn_events else self.load_csv_matrix(TSN_CSV_PATH)
+        self.xw_connections = self.load_event_matrix(xw_events) if xw_events else self.load_csv_matrix(XW_CSV_PATH)
+
+    def load_event_matrix(self, socket_path: str) -> List[List[float]]:
+        """
+        从链路管理脚本的拓扑事件套接字读取当前已提交时间片的连接矩阵
+        
+        Args:
+            socket_path: 拓扑事件套接字路径（dynamic_frr_*.py --event-socket）
+            
+        Returns:
+            二维列表表示的矩阵，读取失败时为空列表
+        """
+        if FRR_DIR not in sys.path:
+            sys.path.insert(0, FRR_DIR)
+        try:
+            from topology_events import fetch_topology
+            topology = fetch_topology(socket_path)
+            if topology.slice is None:
+                print(f"链路管理脚本尚未提交任何时间片: {socket_path}")
+                return []
+            matrix = topology.matrix().tolist()
+            print(f"成功载入当前时间片 {topology.slice} 的连接（事件序号 {topology.seq}）: {socket_path}, "
+                  f"大小: {len(matrix)}x{len(matrix[0]) if matrix else 0}")
+        except Exception as e:
+            print(f"从拓扑事件套接字 {socket_path} 载入连接失败: {str(e)}")
+            matrix = []
+        return matrix
 
     def load_csv_matrix(self, csv_path: str) -> List[List[float]]:
         """
@@ -545,7 +579,14 @@ class YAMLPreModifier:
 
 def main():
     """主函数"""
-    modifier = YAMLPreModifier()
+    parser = argparse.ArgumentParser(description='YAML文件预处理: 添加linkList、更新GPU使用情况和sensors字段')
+    parser.add_argument('--tsn-events', help='TSN链路管理脚本的拓扑事件套接字（如 ./frr/topology_events_tsn.sock），'
+                                             f'指定后使用当前已提交的时间片代替 {TSN_CSV_PATH}')
+    parser.add_argument('--xw-events', help='XW链路管理脚本的拓扑事件套接字（如 ./frr/topology_events_xw.sock），'
+                                            f'指定后使用当前已提交的时间片代替 {XW_CSV_PATH}')
+    args = parser.parse_args()
+
+    modifier = YAMLPreModifier(tsn_events=args.tsn_events, xw_events=args.xw_events)
     
     # 处理所有指定目录中的YAML文件
     modifier.process_all_directories()
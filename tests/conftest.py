@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# frr/ 下的模块按脚本方式以裸模块名互相导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "frr"))
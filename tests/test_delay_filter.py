@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from delay_filter import DelayChangeFilter
+
+
+def matrix(value):
+    """只有链路(0, 1)的2×2矩阵"""
+    return np.array([[-1.0, value], [-1.0, -1.0]])
+
+
+def step(flt, value):
+    """把链路(0, 1)的延迟变为value，返回本时间片是否下发"""
+    return flt.select([], [], [(0, 1)], matrix(value)) == [(0, 1)]
+
+
+def test_default_filter_issues_every_real_change():
+    flt = DelayChangeFilter()
+    flt.reset(matrix(10.0), [(0, 1)])
+    assert step(flt, 10.5)
+    assert not step(flt, 10.5)
+
+
+def test_absolute_and_relative_thresholds():
+    flt = DelayChangeFilter(abs_threshold=1.0, rel_threshold=0.2)
+    flt.reset(matrix(10.0), [(0, 1)])
+    assert not step(flt, 11.5)      # 1.5 < max(1.0, 0.2 × 10)
+    assert step(flt, 12.5)          # 2.5 > 2.0
+    assert flt.applied[(0, 1)] == 12.5
+
+
+def test_small_changes_accumulate_against_applied_delay():
+    flt = DelayChangeFilter(abs_threshold=1.0)
+    flt.reset(matrix(10.0), [(0, 1)])
+    assert not step(flt, 10.6)
+    assert not step(flt, 10.9)
+    # 与已下发的10.0比较而不是上一个时间片的10.9
+    assert step(flt, 11.2)
+
+
+def test_pending_link_is_rechecked_without_matrix_change():
+    flt = DelayChangeFilter(abs_threshold=1.0, max_staleness=2)
+    flt.reset(matrix(10.0), [(0, 1)])
+    assert not step(flt, 10.5)
+    # 之后的时间片矩阵值没有变化（不在to_modify中），暂缓超过max_staleness后仍会下发
+    assert flt.select([], [], [], matrix(10.5)) == []
+    assert flt.select([], [], [], matrix(10.5)) == [(0, 1)]
+    assert flt.pending == {}
+
+
+def test_drift_back_to_applied_value_stops_tracking():
+    flt = DelayChangeFilter(abs_threshold=1.0)
+    flt.reset(matrix(10.0), [(0, 1)])
+    assert not step(flt, 10.5)
+    assert (0, 1) in flt.pending
+    assert not step(flt, 10.0)
+    assert flt.pending == {}
+
+
+def test_failed_modification_is_reissued():
+    flt = DelayChangeFilter(abs_threshold=5.0)
+    flt.reset(matrix(10.0), [(0, 1)])
+    flt.mark_failed([(0, 1)])
+    assert step(flt, 10.1)
+
+
+def test_added_and_removed_links():
+    flt = DelayChangeFilter(abs_threshold=5.0)
+    flt.select([(0, 1)], [], [], matrix(10.0))
+    assert flt.applied == {(0, 1): 10.0}
+    flt.select([], [(0, 1)], [], matrix(-1.0))
+    assert flt.applied == {} and flt.pending == {}
+
+
+def test_convert_compares_in_netem_units():
+    # XW矩阵为距离，换算为毫秒后变化不足1ms时不下发
+    flt = DelayChangeFilter(convert=lambda value: value // 300)
+    flt.reset(matrix(3000.0), [(0, 1)])
+    assert not step(flt, 3299.0)
+    assert step(flt, 3300.0)
+
+
+def test_interpolated_delays_are_rechecked_at_next_slice():
+    flt = DelayChangeFilter(abs_threshold=1.0)
+    flt.reset(matrix(10.0), [(0, 1)])
+    flt.record_interpolated({(0, 1): 11.5})
+    # 插值下发的值与下一时间片的矩阵值不同，即使矩阵值与上一时间片相同也要重新下发
+    assert flt.select([], [], [], matrix(10.0)) == [(0, 1)]
+
+
+def test_negative_thresholds_are_rejected():
+    with pytest.raises(ValueError):
+        DelayChangeFilter(abs_threshold=-1)
+    with pytest.raises(ValueError):
+        DelayChangeFilter(max_staleness=-1)
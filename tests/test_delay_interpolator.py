@@ -0,0 +1,115 @@
+import threading
+import time
+import numpy as np
+import pytest
+from delay_filter import DelayChangeFilter
+from delay_interpolator import DelayInterpolator, interpolate, link_values
+
+
+def test_linear_interpolation():
+    np.testing.assert_allclose(interpolate([10, 0], [20, 4], 0.25), [12.5, 1.0])
+
+
+def test_spline_hits_endpoints_and_reduces_to_linear_on_uniform_motion():
+    start, end = np.array([10.0]), np.array([20.0])
+    for fraction in (0.0, 1.0):
+        np.testing.assert_allclose(interpolate(start, end, fraction, [0.0], [30.0], 'spline'),
+                                   interpolate(start, end, fraction))
+    np.testing.assert_allclose(interpolate(start, end, 0.3, [0.0], [30.0], 'spline'), [13.0])
+
+
+def test_spline_eases_into_a_turning_point():
+    # 前一时间片与当前相同、下下时间片与下一时间片相同：两端切线较缓，前段低于线性插值
+    value = interpolate([10.0], [20.0], 0.25, [10.0], [20.0], 'spline')[0]
+    assert 10.0 < value < 12.5
+
+
+def test_spline_without_neighbours_falls_back_to_linear():
+    np.testing.assert_allclose(interpolate([10.0], [20.0], 0.4, [np.nan], None, 'spline'), [14.0])
+
+
+def test_spline_never_goes_negative():
+    assert interpolate([0.5], [0.0], 0.5, [10.0], [10.0], 'spline')[0] >= 0.0
+
+
+def test_link_values_marks_invisible_links():
+    matrix = np.array([[-1.0, 3.0], [2.0, -1.0]])
+    np.testing.assert_array_equal(link_values(matrix, [(0, 1), (0, 0)]), [3.0, np.nan])
+    assert np.isnan(link_values(None, [(0, 1)])).all()
+
+
+def first_step(applied, tc_rate, current, upcoming, fraction=0.5):
+    """
+    运行插值直到第一次下发，返回下发的 {(node1, node2): 延迟}
+
+    参数:
+    - applied: 延迟过滤器中已下发的延迟
+    """
+    flt = DelayChangeFilter()
+    flt.applied = dict(applied)
+    calls = []
+    first = threading.Event()
+
+    def apply_func(delays):
+        calls.append(delays)
+        first.set()
+        return []
+
+    interpolator = DelayInterpolator(apply_func, flt, step=1.0, tc_rate=tc_rate)
+    duration = 1000.0
+    interpolator.start(current, upcoming, time.monotonic() - fraction * duration, duration)
+    assert first.wait(5)
+    interpolator.stop()
+    return calls[0], flt
+
+
+CURRENT = np.array([[10.0, 10.0, 10.0, 10.0]])
+UPCOMING = np.array([[20.0, 30.0, 40.0, 50.0]])
+LINKS = [(0, 0), (0, 1), (0, 2), (0, 3)]
+
+
+def test_budget_picks_largest_deviations_first():
+    delays, flt = first_step({link: 10.0 for link in LINKS}, tc_rate=2, current=CURRENT, upcoming=UPCOMING)
+    # 每步预算为 tc_rate × step = 2 条，偏差最大的两条链路先下发
+    assert sorted(delays) == [(0, 2), (0, 3)]
+    assert delays[(0, 3)] == pytest.approx(30.0, abs=0.1)
+    assert flt.applied[(0, 3)] == pytest.approx(30.0, abs=0.1)
+    assert (0, 3) in flt.pending    # 插值值留待下一时间片边界重新比较
+
+
+def test_unknown_applied_delay_goes_first():
+    applied = {link: 10.0 for link in LINKS}
+    del applied[(0, 0)]
+    delays, _ = first_step(applied, tc_rate=1, current=CURRENT, upcoming=UPCOMING)
+    assert list(delays) == [(0, 0)]
+
+
+def test_failed_updates_are_marked_unknown():
+    flt = DelayChangeFilter()
+    flt.applied = {link: 10.0 for link in LINKS}
+    done = threading.Event()
+
+    def apply_func(delays):
+        done.set()
+        return list(delays)
+
+    interpolator = DelayInterpolator(apply_func, flt, step=1.0, tc_rate=1)
+    interpolator.start(CURRENT, UPCOMING, time.monotonic() - 500.0, 1000.0)
+    assert done.wait(5)
+    interpolator.stop()
+    assert (0, 3) not in flt.applied
+
+
+def test_only_modified_links_are_interpolated():
+    calls = []
+    interpolator = DelayInterpolator(calls.append, DelayChangeFilter())
+    # 只有新建和删除的链路，没有需要插值的链路，不启动后台线程
+    interpolator.start(np.array([[-1.0, 5.0]]), np.array([[5.0, -1.0]]), time.monotonic(), 10.0)
+    assert interpolator._thread is None
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        DelayInterpolator(None, DelayChangeFilter(), mode='cubic')
+    with pytest.raises(ValueError):
+        DelayInterpolator(None, DelayChangeFilter(), tc_rate=0)
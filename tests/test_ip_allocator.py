@@ -0,0 +1,107 @@
+import ipaddress
+import pytest
+from ip_allocator import (PairSubnetAllocator, RESERVED_NETWORKS, TSN_LINK_POOLS, XW_LINK_POOLS,
+                          pair_index)
+
+# TSN×DG链路与XW星间链路的测试规模（均不超过默认地址池容量）
+TSN_ROWS, DG_COLS = 40, 60
+XW_NODES = 80
+
+
+def reserved_networks():
+    return [net for start, end in RESERVED_NETWORKS
+            for net in ipaddress.summarize_address_range(ipaddress.ip_address(start), ipaddress.ip_address(end))]
+
+
+def tsn_subnets(allocator):
+    return [allocator.subnet(i, j) for i in range(TSN_ROWS) for j in range(DG_COLS)]
+
+
+def xw_subnets(allocator):
+    return [allocator.subnet(i, j) for j in range(XW_NODES) for i in range(j)]
+
+
+def test_full_pair_index_is_unique_and_dense():
+    k = 50
+    indices = {pair_index(i, j) for i in range(k) for j in range(k)}
+    assert indices == set(range(k * k))
+
+
+def test_symmetric_pair_index_is_unique_and_dense():
+    k = 50
+    indices = [pair_index(i, j, symmetric=True) for j in range(k) for i in range(j)]
+    assert sorted(indices) == list(range(k * (k - 1) // 2))
+    assert all(pair_index(i, j, True) == pair_index(j, i, True) for j in range(k) for i in range(j))
+
+
+def test_pair_index_rejects_invalid_pairs():
+    with pytest.raises(ValueError):
+        pair_index(-1, 2)
+    with pytest.raises(ValueError):
+        pair_index(3, 3, symmetric=True)
+
+
+def test_product_collisions_are_gone():
+    # 旧方案按 node1*node2 取子网，(2, 6) 与 (3, 4) 会得到同一个 /30
+    allocator = PairSubnetAllocator(TSN_LINK_POOLS)
+    assert allocator.subnet(2, 6) != allocator.subnet(3, 4)
+
+
+def test_tsn_and_xw_pools_never_overlap_or_hit_reserved_ranges():
+    tsn = tsn_subnets(PairSubnetAllocator(TSN_LINK_POOLS))
+    xw = xw_subnets(PairSubnetAllocator(XW_LINK_POOLS, symmetric=True))
+    assert len(set(tsn)) == len(tsn)
+    assert len(set(xw)) == len(xw)
+    assert not set(tsn) & set(xw)
+
+    tsn_pools = [ipaddress.ip_network(p) for p in TSN_LINK_POOLS]
+    xw_pools = [ipaddress.ip_network(p) for p in XW_LINK_POOLS]
+    reserved = reserved_networks()
+    for subnet in tsn:
+        assert any(subnet.subnet_of(pool) for pool in tsn_pools)
+    for subnet in xw:
+        assert any(subnet.subnet_of(pool) for pool in xw_pools)
+    for subnet in tsn + xw:
+        assert not any(subnet.overlaps(net) for net in reserved), subnet
+
+
+def test_symmetric_addresses_swap_with_endpoints():
+    allocator = PairSubnetAllocator(XW_LINK_POOLS, symmetric=True)
+    ip1, ip2 = allocator.addresses(3, 9)
+    assert allocator.addresses(9, 3) == (ip2, ip1)
+    assert ip1 != ip2
+
+
+def test_pools_larger_than_slash16_and_exhaustion():
+    allocator = PairSubnetAllocator(["10.0.0.0/15"], reserved=())
+    assert allocator.capacity == 2 ** 17 // 4
+    # 150×150个节点对的编号超过 /16 能容纳的 16384 个 /30
+    subnets = {allocator.subnet(i, j) for i in range(150) for j in range(150)}
+    assert len(subnets) == 150 * 150
+    assert max(int(net.network_address) for net in subnets) > int(ipaddress.ip_address("10.0.255.255"))
+
+    small = PairSubnetAllocator(["10.1.0.0/29"], reserved=())
+    assert small.capacity == 2
+    assert small.subnet(0, 0) != small.subnet(0, 1)
+    with pytest.raises(ValueError):
+        small.subnet(1, 0)
+
+
+def test_overlapping_pools_are_rejected():
+    with pytest.raises(ValueError):
+        PairSubnetAllocator(["10.0.0.0/18", "10.0.32.0/20"])
+
+
+def test_assignments_persist_across_instances(tmp_path):
+    state_file = tmp_path / "ip_state.json"
+    allocator = PairSubnetAllocator(TSN_LINK_POOLS, state_file=str(state_file))
+    expected = {(i, j): allocator.addresses(i, j) for i in range(4) for j in range(6)}
+    allocator.save()
+
+    reloaded = PairSubnetAllocator(TSN_LINK_POOLS, state_file=str(state_file))
+    assert len(reloaded.assignments) == len(expected)
+    assert all(reloaded.addresses(i, j) == ips for (i, j), ips in expected.items())
+
+    # 地址池配置变化后旧分配作废
+    changed = PairSubnetAllocator(XW_LINK_POOLS, state_file=str(state_file))
+    assert changed.assignments == {}
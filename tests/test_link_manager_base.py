@@ -0,0 +1,61 @@
+import argparse
+import numpy as np
+from ip_allocator import TSN_LINK_POOLS
+from topology_diff import diff_matrices
+from link_manager_base import LinkManagerBase, add_link_manager_arguments, link_manager_options
+
+
+class RecordingManager(LinkManagerBase):
+    """只记录被应用的时间片和时间片后处理的最小链路管理器"""
+    symmetric_matrix = False
+    default_ip_pools = TSN_LINK_POOLS
+
+    def __init__(self, **options):
+        super().__init__('unused', **options)
+        self.applied = []
+        self.finished = []
+
+    def find_differences(self, old_matrix, new_matrix):
+        return diff_matrices(old_matrix, new_matrix)
+
+    def apply_matrix(self, new_matrix, slice_name=None, differences=None):
+        self.applied.append((slice_name, new_matrix[0, 0]))
+        self.current_matrix = new_matrix
+        return True
+
+    def after_slice(self, name):
+        self.finished.append(name)
+
+
+def write_slices(directory, numbers):
+    directory.mkdir()
+    for number in numbers:
+        np.savetxt(directory / f"output_{number}.csv", np.full((2, 3), float(number)), delimiter=',')
+
+
+def test_csv_directory_is_applied_in_slice_order(tmp_path):
+    write_slices(tmp_path / "csv", [10, 2, 1])
+    (tmp_path / "csv" / "notes.csv").write_text("1,2\n")
+    manager = RecordingManager()
+    manager.process_csv_directory(tmp_path / "csv", interval=0)
+    # 没有编号的文件被跳过，每个已应用的时间片之后调用一次after_slice
+    assert manager.applied == [("output_1.csv", 1.0), ("output_2.csv", 2.0), ("output_10.csv", 10.0)]
+    assert manager.finished == ["output_1.csv", "output_2.csv", "output_10.csv"]
+
+
+def test_prefetched_slices_are_applied_once(tmp_path):
+    write_slices(tmp_path / "csv", [1, 2, 3])
+    manager = RecordingManager(prefetch=True)
+    manager.process_csv_directory(tmp_path / "csv", interval=0)
+    manager.prefetcher.close()
+    assert [value for _, value in manager.applied] == [1.0, 2.0, 3.0]
+
+
+def test_arguments_map_to_manager_options():
+    parser = argparse.ArgumentParser()
+    add_link_manager_arguments(parser, 'tsn')
+    args = parser.parse_args(['--no-prefetch', '--lookahead', '--rate', '50kbit'])
+    assert (args.ip_state, args.journal) == ('ip_allocation_tsn.json', 'topology_journal_tsn.jsonl')
+    options = link_manager_options(args)
+    assert options['prefetch'] is False and options['lookahead'] is True
+    assert options['link_shape'].rate == '50kbit'
@@ -0,0 +1,54 @@
+import pytest
+from link_teardown import LinkTeardown, TsnLinkEndpoints, TSN_VETH_PATTERN, XW_VETH_PATTERN, peer_name
+
+
+class Endpoints(TsnLinkEndpoints):
+    base_tsn_container_name = "TSN"
+    base_yg_container_name = "YG"
+    base_xw_container_name = "XW"
+
+
+@pytest.mark.parametrize('ifname', ["tsn1-yg3", "yg3-tsn1", "tsn12-xw40", "xw40-tsn12"])
+def test_tsn_pattern_matches_dynamic_links(ifname):
+    assert TSN_VETH_PATTERN.match(ifname)
+    assert not XW_VETH_PATTERN.match(ifname)
+
+
+@pytest.mark.parametrize('ifname', ["eth0", "lo", "tsn1-tsn2", "yg1-xw2", "tsn1-yg", "xtsn1-yg3"])
+def test_tsn_pattern_skips_static_interfaces(ifname):
+    assert not TSN_VETH_PATTERN.match(ifname)
+
+
+def test_xw_pattern():
+    assert XW_VETH_PATTERN.match("3-17")
+    for ifname in ("eth1", "3-", "-17", "3-17-1", "xw3-17"):
+        assert not XW_VETH_PATTERN.match(ifname)
+
+
+def test_peer_name():
+    assert peer_name("3-17") == "17-3"
+    assert peer_name("tsn1-yg3") == "yg3-tsn1"
+
+
+def test_kind_selects_patterns():
+    assert LinkTeardown('xw', backend=object())._matches("3-17")
+    assert not LinkTeardown('xw', backend=object())._matches("tsn1-yg3")
+    assert LinkTeardown('all', backend=object())._matches("tsn1-yg3")
+    with pytest.raises(ValueError):
+        LinkTeardown('ring', backend=object())
+
+
+def test_link_endpoints_split_yg_and_xw_columns():
+    endpoints = Endpoints()
+    last_yg = TsnLinkEndpoints.YG_COLUMNS - 1
+    assert endpoints.link_endpoints(0, last_yg) == \
+        ("TSN1 <-> YG12", "TSN1", "tsn1-yg12", "YG12", "yg12-tsn1")
+    assert endpoints.link_endpoints(2, last_yg + 1) == \
+        ("TSN3 <-> XW1", "TSN3", "tsn3-xw1", "XW1", "xw1-tsn3")
+
+
+def test_link_endpoints_are_torn_down_by_name():
+    for node2 in (0, 20):
+        _, _, veth_tsn, _, veth_dg = Endpoints().link_endpoints(4, node2)
+        assert TSN_VETH_PATTERN.match(veth_tsn) and TSN_VETH_PATTERN.match(veth_dg)
+        assert peer_name(veth_tsn) == veth_dg
@@ -0,0 +1,84 @@
+import pytest
+from slice_scheduler import SliceScheduler
+
+
+class FakeClock:
+    """可手动推进的单调时钟，sleep直接推进时间"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        assert seconds > 0
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def run(policy, durations, interval=10.0):
+    """按durations（每个时间片的应用耗时）运行调度器，返回 (应用记录 [(名称, 开始时刻)], 预处理的时间片, 报告)"""
+    clock = FakeClock()
+    applied, prepared = [], []
+    slices = [(f"s{k}", durations[k]) for k in range(len(durations))]
+
+    def apply_slice(name, duration):
+        applied.append((name, clock.now))
+        clock.now += duration
+        return True
+
+    scheduler = SliceScheduler(interval, policy, clock=clock, sleep=clock.sleep)
+    reports = scheduler.run(slices, apply_slice, lambda name, _: prepared.append(name))
+    return applied, prepared, reports
+
+
+@pytest.mark.parametrize("policy", ["none", "skip", "coalesce"])
+def test_on_time_slices_follow_absolute_deadlines(policy):
+    applied, prepared, reports = run(policy, [1.0, 3.0, 2.0, 1.0])
+    # 应用耗时不累积成漂移
+    assert applied == [("s0", 0.0), ("s1", 10.0), ("s2", 20.0), ("s3", 30.0)]
+    assert prepared == ["s1", "s2", "s3"]
+    assert all(r['lateness'] == 0 and r['overrun'] == 0 and not r['dropped'] for r in reports)
+
+
+def test_none_applies_every_late_slice_until_caught_up():
+    applied, _, reports = run("none", [25.0, 1.0, 1.0, 1.0, 1.0])
+    assert applied == [("s0", 0.0), ("s1", 25.0), ("s2", 26.0), ("s3", 30.0), ("s4", 40.0)]
+    assert reports[0]['overrun'] == 15.0
+    assert [r['lateness'] for r in reports] == [0.0, 15.0, 6.0, 0.0, 0.0]
+
+
+def test_skip_drops_expired_slices_and_waits_for_next_deadline():
+    applied, prepared, reports = run("skip", [25.0, 1.0, 1.0, 1.0, 1.0])
+    assert applied == [("s0", 0.0), ("s3", 30.0), ("s4", 40.0)]
+    assert reports[1]['dropped'] == ["s1", "s2"]
+    assert reports[1]['lateness'] == 0.0
+    # 预处理的是调度时认为的下一个时间片，跳过后不再预处理被丢弃的时间片
+    assert prepared == ["s1", "s4"]
+
+
+def test_coalesce_applies_latest_due_slice_immediately():
+    applied, _, reports = run("coalesce", [25.0, 1.0, 1.0, 1.0, 1.0])
+    assert applied == [("s0", 0.0), ("s2", 25.0), ("s3", 30.0), ("s4", 40.0)]
+    assert reports[1]['dropped'] == ["s1"]
+    assert reports[1]['lateness'] == 5.0
+
+
+def test_failed_apply_is_reported_and_does_not_stop_the_run():
+    clock = FakeClock()
+
+    def apply_slice(name, _):
+        if name == "s1":
+            raise RuntimeError("boom")
+        return True
+
+    scheduler = SliceScheduler(10.0, clock=clock, sleep=clock.sleep)
+    reports = scheduler.run([("s0", None), ("s1", None), ("s2", None)], apply_slice)
+    assert [r['success'] for r in reports] == [True, False, True]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        SliceScheduler(10.0, "drop")
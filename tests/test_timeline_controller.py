@@ -0,0 +1,104 @@
+import threading
+import pytest
+from slice_scheduler import SliceScheduler
+from timeline_controller import TimelineController, resolve_slice
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class _ScriptedCondition(threading.Condition):
+    """暂停时的无限等待改为回调（在假时钟上经过暂停时长后继续），不阻塞测试线程"""
+
+    def __init__(self, on_block):
+        super().__init__()
+        self.on_block = on_block
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            self.on_block()
+            return True
+        return super().wait(timeout)
+
+
+class ScriptedController(TimelineController):
+    def __init__(self, clock, events, pause_seconds=0.0, **kwargs):
+        """
+        在等待截止时间期间按假时钟在指定时刻执行控制命令
+
+        参数:
+        - events: [(时刻, 命令)]，命令为以控制器为参数的可调用对象
+        - pause_seconds: 暂停持续的时长，之后自动继续
+        """
+        super().__init__(**kwargs)
+        self.clock = clock
+        self.events = sorted(events, key=lambda event: event[0])
+        self.pause_seconds = pause_seconds
+        self._cond = _ScriptedCondition(self._unpause)
+
+    def _unpause(self):
+        self.clock.now += self.pause_seconds
+        self.resume()
+
+    def wait(self, timeout):
+        until = self.clock.now + timeout
+        if self.events and self.events[0][0] <= until:
+            at, command = self.events.pop(0)
+            self.clock.now = max(self.clock.now, at)
+            command(self)
+        else:
+            self.clock.now = until
+        return super().wait(0)
+
+
+def run(events, interval=4.0, pause_seconds=0.0, speed=1.0):
+    """运行a/b/c三个时间片（应用耗时为0），返回 [(名称, 应用时刻)]"""
+    clock = FakeClock()
+    controller = ScriptedController(clock, events, pause_seconds, speed=speed)
+    applied = []
+    scheduler = SliceScheduler(interval, clock=clock, sleep=clock.sleep, controller=controller)
+    scheduler.run([(name, None) for name in "abc"], lambda name, _: applied.append((name, clock.now)) or True)
+    return applied
+
+
+def test_speed_sets_slot_length():
+    assert run([], speed=2.0) == [("a", 0.0), ("b", 2.0), ("c", 4.0)]
+
+
+def test_speed_change_keeps_elapsed_fraction_of_current_slot():
+    # 4秒周期过去1秒（25%）时改为2倍速：剩余75%按2秒周期计算
+    applied = run([(1.0, lambda c: c.set_speed(2.0))])
+    assert applied == [("a", 0.0), ("b", 2.5), ("c", 4.5)]
+
+
+def test_small_speed_change_does_not_apply_next_slice_early():
+    applied = run([(1.0, lambda c: c.set_speed(1.1))])
+    assert applied[1][0] == "b"
+    assert applied[1][1] == pytest.approx(1.0 + 3.0 / 1.1)
+
+
+def test_pause_during_wait_holds_next_slice_until_resume():
+    applied = run([(1.0, lambda c: c.pause())], pause_seconds=10.0)
+    # 暂停在等待期间立即生效；继续后立即应用下一个时间片并以继续时刻为新的时间基准
+    assert applied == [("a", 0.0), ("b", 11.0), ("c", 15.0)]
+
+
+def test_seek_during_wait_applies_target_immediately():
+    applied = run([(1.0, lambda c: c.seek("c"))])
+    assert applied == [("a", 0.0), ("c", 1.0)]
+
+
+def test_resolve_slice_by_name_or_number():
+    names = ["output_1.csv", "output_2.csv", "output_10.csv"]
+    assert resolve_slice(names, "output_2.csv") == 1
+    assert resolve_slice(names, 10) == 2
+    with pytest.raises(ValueError):
+        resolve_slice(names, 3)
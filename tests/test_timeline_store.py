@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sparse_topology import SparseTopology
+from timeline_store import TimelineStore, TimelineWriter, compile_timeline, list_slice_files, write_timeline
+
+MATRICES = [np.array([[-1.0, 3.0, 5.5], [2.0, -1.0, -1.0]]),
+            np.array([[1.0, -1.0, -1.0], [-1.0, -1.0, 4.25]]),
+            np.full((2, 3), -1.0)]
+
+
+def write_csv_dir(directory, numbers):
+    directory.mkdir()
+    for number, matrix in zip(numbers, MATRICES):
+        np.savetxt(directory / f"output_{number}.csv", matrix, delimiter=',', fmt='%g')
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_round_trip_from_generator(tmp_path, sparse):
+    output = tmp_path / "t.timeline"
+    # 矩阵以生成器传入，稠密数组与SparseTopology混合
+    matrices = (SparseTopology.from_dense(m) if k % 2 else m for k, m in enumerate(MATRICES))
+    assert write_timeline(output, [1, 2, 10], ["a", "b", "c"], matrices, sparse=sparse) == 3
+    with TimelineStore(output) as store:
+        assert store.format == ('sparse' if sparse else 'dense')
+        assert store.shape == (2, 3) and len(store) == 3
+        assert store.names == ["a", "b", "c"]
+        for (number, matrix), expected in zip(store, MATRICES):
+            dense = matrix.to_dense() if sparse else matrix
+            np.testing.assert_array_equal(dense, expected)
+        if sparse:
+            assert store.nnz == 5
+    assert not list(tmp_path.glob("t.timeline.*"))
+
+
+def test_lookup_by_number(tmp_path):
+    output = tmp_path / "t.timeline"
+    write_timeline(output, [1, 2, 10], ["a", "b", "c"], MATRICES)
+    with TimelineStore(output) as store:
+        assert 10 in store and 3 not in store
+        assert store.position(10) == 2
+        np.testing.assert_array_equal(store.get(2), MATRICES[1])
+        with pytest.raises(KeyError):
+            store.get(3)
+
+
+def test_compile_csv_directory_in_slice_order(tmp_path):
+    csv_dir = tmp_path / "csv"
+    write_csv_dir(csv_dir, [10, 2, 1])
+    (csv_dir / "notes.csv").write_text("1,2\n")
+    assert [number for number, _ in list_slice_files(csv_dir)] == [1, 2, 10]
+    assert compile_timeline(csv_dir, tmp_path / "t.timeline", sparse=True) == 3
+    with TimelineStore(tmp_path / "t.timeline") as store:
+        assert store.numbers == [1, 2, 10]
+        np.testing.assert_array_equal(store.get(10).to_dense(), MATRICES[0])
+
+
+def test_shape_mismatch_leaves_no_output(tmp_path):
+    output = tmp_path / "t.timeline"
+    with pytest.raises(ValueError):
+        write_timeline(output, [1, 2], ["a", "b"], [MATRICES[0], np.zeros((3, 3))])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_empty_input_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_timeline(tmp_path / "t.timeline", [], [], iter([]))
+    with pytest.raises(ValueError):
+        compile_timeline(tmp_path, tmp_path / "t.timeline")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_writer_discards_on_exception(tmp_path):
+    output = tmp_path / "t.timeline"
+    write_timeline(output, [1], ["a"], MATRICES[:1])
+    with pytest.raises(RuntimeError):
+        with TimelineWriter(output) as writer:
+            writer.append(2, "b", MATRICES[1])
+            raise RuntimeError
+    # 原有文件不被半成品覆盖
+    with TimelineStore(output) as store:
+        assert store.numbers == [1]
+
+
+def test_invalid_file_is_rejected(tmp_path):
+    (tmp_path / "bad").write_bytes(b"not a timeline")
+    with pytest.raises(ValueError):
+        TimelineStore(tmp_path / "bad")
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from sparse_topology import SparseTopology
+from topology_diff import active_links, count_active_links, diff_matrices
+
+
+def loop_differences(old_matrix, new_matrix, symmetric):
+    """向量化之前链路管理器中find_differences的逐元素实现，作为对照"""
+    to_add, to_remove, to_modify = [], [], []
+    if symmetric:
+        n = min(old_matrix.shape[0], new_matrix.shape[0])
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    else:
+        rows, cols = new_matrix.shape
+        pairs = [(i, j) for i in range(rows) for j in range(cols)]
+    for i, j in pairs:
+        if old_matrix[i, j] < 0 and new_matrix[i, j] >= 0:
+            to_add.append((i, j))
+        elif old_matrix[i, j] >= 0 and new_matrix[i, j] < 0:
+            to_remove.append((i, j))
+        elif old_matrix[i, j] >= 0 and new_matrix[i, j] >= 0 and old_matrix[i, j] != new_matrix[i, j]:
+            to_modify.append((i, j))
+    return to_add, to_remove, to_modify
+
+
+def random_matrix(rng, shape, symmetric=False):
+    """约一半位置可见的随机矩阵，值取自少量整数以保留未变化的链路"""
+    values = rng.integers(0, 4, size=shape).astype(float)
+    matrix = np.where(rng.random(shape) < 0.5, values, -1.0)
+    if symmetric:
+        matrix = np.triu(matrix, 1) + np.triu(matrix, 1).T
+        np.fill_diagonal(matrix, -1.0)
+    return matrix
+
+
+def evolve(rng, matrix, symmetric=False):
+    """在matrix基础上随机增删改一部分链路，得到下一时间片"""
+    changed = random_matrix(rng, matrix.shape, symmetric)
+    pick = rng.random(matrix.shape) < 0.3
+    if symmetric:
+        pick = np.triu(pick, 1) | np.triu(pick, 1).T
+    return np.where(pick, changed, matrix)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_full_matrix_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    old = random_matrix(rng, (8, 36))
+    new = evolve(rng, old)
+    assert diff_matrices(old, new) == loop_differences(old, new, symmetric=False)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_symmetric_matrix_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    old = random_matrix(rng, (24, 24), symmetric=True)
+    new = evolve(rng, old, symmetric=True)
+    assert diff_matrices(old, new, symmetric=True) == loop_differences(old, new, symmetric=True)
+
+
+def test_symmetric_compares_common_leading_block():
+    rng = np.random.default_rng(7)
+    old = random_matrix(rng, (20, 20), symmetric=True)
+    new = random_matrix(rng, (16, 16), symmetric=True)
+    expected = loop_differences(old, new, symmetric=True)
+    assert diff_matrices(old, new, symmetric=True) == expected
+    assert diff_matrices(new, old, symmetric=True) == loop_differences(new, old, symmetric=True)
+
+
+def test_full_matrix_shape_mismatch_returns_no_changes():
+    assert diff_matrices(np.zeros((2, 3)), np.zeros((3, 2))) == ([], [], [])
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_sparse_topology_matches_loop(symmetric, seed):
+    rng = np.random.default_rng(seed)
+    shape = (24, 24) if symmetric else (8, 36)
+    old = random_matrix(rng, shape, symmetric)
+    new = evolve(rng, old, symmetric)
+    expected = loop_differences(old, new, symmetric)
+    sparse_old, sparse_new = SparseTopology.from_dense(old), SparseTopology.from_dense(new)
+    assert diff_matrices(sparse_old, sparse_new, symmetric) == expected
+    # 稀疏与稠密混用时同样按稀疏路径计算
+    assert diff_matrices(old, sparse_new, symmetric) == expected
+    assert diff_matrices(sparse_old, new, symmetric) == expected
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_active_links_match_loop(symmetric):
+    rng = np.random.default_rng(11)
+    matrix = random_matrix(rng, (12, 12), symmetric)
+    empty = np.full(matrix.shape, -1.0)
+    expected = loop_differences(empty, matrix, symmetric)[0]
+    assert active_links(matrix, symmetric) == expected
+    assert active_links(SparseTopology.from_dense(matrix), symmetric) == expected
+    assert count_active_links(matrix, symmetric) == len(expected)
+    assert count_active_links(SparseTopology.from_dense(matrix), symmetric) == len(expected)
@@ -0,0 +1,118 @@
+import json
+import socket
+import threading
+import time
+import numpy as np
+import pytest
+import topology_events
+from topology_events import EVENT_VERSION, TopologyEventPublisher, TopologySubscriber, fetch_topology
+
+FIRST = np.array([[-1.0, 3.0, -1.0], [-1.0, -1.0, 2.0]])
+SECOND = np.array([[-1.0, 4.0, 1.0], [-1.0, -1.0, -1.0]])
+
+
+@pytest.fixture
+def publisher(tmp_path):
+    publisher = TopologyEventPublisher(str(tmp_path / "events.sock"), 'tsn')
+    publisher.start()
+    yield publisher
+    publisher.close()
+
+
+def subscribe(publisher, count=1):
+    """连接发布端并等待发布端接受订阅，保证之后发布的时间片以增量送达"""
+    subscriber = TopologySubscriber(publisher.socket_path).connect()
+    subscriber._sock.settimeout(5)
+    deadline = time.monotonic() + 5
+    while len(publisher._clients) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return subscriber
+
+
+def test_fetch_before_first_slice_returns_empty_state(publisher):
+    start = time.monotonic()
+    topology = fetch_topology(publisher.socket_path, timeout=5.0)
+    assert time.monotonic() - start < 1.0
+    assert topology.slice is None and topology.links == {}
+    assert topology.matrix() is None
+
+
+def test_deltas_follow_empty_snapshot(publisher):
+    subscriber = subscribe(publisher)
+    publisher.publish("output_1.csv", FIRST)
+    publisher.publish("output_2.csv", SECOND)
+    events = subscriber.events()
+    first = next(events)
+    # 空快照只应用不产生，第一个事件即为第一个时间片的增量
+    assert (first['type'], first['seq'], first['slice']) == ('slice', 1, "output_1.csv")
+    assert first['added'] == [[0, 1, 3.0], [1, 2, 2.0]]
+    second = next(events)
+    assert second['removed'] == [[1, 2]]
+    assert second['added'] == [[0, 2, 1.0]]
+    assert second['modified'] == [[0, 1, 4.0]]
+    assert second['domains'] == {'0': [1, 2], '1': []}
+    np.testing.assert_array_equal(subscriber.matrix(), SECOND)
+    assert subscriber.domain(0) == [1, 2]
+    subscriber.close()
+
+
+def test_late_subscriber_starts_from_snapshot(publisher):
+    publisher.publish("output_1.csv", FIRST)
+    subscriber = subscribe(publisher)
+    publisher.publish("output_2.csv", SECOND)
+    events = subscriber.events()
+    snapshot = next(events)
+    assert (snapshot['type'], snapshot['seq']) == ('snapshot', 1)
+    np.testing.assert_array_equal(subscriber.matrix(), FIRST)
+    assert next(events)['seq'] == 2
+    np.testing.assert_array_equal(subscriber.matrix(), SECOND)
+    subscriber.close()
+
+
+def test_symmetric_matrix_sends_upper_triangle(tmp_path):
+    publisher = TopologyEventPublisher(str(tmp_path / "xw.sock"), 'xw', symmetric=True)
+    publisher.start()
+    matrix = np.array([[-1.0, 5.0, -1.0], [5.0, -1.0, 7.0], [-1.0, 7.0, -1.0]])
+    publisher.publish("output_1.csv", matrix)
+    topology = fetch_topology(publisher.socket_path)
+    publisher.close()
+    assert topology.links == {(0, 1): 5.0, (1, 2): 7.0}
+    np.testing.assert_array_equal(topology.matrix(), matrix)
+
+
+def test_publish_does_not_wait_for_slow_subscriber(publisher, monkeypatch):
+    monkeypatch.setattr(topology_events, 'MAX_PENDING_EVENTS', 4)
+    slow = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    slow.connect(publisher.socket_path)    # 从不读取
+    subscriber = subscribe(publisher, count=2)
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(event['seq'] for event in subscriber.events()))
+    reader.start()
+    matrix = np.ones((100, 100))
+    start = time.monotonic()
+    for k in range(10):
+        publisher.publish(f"output_{k}.csv", matrix + k)
+        time.sleep(0.02)
+    # 发布只入队，不等待接收慢的订阅者；积压超过上限的订阅者被断开，其余订阅者照常接收
+    assert time.monotonic() - start < topology_events.SEND_TIMEOUT
+    assert len(publisher._clients) == 1
+    publisher.close()
+    reader.join(5)
+    assert received == list(range(1, 11))
+    slow.close()
+
+
+def test_unsupported_version_is_rejected():
+    with pytest.raises(ValueError):
+        TopologySubscriber("unused").apply({'v': EVENT_VERSION + 1, 'type': 'snapshot'})
+
+
+def test_event_lines_are_json(publisher):
+    publisher.publish("output_1.csv", FIRST)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(publisher.socket_path)
+        sock.settimeout(5)
+        line = sock.makefile('rb').readline()
+    event = json.loads(line)
+    assert event['v'] == EVENT_VERSION and event['shape'] == [2, 3]
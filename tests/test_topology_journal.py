@@ -0,0 +1,93 @@
+import numpy as np
+from sparse_topology import SparseTopology
+from topology_journal import TopologyJournal, load_matrix, save_matrix
+
+
+def journal_with_commits(tmp_path, *names):
+    journal = TopologyJournal(tmp_path / "journal.jsonl")
+    journal.start("csv_dir")
+    for k, name in enumerate(names):
+        journal.begin(name)
+        journal.commit(name, np.full((2, 2), float(k)), {'add': k, 'remove': 0, 'modify': 0}, [])
+    return journal
+
+
+def test_no_commit(tmp_path):
+    journal = TopologyJournal(tmp_path / "journal.jsonl")
+    assert journal.last_commit() is None
+    journal.start("csv_dir")
+    journal.begin("output_1.csv")
+    assert journal.last_commit() is None
+
+
+def test_clean_commit_returns_snapshot(tmp_path):
+    journal = journal_with_commits(tmp_path, "output_1.csv", "output_2.csv")
+    record, matrix, clean = journal.last_commit()
+    assert record['name'] == "output_2.csv"
+    assert record['stats'] == {'add': 1, 'remove': 0, 'modify': 0}
+    assert clean
+    np.testing.assert_array_equal(matrix, np.full((2, 2), 1.0))
+
+
+def test_begin_after_commit_is_not_clean(tmp_path):
+    journal = journal_with_commits(tmp_path, "output_1.csv")
+    journal.begin("output_2.csv")
+    record, matrix, clean = journal.last_commit()
+    assert record['name'] == "output_1.csv"
+    assert matrix is not None and not clean
+
+
+def test_stage_after_commit_is_not_clean(tmp_path):
+    journal = journal_with_commits(tmp_path, "output_1.csv")
+    journal.begin("output_2.csv", event='stage')
+    assert not journal.last_commit()[2]
+
+
+def test_failed_links_are_not_clean(tmp_path):
+    journal = TopologyJournal(tmp_path / "journal.jsonl")
+    journal.start("csv_dir")
+    journal.commit("output_1.csv", np.zeros((2, 2)), {'add': 1}, [(0, 1)])
+    record, _, clean = journal.last_commit()
+    assert record['failed'] == [[0, 1]]
+    assert not clean
+
+
+def test_snapshot_newer_than_commit_is_discarded(tmp_path):
+    # 快照已写入下一个时间片但commit记录尚未追加时中途退出
+    journal = journal_with_commits(tmp_path, "output_1.csv")
+    save_matrix(journal.matrix_file, np.ones((2, 2)), "output_2.csv")
+    record, matrix, clean = journal.last_commit()
+    assert record['name'] == "output_1.csv"
+    assert matrix is None and not clean
+
+
+def test_missing_snapshot_is_not_clean(tmp_path):
+    journal = journal_with_commits(tmp_path, "output_1.csv")
+    journal.matrix_file.unlink()
+    record, matrix, clean = journal.last_commit()
+    assert matrix is None and not clean
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = journal_with_commits(tmp_path, "output_1.csv")
+    with open(journal.journal_file, 'a') as f:
+        f.write('{"event": "begin", "na')
+    record, _, clean = journal.last_commit()
+    assert record['name'] == "output_1.csv"
+    assert clean
+
+
+def test_start_discards_previous_run(tmp_path):
+    journal = journal_with_commits(tmp_path, "output_1.csv")
+    journal.start("other_dir")
+    assert journal.last_commit() is None
+    assert [record['event'] for record in journal.records()] == ['start']
+
+
+def test_sparse_snapshot_round_trip(tmp_path):
+    dense = np.array([[-1.0, 3.0], [2.0, -1.0]])
+    save_matrix(tmp_path / "m.npz", SparseTopology.from_dense(dense), "output_7.csv")
+    name, matrix = load_matrix(tmp_path / "m.npz")
+    assert name == "output_7.csv"
+    assert isinstance(matrix, SparseTopology)
+    np.testing.assert_array_equal(matrix.to_dense(), dense)
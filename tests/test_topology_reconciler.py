@@ -0,0 +1,99 @@
+import json
+import re
+import numpy as np
+from container_backend import DryRunBackend
+from topology_reconciler import TopologyReconciler, parse_interfaces, parse_netem_delays
+
+
+class XwLikeManager:
+    """对称矩阵、接口名为 "i-j" 的最小链路管理器（只提供plan需要的部分）"""
+    symmetric_matrix = True
+    managed_veth_pattern = re.compile(r'^\d+-\d+$')
+
+    def link_interfaces(self, node1, node2):
+        return [(f"n{node1}", f"{node1}-{node2}", f"10.0.{node1}.{node2}/30"),
+                (f"n{node2}", f"{node2}-{node1}", f"10.0.{node2}.{node1}/30")]
+
+    def netem_delay_ms(self, value):
+        return float(value)
+
+
+def namespace(*interfaces, netem=None):
+    """构造dump_namespace格式的状态，interfaces为 (接口名, 是否up, 地址集合)"""
+    return {'interfaces': {name: {'up': up, 'addresses': set(addresses)} for name, up, addresses in interfaces},
+            'netem': netem or {}}
+
+
+def healthy(manager, matrix, containers):
+    """按目标矩阵构造完全一致的实际状态"""
+    snapshot = {c: namespace() for c in containers}
+    for i in range(matrix.shape[0]):
+        for j in range(i + 1, matrix.shape[0]):
+            if matrix[i, j] >= 0:
+                for k, (container, veth, address) in enumerate(manager.link_interfaces(i, j)):
+                    snapshot[container]['interfaces'][veth] = {'up': True, 'addresses': {address}}
+                    if k == 0:
+                        snapshot[container]['netem'][veth] = float(matrix[i, j])
+    return snapshot
+
+
+MATRIX = np.array([[-1, 5, 7], [5, -1, -1], [7, -1, -1]], dtype=float)
+CONTAINERS = ["n0", "n1", "n2"]
+
+
+def plan(snapshot):
+    return TopologyReconciler(XwLikeManager(), backend=DryRunBackend()).plan(MATRIX, snapshot)
+
+
+def test_consistent_state_needs_no_changes():
+    result = plan(healthy(XwLikeManager(), MATRIX, CONTAINERS))
+    assert result['ok'] == [(0, 1), (0, 2)]
+    assert not any(result[key] for key in ('stray', 'rebuild', 'create', 'fix', 'delay', 'unreachable'))
+
+
+def test_missing_half_and_stray_links():
+    snapshot = healthy(XwLikeManager(), MATRIX, CONTAINERS)
+    del snapshot["n0"]['interfaces']["0-1"], snapshot["n1"]['interfaces']["1-0"]   # 整条链路缺失
+    del snapshot["n2"]['interfaces']["2-0"]                                         # 只剩一端
+    snapshot["n1"]['interfaces']["1-2"] = {'up': True, 'addresses': set()}         # 目标中不存在
+    snapshot["n1"]['interfaces']["eth0"] = {'up': True, 'addresses': set()}        # 不归本管理器
+    result = plan(snapshot)
+    assert result['create'] == [(0, 1)]
+    assert result['rebuild'] == [(0, 2)]
+    assert result['stray'] == [("n1", "1-2")]
+
+
+def test_address_state_and_delay_fixes():
+    snapshot = healthy(XwLikeManager(), MATRIX, CONTAINERS)
+    snapshot["n0"]['interfaces']["0-1"] = {'up': False, 'addresses': {"10.9.9.9/30"}}
+    snapshot["n0"]['netem']["0-2"] = 9.0
+    result = plan(snapshot)
+    assert result['fix'] == [(0, 1, [("n0", "addr del 10.9.9.9/30 dev 0-1"),
+                                     ("n0", "addr add 10.0.0.1/30 dev 0-1"),
+                                     ("n0", "link set 0-1 up")])]
+    assert result['delay'] == [(0, 2)]
+    assert result['ok'] == []
+
+
+def test_unreachable_container():
+    snapshot = healthy(XwLikeManager(), MATRIX, CONTAINERS)
+    snapshot["n2"] = None
+    result = plan(snapshot)
+    assert result['unreachable'] == [(0, 2)]
+    assert result['ok'] == [(0, 1)]
+
+
+def test_parse_iproute2_json():
+    ip_json = json.dumps([
+        {'ifname': 'lo', 'flags': ['LOOPBACK', 'UP'], 'addr_info': [{'family': 'inet', 'local': '127.0.0.1', 'prefixlen': 8}]},
+        {'ifname': '0-1', 'flags': ['BROADCAST'], 'addr_info': [
+            {'family': 'inet', 'local': '10.0.0.1', 'prefixlen': 30},
+            {'family': 'inet6', 'local': 'fe80::1', 'prefixlen': 64}]},
+    ])
+    assert parse_interfaces(ip_json) == {'lo': {'up': True, 'addresses': {'127.0.0.1/8'}},
+                                         '0-1': {'up': False, 'addresses': {'10.0.0.1/30'}}}
+    tc_json = json.dumps([
+        {'kind': 'tbf', 'dev': '0-1', 'options': {}},
+        {'kind': 'netem', 'dev': '0-1', 'options': {'delay': {'delay': 0.012, 'jitter': 0}}},
+    ])
+    assert parse_netem_delays(tc_json) == {'0-1': 12.0}
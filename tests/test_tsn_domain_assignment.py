@@ -0,0 +1,97 @@
+import logging
+import numpy as np
+import pytest
+from tsn_domain_assignment import assign_domains, best_domains, count_handovers, process_directory
+
+
+def timeline(*slices):
+    """(T, N_tsn, N_dg) 延迟矩阵，slices为每个时间片的 [[TSN0对各节点的延迟], [TSN1...]]"""
+    return np.array(slices, dtype=float)
+
+
+# 单个节点，两个TSN的延迟在10附近交替领先
+FLAPPING = timeline([[10.0], [11.0]], [[11.0], [10.5]], [[10.2], [11.0]], [[12.0], [10.0]])
+
+
+def test_best_domains_picks_lowest_row_on_ties_and_marks_invisible():
+    stack = timeline([[5.0, -1.0, 3.0], [5.0, -1.0, 2.0]])
+    np.testing.assert_array_equal(best_domains(stack), [[0, -1, 1]])
+
+
+def test_no_margin_follows_per_slice_minimum():
+    assignment = assign_domains(FLAPPING)
+    np.testing.assert_array_equal(assignment[:, 0], [0, 1, 0, 1])
+    assert count_handovers(assignment) == 3
+
+
+def test_absolute_margin_suppresses_flapping():
+    assignment = assign_domains(FLAPPING, margin_ms=1.0)
+    # 只有第4个时间片TSN0比TSN1慢2ms，超过迟滞才切换
+    np.testing.assert_array_equal(assignment[:, 0], [0, 0, 0, 1])
+    assert count_handovers(assignment) == 1
+
+
+def test_relative_margin():
+    assert count_handovers(assign_domains(FLAPPING, rel_margin=0.25)) == 0
+
+
+def test_current_tsn_becoming_invisible_forces_switch():
+    stack = timeline([[10.0], [11.0]], [[-1.0], [11.0]])
+    np.testing.assert_array_equal(assign_domains(stack, margin_ms=5.0)[:, 0], [0, 1])
+
+
+def test_capacity_moves_newcomers_before_existing_members():
+    # 时间片1中节点0已在TSN0；时间片2中节点1也以TSN0为最优，容量1时移出新接入的节点1
+    stack = timeline([[1.0, -1.0], [5.0, -1.0]],
+                     [[1.0, 1.0], [5.0, 2.0]])
+    assignment = assign_domains(stack, capacity=1)
+    np.testing.assert_array_equal(assignment, [[0, -1], [0, 1]])
+
+
+def test_capacity_is_exceeded_only_without_visible_alternative():
+    stack = timeline([[1.0, 2.0, 3.0], [-1.0, -1.0, 4.0]])
+    assignment = assign_domains(stack, capacity=1)
+    np.testing.assert_array_equal(np.bincount(assignment[0], minlength=2), [2, 1])
+
+
+def test_invalid_capacity_is_rejected():
+    with pytest.raises(ValueError):
+        assign_domains(FLAPPING, capacity=0)
+
+
+def write_dir(directory, stack, numbers):
+    directory.mkdir()
+    for number, matrix in zip(numbers, stack):
+        np.savetxt(directory / f"output_{number}.csv", matrix, delimiter=',')
+
+
+def warnings_for(tmp_path, caplog, stack, capacity):
+    write_dir(tmp_path / "in", stack, range(1, len(stack) + 1))
+    with caplog.at_level(logging.WARNING):
+        process_directory(tmp_path / "in", tmp_path / "out", capacity=capacity)
+    return [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+
+
+def test_process_directory_warns_when_visible_capacity_is_exceeded(tmp_path, caplog):
+    # 总容量足够，但时间片中只有TSN0可见
+    warnings = warnings_for(tmp_path, caplog, timeline([[1.0, 2.0], [-1.0, -1.0]]), capacity=1)
+    assert len(warnings) == 1 and "超过上限 1" in warnings[0]
+
+
+def test_process_directory_warns_when_total_capacity_is_too_small(tmp_path, caplog):
+    warnings = warnings_for(tmp_path, caplog, timeline([[1.0, 2.0, 3.0], [1.0, 2.0, 3.0]]), capacity=1)
+    assert "小于节点数 3" in warnings[0]
+
+
+def test_process_directory_is_quiet_when_capacity_is_met(tmp_path, caplog):
+    assert warnings_for(tmp_path, caplog, timeline([[1.0, 2.0], [2.0, 1.0]]), capacity=1) == []
+
+
+def test_process_directory_removes_stale_slices(tmp_path):
+    write_dir(tmp_path / "in", FLAPPING[:2], [1, 2])
+    write_dir(tmp_path / "out", FLAPPING, [1, 2, 3, 4])
+    assert process_directory(tmp_path / "in", tmp_path / "out", margin_ms=1.0)[0] == 2
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == ["output_1.csv", "output_2.csv"]
+    # 分域表只保留所属TSN的延迟
+    np.testing.assert_array_equal(np.loadtxt(tmp_path / "out" / "output_2.csv", delimiter=',', ndmin=2),
+                                  [[11.0], [-1.0]])